@@ -0,0 +1,70 @@
+#!/bin/env python3
+"""
+Times serializing large query results, with the compact encoding used for stored and cached results and with the
+encoder that sanitizes the data first (what json_dumps used to do).
+
+Run it from the repository root:
+
+    PYTHONPATH=. python bin/benchmark_json_dumps.py --rows 100000
+"""
+
+import argparse
+import datetime
+import json
+import statistics
+import time
+
+from redash.utils import COMPACT_SEPARATORS, JSONEncoder, _sanitize_data, json_dumps
+
+
+def result_data(rows):
+    return {
+        "columns": [{"name": name, "type": "string"} for name in ("id", "name", "value", "created_at")],
+        "rows": [
+            {
+                "id": i,
+                "name": "row {}".format(i),
+                "value": float("nan") if i % 10 == 0 else i / 3,
+                "created_at": datetime.datetime(2020, 1, 1) + datetime.timedelta(seconds=i),
+            }
+            for i in range(rows)
+        ],
+    }
+
+
+def sanitizing_json_dumps(data):
+    return json.dumps(_sanitize_data(data), cls=JSONEncoder, ensure_ascii=False, allow_nan=False)
+
+
+def compact_json_dumps(data):
+    return json_dumps(data, separators=COMPACT_SEPARATORS)
+
+
+def timed(dumps, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(dumps(data))
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return size, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = result_data(args.rows)
+    for label, dumps in [("compact", compact_json_dumps), ("sanitizing encoder", sanitizing_json_dumps)]:
+        size, timings = timed(dumps, data, args.repeat)
+        print(
+            "{:<20} {:>12} bytes   min {:>8.1f}ms   median {:>8.1f}ms".format(
+                label, size, min(timings), statistics.median(timings)
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/bin/env python3
+"""
+Times searching queries and dashboards over a large number of them.
+
+Generates the queries and dashboards of a new organization in the configured database (REDASH_DATABASE_URL), runs
+each search a few times and prints its timings. Everything is created in a single transaction that's rolled back at
+the end, so the database is left as it was.
+
+Run it from the repository root:
+
+    PYTHONPATH=. python bin/benchmark_search.py --queries 100000 --dashboards 10000
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from redash import models
+from redash.app import create_app
+from redash.models import db
+from redash.utils import gen_query_hash
+from redash.utils.configuration import ConfigurationContainer
+
+WORDS = [
+    "active", "orders", "revenue", "daily", "weekly", "monthly", "users", "signups", "churn", "retention",
+    "funnel", "events", "sessions", "marketing", "campaign", "sales", "pipeline", "invoices", "refunds", "support",
+    "tickets", "latency", "errors", "deployments", "inventory", "warehouse", "shipping", "cohort", "growth", "trial",
+    "conversion", "billing", "customers", "accounts", "regions", "products", "pricing", "usage", "quota", "report",
+    "überblick", "kundenzahl", "ventas", "ingresos", "売上", "ユーザー", "заказы", "выручка",
+]  # fmt: skip
+
+TABLES = ["orders", "users", "events", "invoices", "sessions", "tickets", "products", "accounts"]
+
+QUERY_SEARCHES = [
+    "revenue",
+    "daily active users",
+    '"weekly orders"',
+    "name:churn",
+    "query:customer_id",
+    "description:pipeline",
+    "売上",
+    "nothing-matches-this",
+]
+
+DASHBOARD_SEARCHES = ["revenue", "daily active", "ユーザー", "nothing-matches-this"]
+
+BATCH_SIZE = 5000
+
+
+def words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def query_rows(rng, count, org, data_source, user):
+    for i in range(count):
+        table = rng.choice(TABLES)
+        query_text = "SELECT {}_id, count(*) FROM {} WHERE customer_id = {} AND status = '{}' GROUP BY 1".format(
+            table[:-1], table, i, rng.choice(WORDS)
+        )
+        yield {
+            "org_id": org.id,
+            "data_source_id": data_source.id,
+            "user_id": user.id,
+            "name": words(rng, rng.randint(2, 6)).title(),
+            "description": words(rng, rng.randint(0, 20)) or None,
+            "query": query_text,
+            "query_hash": gen_query_hash(query_text),
+            "is_draft": rng.random() < 0.1,
+            "is_archived": rng.random() < 0.05,
+            "options": {},
+            "version": 1,
+        }
+
+
+def dashboard_rows(rng, count, org, user):
+    for i in range(count):
+        yield {
+            "org_id": org.id,
+            "user_id": user.id,
+            "name": words(rng, rng.randint(2, 5)).title(),
+            "slug": "benchmark-{}".format(i),
+            "layout": [],
+            "is_draft": False,
+            "is_archived": False,
+            "options": {},
+            "version": 1,
+        }
+
+
+def insert(table, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            db.session.execute(table.insert(), batch)
+            batch = []
+
+    if batch:
+        db.session.execute(table.insert(), batch)
+
+
+def create_fixture(rng, queries, dashboards):
+    org = models.Organization(name="Search Benchmark", slug="search-benchmark-{}".format(rng.getrandbits(32)))
+    default_group = models.Group(
+        name="default", permissions=models.Group.DEFAULT_PERMISSIONS, org=org, type=models.Group.BUILTIN_GROUP
+    )
+    db.session.add_all([org, default_group])
+    db.session.flush()
+
+    user = models.User(org=org, name="Benchmark", email="benchmark@example.com", group_ids=[default_group.id])
+    data_source = models.DataSource.create_with_group(
+        org=org, name="Benchmark", type="pg", options=ConfigurationContainer({})
+    )
+    db.session.add(user)
+    db.session.flush()
+
+    insert(models.Query.__table__, query_rows(rng, queries, org, data_source, user))
+    insert(models.Dashboard.__table__, dashboard_rows(rng, dashboards, org, user))
+    db.session.execute("ANALYZE queries")
+    db.session.execute("ANALYZE dashboards")
+
+    return org, user
+
+
+def timed(search, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = len(search())
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return count, timings
+
+
+def report(label, term, count, timings):
+    print(
+        "{:<22} {:<26} {:>6} results   min {:>8.1f}ms   median {:>8.1f}ms".format(
+            label, term, count, min(timings), statistics.median(timings)
+        )
+    )
+
+
+def run_searches(org, user, limit, repeat):
+    group_ids = user.group_ids
+    for term in QUERY_SEARCHES:
+        for label, multi_byte_search in [("queries", False), ("queries (multi-byte)", True)]:
+            count, timings = timed(
+                lambda: models.Query.search(
+                    term, group_ids, user.id, limit=limit, multi_byte_search=multi_byte_search
+                ).all(),
+                repeat,
+            )
+            report(label, term, count, timings)
+
+    for term in DASHBOARD_SEARCHES:
+        count, timings = timed(
+            lambda: models.Dashboard.search(org, group_ids, user.id, term).limit(limit).all(), repeat
+        )
+        report("dashboards", term, count, timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=100000)
+    parser.add_argument("--dashboards", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=20, help="results per search, like the search API's page")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        indexes = db.session.execute(
+            "SELECT indexname FROM pg_indexes WHERE indexname LIKE '%\\_trgm' ORDER BY indexname"
+        ).fetchall()
+        print("Trigram indexes: {}".format(", ".join(row[0] for row in indexes) or "none"))
+
+        try:
+            started = time.perf_counter()
+            org, user = create_fixture(random.Random(args.seed), args.queries, args.dashboards)
+            print(
+                "Generated {} queries and {} dashboards in {:.1f}s\n".format(
+                    args.queries, args.dashboards, time.perf_counter() - started
+                )
+            )
+            run_searches(org, user, args.limit, args.repeat)
+        finally:
+            db.session.rollback()
+
+
+if __name__ == "__main__":
+    main()
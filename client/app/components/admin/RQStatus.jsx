@@ -40,6 +40,7 @@ const queryJobsColumns = [
   { title: "Data Source ID", dataIndex: ["meta", "data_source_id"] },
   { title: "User ID", dataIndex: ["meta", "user_id"] },
   Columns.custom((scheduled) => scheduled.toString(), { title: "Scheduled", dataIndex: ["meta", "scheduled"] }),
+  Columns.duration({ title: "Predicted Runtime", dataIndex: ["meta", "predicted_runtime"] }),
   Columns.timeAgo({ title: "Start Time", dataIndex: "started_at" }),
   Columns.timeAgo({ title: "Enqueue Time", dataIndex: "enqueued_at" }),
 ];
@@ -75,6 +76,14 @@ const workersColumns = [
 
 const queuesColumns = map(["Name", "Started", "Queued"], (c) => ({ title: c, dataIndex: c.toLowerCase() }));
 
+const dataSourcesColumns = [
+  { title: "Data Source ID", dataIndex: "data_source_id" },
+  { title: "Limit", dataIndex: "limit" },
+  { title: "Running", dataIndex: "running" },
+  { title: "Held", dataIndex: "held" },
+  { title: "Waiting Users", dataIndex: "waiting_users" },
+];
+
 const TablePropTypes = {
   loading: PropTypes.bool.isRequired,
   items: PropTypes.arrayOf(PropTypes.object).isRequired,
@@ -116,6 +125,24 @@ export function QueuesTable({ loading, items }) {
 
 QueuesTable.propTypes = TablePropTypes;
 
+export function DataSourcesTable({ loading, items }) {
+  return (
+    <Table
+      loading={loading}
+      columns={dataSourcesColumns}
+      rowKey="data_source_id"
+      dataSource={items}
+      pagination={{
+        defaultPageSize: 25,
+        pageSizeOptions: ["10", "25", "50"],
+        showSizeChanger: true,
+      }}
+    />
+  );
+}
+
+DataSourcesTable.propTypes = TablePropTypes;
+
 export function QueryJobsTable({ loading, items }) {
   return (
     <Table
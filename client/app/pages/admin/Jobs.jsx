@@ -7,7 +7,14 @@ import Tabs from "antd/lib/tabs";
 import * as Grid from "antd/lib/grid";
 import routeWithUserSession from "@/components/ApplicationArea/routeWithUserSession";
 import Layout from "@/components/admin/Layout";
-import { CounterCard, WorkersTable, QueuesTable, QueryJobsTable, OtherJobsTable } from "@/components/admin/RQStatus";
+import {
+  CounterCard,
+  WorkersTable,
+  QueuesTable,
+  DataSourcesTable,
+  QueryJobsTable,
+  OtherJobsTable,
+} from "@/components/admin/RQStatus";
 
 import { axios } from "@/services/axios";
 import location from "@/services/location";
@@ -24,6 +31,7 @@ class Jobs extends React.Component {
     overallCounters: { started: 0, queued: 0 },
     startedJobs: [],
     workers: [],
+    dataSources: [],
   };
 
   _refreshTimer = null;
@@ -49,7 +57,7 @@ class Jobs extends React.Component {
     this._refreshTimer = setTimeout(this.refresh, 60 * 1000);
   };
 
-  processQueues = ({ queues, workers }) => {
+  processQueues = ({ queues, workers, data_sources: dataSources }) => {
     const queueCounters = values(queues).map(({ started, ...rest }) => ({
       started: started.length,
       ...rest,
@@ -71,7 +79,7 @@ class Jobs extends React.Component {
       }))
     );
 
-    this.setState({ isLoading: false, queueCounters, startedJobs, overallCounters, workers });
+    this.setState({ isLoading: false, queueCounters, startedJobs, overallCounters, workers, dataSources });
   };
 
   handleError = (error) => {
@@ -79,7 +87,16 @@ class Jobs extends React.Component {
   };
 
   render() {
-    const { isLoading, error, queueCounters, startedJobs, overallCounters, workers, activeTab } = this.state;
+    const {
+      isLoading,
+      error,
+      queueCounters,
+      startedJobs,
+      overallCounters,
+      workers,
+      dataSources,
+      activeTab,
+    } = this.state;
     const [startedQueryJobs, otherStartedJobs] = partition(startedJobs, [
       "name",
       "redash.tasks.queries.execution.execute_query",
@@ -110,6 +127,9 @@ class Jobs extends React.Component {
                 <Tabs.TabPane key="queues" tab="Queues">
                   <QueuesTable loading={isLoading} items={queueCounters} />
                 </Tabs.TabPane>
+                <Tabs.TabPane key="data_sources" tab="Data Sources">
+                  <DataSourcesTable loading={isLoading} items={dataSources} />
+                </Tabs.TabPane>
                 <Tabs.TabPane key="workers" tab="Workers">
                   <WorkersTable loading={isLoading} items={workers} />
                 </Tabs.TabPane>
@@ -104,7 +104,7 @@ function useDashboard(dashboardData) {
     widget.getParametersDefs(); // Force widget to read parameters values from URL
     setDashboard((currentDashboard) => extend({}, currentDashboard));
     return widget
-      .load(forceRefresh)
+      .load(forceRefresh, undefined, () => setDashboard((currentDashboard) => extend({}, currentDashboard)))
       .catch((error) => {
         // QueryResultErrors are expected
         if (error instanceof QueryResultError) {
@@ -67,8 +67,14 @@ export default function useQueryExecute(query) {
       }
     };
 
+    const onStaleResult = (staleResult) => {
+      if (queryResultInExecution.current === newQueryResult) {
+        setExecutionState({ queryResult: staleResult });
+      }
+    };
+
     newQueryResult
-      .toPromise(onStatusChange)
+      .toPromise(onStatusChange, onStaleResult)
       .then((queryResult) => {
         if (queryResultInExecution.current === newQueryResult) {
           // TODO: this should probably belong in the QueryEditor page.
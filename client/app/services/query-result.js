@@ -3,13 +3,13 @@ import moment from "moment";
 import { axios } from "@/services/axios";
 import { QueryResultError } from "@/services/query";
 import { Auth } from "@/services/auth";
-import { isString, uniqBy, each, isNumber, includes, extend, forOwn, get } from "lodash";
+import { isString, uniqBy, each, isNumber, includes, extend, forOwn, get, omit } from "lodash";
 
 const logger = debug("redash:services:QueryResult");
 const filterTypes = ["filter", "multi-filter", "multiFilter"];
 
 function defer() {
-  const result = { onStatusChange: (status) => {} };
+  const result = { onStatusChange: (status) => {}, onStaleResult: (staleResult) => {} };
   result.promise = new Promise((resolve, reject) => {
     result.resolve = resolve;
     result.reject = reject;
@@ -96,6 +96,8 @@ function handleErrorResponse(queryResult, error) {
   });
 }
 
+const JOB_STATUS_WAIT = 30;
+
 function sleep(ms) {
   return new Promise((resolve) => setTimeout(resolve, ms));
 }
@@ -122,6 +124,7 @@ class QueryResult {
     this.deferred = defer();
     this.job = {};
     this.query_result = {};
+    this.staleResult = null;
     this.status = "waiting";
 
     this.updatedAt = moment();
@@ -135,6 +138,13 @@ class QueryResult {
   }
 
   update(props) {
+    if (props.stale) {
+      // The query is being executed again: keep its newest cached result apart, to show until the job is done.
+      this.staleResult = new QueryResult({ query_result: props.query_result });
+      this.deferred.onStaleResult(this.staleResult);
+      props = omit(props, ["query_result", "stale"]);
+    }
+
     extend(this, props);
 
     if ("query_result" in props) {
@@ -203,6 +213,10 @@ class QueryResult {
     return id;
   }
 
+  getStaleResult() {
+    return this.staleResult;
+  }
+
   cancelExecution() {
     axios.delete(`api/jobs/${this.job.id}`);
   }
@@ -330,10 +344,16 @@ class QueryResult {
     return filters;
   }
 
-  toPromise(statusCallback) {
+  toPromise(statusCallback, staleResultCallback) {
     if (statusCallback) {
       this.deferred.onStatusChange = statusCallback;
     }
+    if (staleResultCallback) {
+      this.deferred.onStaleResult = staleResultCallback;
+      if (this.staleResult) {
+        staleResultCallback(this.staleResult);
+      }
+    }
     return this.deferred.promise;
   }
 
@@ -408,9 +428,12 @@ class QueryResult {
     const loadResult = () =>
       Auth.isAuthenticated() ? this.loadResult() : this.loadLatestCachedResult(query, parameters);
 
+    // The server may hold the request until the job's status changes (up to `wait` seconds).
+    const params = { status: this.job.status, wait: JOB_STATUS_WAIT };
+    const requestedAt = Date.now();
     const request = Auth.isAuthenticated()
-      ? axios.get(`api/jobs/${this.job.id}`)
-      : axios.get(`api/queries/${query}/jobs/${this.job.id}`);
+      ? axios.get(`api/jobs/${this.job.id}`, { params })
+      : axios.get(`api/queries/${query}/jobs/${this.job.id}`, { params });
 
     request
       .then((jobResponse) => {
@@ -429,7 +452,7 @@ class QueryResult {
           }
           setTimeout(() => {
             this.refreshStatus(query, parameters, tryNumber + 1);
-          }, waitTime);
+          }, Math.max(0, waitTime - (Date.now() - requestedAt)));
         }
       })
       .catch((error) => {
@@ -460,7 +483,13 @@ class QueryResult {
     const queryResult = new QueryResult();
 
     axios
-      .post(`api/queries/${id}/results`, { id, parameters, apply_auto_limit: applyAutoLimit, max_age: maxAge })
+      .post(`api/queries/${id}/results`, {
+        id,
+        parameters,
+        apply_auto_limit: applyAutoLimit,
+        max_age: maxAge,
+        stale_while_revalidate: true,
+      })
       .then((response) => {
         queryResult.update(response);
 
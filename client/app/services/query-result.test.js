@@ -1,4 +1,4 @@
-import { isDateTime } from "@/services/query-result";
+import QueryResult, { isDateTime } from "@/services/query-result";
 
 describe("isDateTime", () => {
   it.each([
@@ -15,3 +15,24 @@ describe("isDateTime", () => {
     expect(isDateTime(value)).toBe(expected);
   });
 });
+
+describe("QueryResult", () => {
+  it("keeps the stale result of a query that's executed again apart", () => {
+    const queryResult = new QueryResult();
+    const onStaleResult = jest.fn();
+    queryResult.toPromise(undefined, onStaleResult);
+
+    queryResult.update({
+      job: { id: "job", status: 2 },
+      query_result: { id: 1, data: { columns: [{ name: "a" }], rows: [{ a: 1 }] } },
+      stale: true,
+    });
+
+    expect(queryResult.getStatus()).toBe("processing");
+    expect(queryResult.getData()).toBe(null);
+    const staleResult = queryResult.getStaleResult();
+    expect(onStaleResult).toHaveBeenCalledWith(staleResult);
+    expect(staleResult.getStatus()).toBe("done");
+    expect(staleResult.getData()).toEqual([{ a: 1 }]);
+  });
+});
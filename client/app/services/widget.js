@@ -141,7 +141,7 @@ class Widget {
     return truncate(this.text, 20);
   }
 
-  load(force, maxAge) {
+  load(force, maxAge, onStaleResult) {
     if (!this.visualization) {
       return Promise.resolve();
     }
@@ -163,7 +163,15 @@ class Widget {
       this.queryResult = queryResult;
 
       queryResult
-        .toPromise()
+        .toPromise(undefined, (staleResult) => {
+          // Show the newest cached result while the query is executed again
+          if (this.queryResult === queryResult) {
+            this.data = staleResult;
+            if (onStaleResult) {
+              onStaleResult(staleResult);
+            }
+          }
+        })
         .then((result) => {
           if (this.queryResult === queryResult) {
             this.loading = false;
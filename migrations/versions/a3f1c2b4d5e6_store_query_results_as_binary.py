@@ -0,0 +1,32 @@
+"""store query results data as binary to support the columnar format
+
+Revision ID: a3f1c2b4d5e6
+Revises: db0aca1ebd32
+Create Date: 2026-10-18 10:12:31.482210
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f1c2b4d5e6'
+down_revision = 'db0aca1ebd32'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Converting the existing column would rewrite the whole table while holding an exclusive lock on it. Instead, the
+    # JSON text is kept in legacy_data, which results are read from until `manage.py query_results reencode` moves it
+    # to the new binary column in batches. legacy_data will be dropped by a later migration.
+    op.alter_column('query_results', 'data', new_column_name='legacy_data')
+    op.add_column('query_results', sa.Column('data', sa.LargeBinary(), nullable=True))
+
+
+def downgrade():
+    # Columnar results can't be converted in SQL. Run `manage.py query_results reencode --format json` before
+    # downgrading.
+    op.execute("UPDATE query_results SET legacy_data = convert_from(data, 'UTF8') WHERE data IS NOT NULL")
+    op.drop_column('query_results', 'data')
+    op.alter_column('query_results', 'legacy_data', new_column_name='data')
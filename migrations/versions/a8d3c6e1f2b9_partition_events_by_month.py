@@ -0,0 +1,72 @@
+"""partition events by month of created_at
+
+Revision ID: a8d3c6e1f2b9
+Revises: f5c2d8a91b47
+Create Date: 2026-10-18 21:37:45.104532
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8d3c6e1f2b9'
+down_revision = 'f5c2d8a91b47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing events are kept aside, and moved into the partitioned table in batches by `redash events migrate`,
+    # rather than in a single (long) transaction here.
+    op.rename_table('events', 'events_unpartitioned')
+    op.execute("ALTER INDEX IF EXISTS events_pkey RENAME TO events_unpartitioned_pkey")
+
+    op.execute("CREATE TABLE events (LIKE events_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)")
+    op.execute("ALTER TABLE events ALTER COLUMN created_at SET NOT NULL")
+    op.create_primary_key('events_pkey', 'events', ['id', 'created_at'])
+    op.create_foreign_key('events_org_id_fkey', 'events', 'organizations', ['org_id'], ['id'])
+    op.create_foreign_key('events_user_id_fkey', 'events', 'users', ['user_id'], ['id'])
+    op.execute("CREATE INDEX ix_events_org_id_created_at_id ON events (org_id, created_at DESC, id DESC)")
+    op.execute("CREATE TABLE events_default PARTITION OF events DEFAULT")
+
+    # Keep the id sequence when the legacy table is dropped.
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            EXECUTE format('ALTER SEQUENCE %s OWNED BY events.id', pg_get_serial_sequence('events_unpartitioned', 'id'));
+        END
+        $$
+        """
+    )
+
+
+def downgrade():
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            sequence_name text := pg_get_serial_sequence('events', 'id');
+        BEGIN
+            CREATE TABLE events_unpartitioned_all AS SELECT * FROM events;
+            IF to_regclass('events_unpartitioned') IS NOT NULL THEN
+                INSERT INTO events_unpartitioned_all SELECT * FROM events_unpartitioned;
+                DROP TABLE events_unpartitioned;
+            END IF;
+
+            EXECUTE format('ALTER SEQUENCE %s OWNED BY events_unpartitioned_all.id', sequence_name);
+            EXECUTE format(
+                'ALTER TABLE events_unpartitioned_all ALTER COLUMN id SET DEFAULT nextval(%L::regclass)', sequence_name
+            );
+        END
+        $$
+        """
+    )
+    op.drop_table('events')
+    op.rename_table('events_unpartitioned_all', 'events')
+
+    op.execute("ALTER TABLE events ALTER COLUMN created_at DROP NOT NULL")
+    op.execute("ALTER TABLE events ALTER COLUMN id SET NOT NULL")
+    op.create_primary_key('events_pkey', 'events', ['id'])
+    op.create_foreign_key('events_org_id_fkey', 'events', 'organizations', ['org_id'], ['id'])
+    op.create_foreign_key('events_user_id_fkey', 'events', 'users', ['user_id'], ['id'])
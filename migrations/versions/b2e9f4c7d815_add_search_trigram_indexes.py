@@ -0,0 +1,50 @@
+"""add trigram indexes for searching queries and dashboards
+
+Revision ID: b2e9f4c7d815
+Revises: a8d3c6e1f2b9
+Create Date: 2026-10-18 23:02:16.381947
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2e9f4c7d815'
+down_revision = 'a8d3c6e1f2b9'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_queries_name_trgm', 'queries', 'name'),
+    ('ix_queries_description_trgm', 'queries', 'description'),
+    ('ix_queries_query_trgm', 'queries', 'query'),
+    ('ix_dashboards_name_trgm', 'dashboards', 'name'),
+]
+
+
+def upgrade():
+    # pg_trgm is one of the standard contrib modules, but might not be installed. Search works without the indexes,
+    # only slower.
+    available = op.get_bind().execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm')"
+    ).scalar()
+    if not available:
+        print("pg_trgm is not available, skipping the search indexes.")
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Both tables can be big, build the indexes without locking them for writes.
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} USING gin ({} gin_trgm_ops)".format(
+                    name, table, column
+                )
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS {}".format(name))
@@ -0,0 +1,33 @@
+"""add queries.next_run_at to index scheduled queries by their next run
+
+Revision ID: b7d2e9c41f03
+Revises: a3f1c2b4d5e6
+Create Date: 2026-10-18 13:40:12.731554
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e9c41f03'
+down_revision = 'a3f1c2b4d5e6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Left empty for existing queries, the scheduler fills it in on its first run.
+    op.add_column('queries', sa.Column('next_run_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        'ix_queries_next_run_at',
+        'queries',
+        ['next_run_at'],
+        unique=False,
+        postgresql_where=sa.text("jsonb_typeof(schedule) != 'null'"),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_queries_next_run_at', table_name='queries')
+    op.drop_column('queries', 'next_run_at')
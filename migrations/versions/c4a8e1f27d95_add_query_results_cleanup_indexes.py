@@ -0,0 +1,29 @@
+"""add indexes used by the incremental query results cleanup
+
+Revision ID: c4a8e1f27d95
+Revises: b7d2e9c41f03
+Create Date: 2026-10-18 15:02:47.193806
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a8e1f27d95'
+down_revision = 'b7d2e9c41f03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Both tables can be big, build the indexes without locking them for writes.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_query_results_id_retrieved_at', 'query_results', ['id', 'retrieved_at'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('ix_queries_latest_query_data_id', 'queries', ['latest_query_data_id'], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    op.drop_index('ix_queries_latest_query_data_id', table_name='queries')
+    op.drop_index('ix_query_results_id_retrieved_at', table_name='query_results')
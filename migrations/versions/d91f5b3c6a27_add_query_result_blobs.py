@@ -0,0 +1,41 @@
+"""store query results payloads once per content in query_result_blobs
+
+Revision ID: d91f5b3c6a27
+Revises: c4a8e1f27d95
+Create Date: 2026-10-18 16:21:05.640918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd91f5b3c6a27'
+down_revision = 'c4a8e1f27d95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('query_result_blobs',
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=True),
+        sa.Column('refcount', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('content_hash')
+    )
+    # Existing results keep their payload in query_results.data.
+    op.add_column('query_results', sa.Column('blob_hash', sa.String(length=64), nullable=True))
+    op.create_index('ix_query_results_blob_hash', 'query_results', ['blob_hash'], unique=False)
+    op.create_foreign_key('query_results_blob_hash_fkey', 'query_results', 'query_result_blobs', ['blob_hash'],
+                          ['content_hash'])
+
+
+def downgrade():
+    op.execute(
+        "UPDATE query_results SET data = query_result_blobs.data FROM query_result_blobs "
+        "WHERE query_results.blob_hash = query_result_blobs.content_hash"
+    )
+    op.drop_constraint('query_results_blob_hash_fkey', 'query_results', type_='foreignkey')
+    op.drop_index('ix_query_results_blob_hash', table_name='query_results')
+    op.drop_column('query_results', 'blob_hash')
+    op.drop_table('query_result_blobs')
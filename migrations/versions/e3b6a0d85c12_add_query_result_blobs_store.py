@@ -0,0 +1,30 @@
+"""add the external store pointer and size of query result blobs
+
+Revision ID: e3b6a0d85c12
+Revises: d91f5b3c6a27
+Create Date: 2026-10-18 17:48:36.102954
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b6a0d85c12'
+down_revision = 'd91f5b3c6a27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('query_result_blobs', sa.Column('store', sa.String(length=32), nullable=True))
+    op.add_column('query_result_blobs', sa.Column('location', sa.String(length=255), nullable=True))
+    op.add_column('query_result_blobs', sa.Column('size', sa.BigInteger(), nullable=True))
+    op.execute("UPDATE query_result_blobs SET size = length(data)")
+
+
+def downgrade():
+    # Offloaded payloads aren't copied back into the database.
+    op.drop_column('query_result_blobs', 'size')
+    op.drop_column('query_result_blobs', 'location')
+    op.drop_column('query_result_blobs', 'store')
@@ -0,0 +1,26 @@
+"""add precomputed column statistics to query_results
+
+Revision ID: f5c2d8a91b47
+Revises: e3b6a0d85c12
+Create Date: 2026-10-18 18:04:12.518230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5c2d8a91b47'
+down_revision = 'e3b6a0d85c12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing results have no stats, alerts compute them from the result's data instead.
+    op.add_column('query_results', sa.Column('column_stats', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade():
+    op.drop_column('query_results', 'column_stats')
@@ -34,7 +34,7 @@ def create_app():
     )
     from .handlers.webpack import configure_webpack
     from .metrics import request as request_metrics
-    from .models import db, users
+    from .models import db, permissions_cache, users
     from .utils import sentry
     from .version_check import reset_new_version_status
 
@@ -54,6 +54,7 @@ def create_app():
     handlers.init_app(app)
     configure_webpack(app)
     users.init_app(app)
+    permissions_cache.init_app(app)
     tasks.init_app(app)
 
     return app
@@ -15,7 +15,7 @@ from redash import models, settings
 from redash.authentication import jwt_auth
 from redash.authentication.org_resolving import current_org
 from redash.settings.organization import settings as org_settings
-from redash.tasks import record_event
+from redash.tasks import enqueue_event
 
 login_manager = LoginManager()
 logger = logging.getLogger("authentication")
@@ -211,7 +211,7 @@ def log_user_logged_in(app, user):
         "ip": request.remote_addr,
     }
 
-    record_event.delay(event)
+    enqueue_event(event)
 
 
 @login_manager.unauthorized_handler
@@ -9,9 +9,11 @@ from redash import __version__, create_app, rq_redis_connection, settings
 from redash.cli import (
     data_sources,
     database,
+    events,
     groups,
     organization,
     queries,
+    query_results,
     rq,
     users,
 )
@@ -41,6 +43,8 @@ manager.add_command(groups.manager, "groups")
 manager.add_command(data_sources.manager, "ds")
 manager.add_command(organization.manager, "org")
 manager.add_command(queries.manager, "queries")
+manager.add_command(query_results.manager, "query_results")
+manager.add_command(events.manager, "events")
 manager.add_command(rq.manager, "rq")
 manager.add_command(run_command, "runserver")
 
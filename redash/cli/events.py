@@ -0,0 +1,52 @@
+from click import option
+from flask.cli import AppGroup
+
+manager = AppGroup(help="Events management commands.")
+
+LEGACY_TABLE = "events_unpartitioned"
+COLUMNS = "id, org_id, user_id, action, object_type, object_id, additional_properties, created_at"
+
+
+@manager.command(name="migrate")
+@option("--batch-size", default=10000, type=int, help="Number of events to move per transaction (default: 10000).")
+def migrate(batch_size):
+    """Move the events recorded before the events table was partitioned into it, in batches."""
+    from redash.models import Event, db
+
+    if db.session.execute("SELECT to_regclass(:table)", {"table": LEGACY_TABLE}).scalar() is None:
+        print("No events to migrate.")
+        return
+
+    moved = 0
+    while True:
+        batch = db.session.execute(
+            "SELECT max(id), array_agg(DISTINCT date_trunc('month', COALESCE(created_at, to_timestamp(0)), 'UTC')) "
+            "FROM (SELECT id, created_at FROM {} ORDER BY id LIMIT :limit) AS batch".format(LEGACY_TABLE),
+            {"limit": batch_size},
+        ).first()
+        last_id, months = batch
+        if last_id is None:
+            break
+
+        # Events of months without a partition would end up in the default one.
+        for month in months:
+            Event.create_partition(month)
+
+        count = db.session.execute(
+            "WITH moved AS (DELETE FROM {table} WHERE id <= :last_id RETURNING *) "
+            "INSERT INTO events ({columns}) "
+            "SELECT {moved_columns} FROM moved".format(
+                table=LEGACY_TABLE,
+                columns=COLUMNS,
+                moved_columns=COLUMNS.replace("created_at", "COALESCE(created_at, to_timestamp(0))"),
+            ),
+            {"last_id": last_id},
+        ).rowcount
+        db.session.commit()
+
+        moved += count
+        print("Moved events up to id {} ({} moved).".format(last_id, moved))
+
+    db.session.execute("DROP TABLE {}".format(LEGACY_TABLE))
+    db.session.commit()
+    print("Done. {} events moved.".format(moved))
@@ -0,0 +1,124 @@
+from click import Choice, option
+from flask.cli import AppGroup
+
+manager = AppGroup(help="Query results management commands.")
+
+
+@manager.command(name="reencode")
+@option(
+    "--format",
+    "storage_format",
+    type=Choice(["columnar", "json"]),
+    default="columnar",
+    help="The storage format to rewrite the results into (default: columnar).",
+)
+@option(
+    "--compression",
+    default=None,
+    help="Compression codec for the columnar format (default: REDASH_QUERY_RESULTS_COMPRESSION).",
+)
+@option("--batch-size", default=100, type=int, help="Number of results to rewrite per transaction (default: 100).")
+@option("--start-id", default=0, type=int, help="Only rewrite results with an id greater than this.")
+def reencode(storage_format, compression, batch_size, start_id):
+    """Rewrite stored query results into the given storage format, in batches."""
+    import sqlalchemy
+
+    from redash.models import db
+    from redash.utils.result_encoding import (
+        FORMAT_JSON,
+        decode_result,
+        encode_result,
+        is_encoded,
+    )
+
+    # Work on the raw bytes, so results that are already in the target format can be skipped without decoding them.
+    # Payloads are either stored in the result itself (results stored before they were deduplicated) or in a blob. A
+    # blob keeps its content hash, which remains a valid key to deduplicate it by. Results stored before payloads were
+    # binary keep their JSON text in legacy_data, which is always moved to data.
+    tables = [
+        sqlalchemy.table(
+            "query_results", sqlalchemy.column("id"), sqlalchemy.column("data"), sqlalchemy.column("legacy_data")
+        ),
+        sqlalchemy.table("query_result_blobs", sqlalchemy.column("content_hash"), sqlalchemy.column("data")),
+    ]
+
+    rewritten = 0
+    skipped = 0
+
+    for table in tables:
+        key, *payloads = table.c
+        # --start-id only applies to query_results.
+        last_key = start_id if key.name == "id" else ""
+
+        while True:
+            batch = db.session.execute(
+                sqlalchemy.select([key] + payloads)
+                .where(key > last_key)
+                .where(sqlalchemy.or_(*[payload.isnot(None) for payload in payloads]))
+                .order_by(key)
+                .limit(batch_size)
+            ).fetchall()
+
+            if not batch:
+                break
+
+            for row in batch:
+                last_key, payload = row[0], row.data
+                values = {}
+
+                if payload is None:
+                    payload = row.legacy_data
+                    values["legacy_data"] = None
+                elif is_encoded(payload) != (storage_format == FORMAT_JSON) and compression is None:
+                    skipped += 1
+                    continue
+
+                values["data"] = encode_result(
+                    decode_result(payload), storage_format=storage_format, compression=compression
+                )
+                db.session.execute(table.update().where(key == last_key).values(**values))
+                rewritten += 1
+
+            db.session.commit()
+            print("Processed {} up to {} ({} rewritten, {} skipped).".format(table.name, last_key, rewritten, skipped))
+
+    print("Done. {} results rewritten, {} skipped.".format(rewritten, skipped))
+
+
+@manager.command(name="cleanup")
+@option(
+    "--max-age",
+    default=None,
+    type=int,
+    help="Delete unused results that are this many days old or more (default: REDASH_QUERY_RESULTS_CLEANUP_MAX_AGE).",
+)
+@option("--batch-size", default=1000, type=int, help="Initial number of results to look at per batch (default: 1000).")
+@option("--batch-time", default=1.0, type=float, help="Target duration of a batch in seconds (default: 1).")
+@option("--start-id", default=0, type=int, help="Only look at results with an id greater than this.")
+@option(
+    "--end-id",
+    default=None,
+    type=int,
+    help="Only look at results with an id up to this. Lets several processes clean up separate id ranges.",
+)
+def cleanup(max_age, batch_size, batch_time, start_id, end_id):
+    """Delete all unused query results, in batches."""
+    from redash import settings
+    from redash.tasks.queries.maintenance import delete_unused_query_results
+
+    if max_age is None:
+        max_age = settings.QUERY_RESULTS_CLEANUP_MAX_AGE
+
+    deleted_count = 0
+    for last_id, deleted, current_batch_size in delete_unused_query_results(
+        max_age, batch_size, batch_time, start_id=start_id, end_id=end_id
+    ):
+        deleted_count += deleted
+        if last_id is not None:
+            print(
+                "Processed results up to id {} ({} deleted, batch size {}).".format(
+                    last_id, deleted_count, current_batch_size
+                )
+            )
+
+    print("Done. {} results deleted.".format(deleted_count))
@@ -1,4 +1,5 @@
 from flask_login import current_user, login_required
+from sqlalchemy.orm import joinedload
 
 from redash import models, redis_connection
 from redash.authentication import current_org
@@ -18,7 +19,7 @@ def outdated_queries():
     query_ids = json_loads(manager_status.get("query_ids", "[]"))
     if query_ids:
         outdated_queries = (
-            models.Query.query.outerjoin(models.QueryResult)
+            models.Query.query.options(joinedload(models.Query.latest_query_data).load_only("runtime", "retrieved_at"))
             .filter(models.Query.id.in_(query_ids))
             .order_by(models.Query.created_at.desc())
         )
@@ -16,6 +16,7 @@ from redash.handlers.dashboards import (
     DashboardForkResource,
     DashboardListResource,
     DashboardResource,
+    DashboardResultsResource,
     DashboardShareResource,
     DashboardTagsResource,
     MyDashboardsResource,
@@ -94,7 +95,7 @@ from redash.handlers.visualizations import (
     VisualizationResource,
 )
 from redash.handlers.widgets import WidgetListResource, WidgetResource
-from redash.utils import json_dumps
+from redash.utils import COMPACT_SEPARATORS, json_dumps
 
 
 class ApiExt(Api):
@@ -111,7 +112,7 @@ def json_representation(data, code, headers=None):
     # Flask-Restful checks only for flask.Response but flask-login uses werkzeug.wrappers.Response
     if isinstance(data, Response):
         return data
-    resp = make_response(json_dumps(data), code)
+    resp = make_response(json_dumps(data, separators=COMPACT_SEPARATORS), code)
     resp.headers.extend(headers or {})
     return resp
 
@@ -133,6 +134,11 @@ api.add_org_resource(AlertListResource, "/api/alerts", endpoint="alerts")
 
 api.add_org_resource(DashboardListResource, "/api/dashboards", endpoint="dashboards")
 api.add_org_resource(DashboardResource, "/api/dashboards/<dashboard_id>", endpoint="dashboard")
+api.add_org_resource(
+    DashboardResultsResource,
+    "/api/dashboards/<dashboard_id>/results",
+    endpoint="dashboard_results",
+)
 api.add_org_resource(
     PublicDashboardResource,
     "/api/dashboards/public/<token>",
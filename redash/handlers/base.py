@@ -11,8 +11,8 @@ from sqlalchemy.orm.exc import NoResultFound
 from redash import settings
 from redash.authentication import current_org
 from redash.models import db
-from redash.tasks import record_event as record_event_task
-from redash.utils import json_dumps
+from redash.tasks import enqueue_event
+from redash.utils import COMPACT_SEPARATORS, json_dumps
 from redash.utils.query_order import sort_query
 
 routes = Blueprint("redash", __name__, template_folder=settings.fix_assets_path("templates"))
@@ -58,7 +58,7 @@ def record_event(org, user, options):
     if "timestamp" not in options:
         options["timestamp"] = int(time.time())
 
-    record_event_task.delay(options)
+    enqueue_event(options)
 
 
 def require_fields(req, fields):
@@ -108,7 +108,7 @@ def org_scoped_rule(rule):
 
 
 def json_response(response):
-    return current_app.response_class(json_dumps(response), mimetype="application/json")
+    return current_app.response_class(json_dumps(response, separators=COMPACT_SEPARATORS), mimetype="application/json")
 
 
 def filter_by_tags(result_set, column):
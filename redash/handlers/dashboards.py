@@ -11,9 +11,11 @@ from redash.handlers.base import (
     paginate,
 )
 from redash.handlers.base import order_results as _order_results
+from redash.handlers.query_results import run_dashboard_queries
 from redash.permissions import (
     can_modify,
     require_admin_or_owner,
+    require_any_of_permission,
     require_object_modify_permission,
     require_permission,
 )
@@ -272,6 +274,42 @@ class DashboardResource(BaseResource):
         return d
 
 
+class DashboardResultsResource(BaseResource):
+    @require_any_of_permission(("view_query", "execute_query"))
+    def post(self, dashboard_id):
+        """
+        Execute the queries of all the visualization widgets of a dashboard.
+
+        :param dashboard_id: The ID of the dashboard whose widgets' results should be fetched
+        :<json object parameters: The parameter values to apply to each widget's query, by widget ID
+        :<json number max_age: If query results less than `max_age` seconds old are available, return them,
+                               otherwise execute the query; if omitted or -1, returns any cached result, or
+                               executes if not available. Set to zero to always execute.
+        :<json boolean stale_while_revalidate: When a query is executed, also return its newest cached result (if
+                                               any), with `stale` set.
+
+        :>json object results: The result of each widget's query (`query_result`), or the `job` executing it (or
+                               the error explaining why it can't be executed), by widget ID
+        """
+        params = request.get_json(force=True, silent=True) or {}
+
+        max_age = params.get("max_age", -1)
+        # max_age might have the value of None, in which case calling int(None) will fail
+        if max_age is None:
+            max_age = -1
+        max_age = int(max_age)
+
+        dashboard = get_object_or_404(models.Dashboard.get_by_id_and_org, dashboard_id, self.current_org)
+        results = run_dashboard_queries(
+            dashboard.load_query_widgets(),
+            params.get("parameters") or {},
+            max_age,
+            stale_while_revalidate=bool(params.get("stale_while_revalidate", False)),
+        )
+
+        return {"results": results}
+
+
 class PublicDashboardResource(BaseResource):
     decorators = BaseResource.decorators + [csp_allows_embeding]
 
@@ -2,7 +2,7 @@ import unicodedata
 from urllib.parse import quote
 
 import regex
-from flask import make_response, request
+from flask import make_response, request, stream_with_context
 from flask_login import current_user
 from flask_restful import abort
 
@@ -25,13 +25,24 @@ from redash.permissions import (
 from redash.serializers import (
     serialize_job,
     serialize_query_result,
-    serialize_query_result_to_dsv,
+    serialize_query_result_page,
     serialize_query_result_to_xlsx,
+    stream_query_result_to_dsv,
+    stream_query_result_to_ndjson,
 )
 from redash.tasks import Job
 from redash.tasks.queries import enqueue_query
+from redash.tasks.queries.job_status import (
+    FAILED,
+    QUEUED,
+    STARTED,
+    publish_job_status,
+    wait_for_job_status,
+)
 from redash.utils import (
+    COMPACT_SEPARATORS,
     collect_parameters_from_request,
+    gen_query_hash,
     json_dumps,
     to_filename,
 )
@@ -56,9 +67,12 @@ error_messages = {
 }
 
 
-def run_query(query, parameters, data_source, query_id, should_apply_auto_limit, max_age=0):
+def _query_text(query, parameters, data_source, should_apply_auto_limit):
+    """Returns the text of the query to execute with the given parameters, or the error response explaining why it
+    can't be executed. Raises `InvalidParameterError` (or `QueryDetachedFromDataSourceError`) for invalid parameter
+    values."""
     if not data_source:
-        return error_messages["no_data_source"]
+        return None, error_messages["no_data_source"]
 
     if data_source.paused:
         if data_source.pause_reason:
@@ -66,29 +80,34 @@ def run_query(query, parameters, data_source, query_id, should_apply_auto_limit,
         else:
             message = "{} is paused. Please try later.".format(data_source.name)
 
-        return error_response(message)
+        return None, error_response(message)
 
-    try:
-        query.apply(parameters)
-    except (InvalidParameterError, QueryDetachedFromDataSourceError) as e:
-        abort(400, message=str(e))
+    query.apply(parameters)
 
     query_text = data_source.query_runner.apply_auto_limit(query.text, should_apply_auto_limit)
 
     if query.missing_params:
-        return error_response("Missing parameter value for: {}".format(", ".join(query.missing_params)))
+        return None, error_response("Missing parameter value for: {}".format(", ".join(query.missing_params)))
 
-    if max_age == 0:
-        query_result = None
+    return query_text, None
+
+
+def _execution_response(query_text, parameters, data_source, query_id, query_result, stale_result=None):
+    """Records the execution, and returns the query result if there is one, or enqueues the query (joining the job
+    already running it, if there is one) and returns its job along with the stale result if there is one."""
+    if query_result:
+        cache = "hit"
+    elif stale_result:
+        cache = "stale"
     else:
-        query_result = models.QueryResult.get_latest(data_source, query_text, max_age)
+        cache = "miss"
 
     record_event(
         current_user.org,
         current_user,
         {
             "action": "execute_query",
-            "cache": "hit" if query_result else "miss",
+            "cache": cache,
             "object_id": data_source.id,
             "object_type": "data_source",
             "query": query_text,
@@ -99,18 +118,119 @@ def run_query(query, parameters, data_source, query_id, should_apply_auto_limit,
 
     if query_result:
         return {"query_result": serialize_query_result(query_result, current_user.is_api_user())}
+
+    job = enqueue_query(
+        query_text,
+        data_source,
+        current_user.id,
+        current_user.is_api_user(),
+        metadata={
+            "Username": current_user.get_actual_user(),
+            "query_id": query_id,
+        },
+    )
+    response = serialize_job(job)
+
+    if stale_result:
+        response["query_result"] = serialize_query_result(stale_result, current_user.is_api_user())
+        response["stale"] = True
+
+    return response
+
+
+def run_query(
+    query, parameters, data_source, query_id, should_apply_auto_limit, max_age=0, stale_while_revalidate=False
+):
+    try:
+        query_text, error = _query_text(query, parameters, data_source, should_apply_auto_limit)
+    except (InvalidParameterError, QueryDetachedFromDataSourceError) as e:
+        abort(400, message=str(e))
+
+    if error:
+        return error
+
+    if max_age == 0:
+        query_result = None
     else:
-        job = enqueue_query(
+        query_result = models.QueryResult.get_latest(data_source, query_text, max_age, with_data=True)
+
+    # Without a recent enough result, return the newest one there is right away while a fresh one is being fetched.
+    # With a max_age of -1 the newest one was already looked up.
+    stale_result = None
+    if query_result is None and stale_while_revalidate and max_age != -1:
+        stale_result = models.QueryResult.get_latest(data_source, query_text, -1, with_data=True)
+
+    return _execution_response(query_text, parameters, data_source, query_id, query_result, stale_result)
+
+
+def run_dashboard_queries(widgets, parameters, max_age=-1, stale_while_revalidate=False):
+    """
+    Executes the queries of the given visualization widgets, with the parameter values of each (by widget id).
+
+    Access is checked once per data source, the latest results of all the queries are looked up together, and only
+    the queries without a recent enough result are enqueued (once each, however many widgets show them). Returns the
+    response of each widget by its id, as `run_query` would return it.
+    """
+    responses = {}
+    access = {}
+    executions = {}
+
+    for widget in widgets:
+        query = widget.visualization.query_rel
+        parameterized = query.parameterized
+
+        # API keys (e.g. of shared dashboards) are checked against each query.
+        access_key = query.id if current_user.is_api_user() else (query.data_source_id, parameterized.is_safe)
+        if access_key not in access:
+            access[access_key] = has_access(query, current_user, parameterized.is_safe)
+
+        if not access[access_key]:
+            if not parameterized.is_safe:
+                error = error_messages["unsafe_when_shared" if current_user.is_api_user() else "unsafe_on_view_only"]
+            else:
+                error = error_messages["no_permission"]
+            responses[widget.id] = error[0]
+            continue
+
+        widget_parameters = parameters.get(str(widget.id), {})
+        should_apply_auto_limit = query.options.get("apply_auto_limit", False)
+        try:
+            query_text, error = _query_text(
+                parameterized, widget_parameters, query.data_source, should_apply_auto_limit
+            )
+        except (InvalidParameterError, QueryDetachedFromDataSourceError) as e:
+            query_text, error = None, error_response(str(e))
+
+        if error:
+            responses[widget.id] = error[0]
+            continue
+
+        key = (query.data_source_id, gen_query_hash(query_text))
+        executions.setdefault(key, (query_text, widget_parameters, query, []))[3].append(widget.id)
+
+    query_results = {}
+    if max_age != 0:
+        query_results = models.QueryResult.get_latest_many(list(executions), max_age, with_data=True)
+
+    # As in `run_query`, with a max_age of -1 the newest results were already looked up.
+    stale_results = {}
+    misses = [key for key in executions if key not in query_results]
+    if misses and stale_while_revalidate and max_age != -1:
+        stale_results = models.QueryResult.get_latest_many(misses, -1, with_data=True)
+
+    for key, (query_text, widget_parameters, query, widget_ids) in executions.items():
+        response = _execution_response(
             query_text,
-            data_source,
-            current_user.id,
-            current_user.is_api_user(),
-            metadata={
-                "Username": current_user.get_actual_user(),
-                "query_id": query_id,
-            },
+            widget_parameters,
+            query.data_source,
+            query.id,
+            query_results.get(key),
+            stale_results.get(key),
         )
-        return serialize_job(job)
+        for widget_id in widget_ids:
+            responses[widget_id] = response
+
+    return responses
 
 
 def get_download_filename(query_result, query, filetype):
@@ -123,6 +243,19 @@ def get_download_filename(query_result, query, filetype):
     return "{}_{}.{}".format(filename, retrieved_at, filetype)
 
 
+def get_row_range():
+    offset = request.args.get("offset", 0, type=int)
+    limit = request.args.get("limit", None, type=int)
+
+    if offset < 0:
+        abort(400, message="Offset must be a non-negative integer.")
+
+    if limit is not None and limit < 1:
+        abort(400, message="Limit must be a positive integer.")
+
+    return offset, limit
+
+
 def content_disposition_filenames(attachment_filename):
     if not isinstance(attachment_filename, str):
         attachment_filename = attachment_filename.decode("utf-8")
@@ -248,6 +381,9 @@ class QueryResultResource(BaseResource):
                                 return them, otherwise execute the query; if omitted or -1, returns
                                 any cached result, or executes if not available. Set to zero to
                                 always execute.
+        :qparam boolean stale_while_revalidate: When the query is executed, also return its newest
+                                                cached result (if any), with `stale` set. The `job`
+                                                tells when the fresh result is ready.
         """
         params = request.get_json(force=True, silent=True) or {}
         parameter_values = params.get("parameters", {})
@@ -274,6 +410,7 @@ class QueryResultResource(BaseResource):
                 query_id,
                 should_apply_auto_limit,
                 max_age,
+                stale_while_revalidate=bool(params.get("stale_while_revalidate", False)),
             )
         else:
             if not query.parameterized.is_safe:
@@ -291,7 +428,9 @@ class QueryResultResource(BaseResource):
 
         :param number query_id: The ID of the query whose results should be fetched
         :param number query_result_id: the ID of the query result to fetch
-        :param string filetype: Format to return. One of 'json', 'xlsx', or 'csv'. Defaults to 'json'.
+        :param string filetype: Format to return. One of 'json', 'ndjson', 'xlsx', 'csv' or 'tsv'. Defaults to 'json'.
+        :qparam number offset: Index of the first row to return (json and ndjson only)
+        :qparam number limit: Maximum number of rows to return (json and ndjson only)
 
         :<json number id: Query result ID
         :<json string query: Query that produced this result
@@ -300,6 +439,8 @@ class QueryResultResource(BaseResource):
         :<json number data_source_id: ID of data source that produced this result
         :<json number runtime: Length of execution time in seconds
         :<json string retrieved_at: Query retrieval date/time, in ISO format
+        :<json object pagination: Offset, limit, total row count and the offset of the next page (only when `offset`
+                                  or `limit` are given)
         """
         # TODO:
         # This method handles two cases: retrieving result by id & retrieving result by query id.
@@ -311,7 +452,9 @@ class QueryResultResource(BaseResource):
         query = None
 
         if query_result_id:
-            query_result = get_object_or_404(models.QueryResult.get_by_id_and_org, query_result_id, self.current_org)
+            query_result = get_object_or_404(
+                models.QueryResult.get_by_id_and_org, query_result_id, self.current_org, with_data=True
+            )
 
         if query_id is not None:
             query = get_object_or_404(models.Query.get_by_id_and_org, query_id, self.current_org)
@@ -321,6 +464,7 @@ class QueryResultResource(BaseResource):
                     models.QueryResult.get_by_id_and_org,
                     query.latest_query_data_id,
                     self.current_org,
+                    with_data=True,
                 )
 
             if query is not None and query_result is not None and self.current_user.is_api_user():
@@ -352,6 +496,7 @@ class QueryResultResource(BaseResource):
 
             response_builders = {
                 "json": self.make_json_response,
+                "ndjson": self.make_ndjson_response,
                 "xlsx": self.make_excel_response,
                 "csv": self.make_csv_response,
                 "tsv": self.make_tsv_response,
@@ -376,19 +521,32 @@ class QueryResultResource(BaseResource):
 
     @staticmethod
     def make_json_response(query_result):
-        data = json_dumps({"query_result": query_result.to_dict()})
+        if "offset" in request.args or "limit" in request.args:
+            offset, limit = get_row_range()
+            data = {"query_result": serialize_query_result_page(query_result, offset, limit)}
+        else:
+            data = {"query_result": query_result.to_dict()}
+        data = json_dumps(data, separators=COMPACT_SEPARATORS)
         headers = {"Content-Type": "application/json"}
         return make_response(data, 200, headers)
 
+    @staticmethod
+    def make_ndjson_response(query_result):
+        offset, limit = get_row_range()
+        headers = {"Content-Type": "application/x-ndjson"}
+        return make_response(
+            stream_with_context(stream_query_result_to_ndjson(query_result, offset, limit)), 200, headers
+        )
+
     @staticmethod
     def make_csv_response(query_result):
         headers = {"Content-Type": "text/csv; charset=UTF-8"}
-        return make_response(serialize_query_result_to_dsv(query_result, ","), 200, headers)
+        return make_response(stream_with_context(stream_query_result_to_dsv(query_result, ",")), 200, headers)
 
     @staticmethod
     def make_tsv_response(query_result):
         headers = {"Content-Type": "text/tab-separated-values; charset=UTF-8"}
-        return make_response(serialize_query_result_to_dsv(query_result, "\t"), 200, headers)
+        return make_response(stream_with_context(stream_query_result_to_dsv(query_result, "\t")), 200, headers)
 
     @staticmethod
     def make_excel_response(query_result):
@@ -400,9 +558,20 @@ class JobResource(BaseResource):
     def get(self, job_id, query_id=None):
         """
         Retrieve info about a running query job.
+
+        :qparam number status: The job status the client already knows
+        :qparam number wait: Seconds to wait for the job's status to change from `status` before responding (capped
+                             by `REDASH_JOB_STATUS_MAX_WAIT`), instead of polling the job
         """
         job = Job.fetch(job_id)
-        return serialize_job(job)
+        response = serialize_job(job)
+
+        known_status = request.args.get("status", type=int)
+        wait = min(request.args.get("wait", 0, type=float), settings.JOB_STATUS_MAX_WAIT)
+        if wait > 0 and known_status in (QUEUED, STARTED) and response["job"]["status"] == known_status:
+            response = wait_for_job_status(job_id, known_status, wait) or serialize_job(Job.fetch(job_id))
+
+        return response
 
     def delete(self, job_id):
         """
@@ -410,3 +579,4 @@ class JobResource(BaseResource):
         """
         job = Job.fetch(job_id)
         job.cancel()
+        publish_job_status(job_id, FAILED, error="Query cancelled by user.")
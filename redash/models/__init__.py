@@ -1,23 +1,44 @@
 import calendar
 import datetime
+import hashlib
 import logging
 import numbers
 import re
 import time
+from collections import Counter
+from contextlib import closing
 
 import pytz
-from sqlalchemy import UniqueConstraint, and_, cast, distinct, func, or_
+from sqlalchemy import (
+    UniqueConstraint,
+    and_,
+    bindparam,
+    cast,
+    distinct,
+    exists,
+    func,
+    or_,
+    select,
+    tuple_,
+)
 from sqlalchemy.dialects.postgresql import ARRAY, DOUBLE_PRECISION, JSONB
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.event import listens_for
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import (
+    Load,
     backref,
     contains_eager,
+    deferred,
     joinedload,
     load_only,
     subqueryload,
+    undefer,
 )
+from sqlalchemy.orm import Session as SASession
+from sqlalchemy.orm.attributes import flag_modified, get_history, set_committed_value
 from sqlalchemy.orm.exc import NoResultFound  # noqa: F401
+from sqlalchemy.orm.util import identity_key
 from sqlalchemy_utils import generic_relationship
 from sqlalchemy_utils.models import generic_repr
 from sqlalchemy_utils.types import TSVectorType
@@ -29,6 +50,7 @@ from redash.destinations import (
     get_destination,
 )
 from redash.metrics import database  # noqa: F401
+from redash.models import permissions_cache, result_cache, search
 from redash.models.base import (
     Column,
     GFKBase,
@@ -45,6 +67,7 @@ from redash.models.parameterized_query import (
     InvalidParameterError,
     ParameterizedQuery,
     QueryDetachedFromDataSourceError,
+    invalidate_dropdown_options,
 )
 from redash.models.types import (
     Configuration,
@@ -52,6 +75,7 @@ from redash.models.types import (
     JSONText,
     MutableDict,
     MutableList,
+    QueryResultData,
     json_cast_property,
 )
 from redash.models.users import (  # noqa
@@ -80,7 +104,14 @@ from redash.utils import (
     mustache_render_escape,
     sentry,
 )
+from redash.utils.blob_store import blob_store_for, get_blob_store
+from redash.utils.column_stats import compute_column_stats
 from redash.utils.configuration import ConfigurationContainer
+from redash.utils.result_encoding import (
+    decode_result,
+    decode_result_stream,
+    encode_result,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -91,8 +122,14 @@ class ScheduledQueriesExecutions:
     def __init__(self):
         self.executions = {}
 
-    def refresh(self):
-        self.executions = redis_connection.hgetall(self.KEY_NAME)
+    def refresh(self, query_ids=None):
+        if query_ids is None:
+            self.executions = redis_connection.hgetall(self.KEY_NAME)
+        elif query_ids:
+            timestamps = redis_connection.hmget(self.KEY_NAME, [str(query_id) for query_id in query_ids])
+            self.executions = {str(query_id): t for query_id, t in zip(query_ids, timestamps) if t is not None}
+        else:
+            self.executions = {}
 
     def update(self, query_id):
         redis_connection.hset(self.KEY_NAME, mapping={query_id: time.time()})
@@ -107,6 +144,9 @@ class ScheduledQueriesExecutions:
 
 scheduled_queries_executions = ScheduledQueriesExecutions()
 
+# `Query.next_run_at` of queries that won't run unless their schedule changes.
+SCHEDULE_NEVER = datetime.datetime(9999, 12, 31, tzinfo=pytz.utc)
+
 
 @generic_repr("id", "name", "type", "org_id", "created_at")
 class DataSource(BelongsToOrgMixin, db.Model):
@@ -195,7 +235,11 @@ class DataSource(BelongsToOrgMixin, db.Model):
 
     def delete(self):
         Query.query.filter(Query.data_source == self).update(dict(data_source_id=None, latest_query_data_id=None))
+        blob_hashes = [
+            blob_hash for blob_hash, in db.session.query(QueryResult.blob_hash).filter(QueryResult.data_source == self)
+        ]
         QueryResult.query.filter(QueryResult.data_source == self).delete()
+        QueryResultBlob.release(db.session, blob_hashes)
         res = db.session.delete(self)
         db.session.commit()
 
@@ -262,6 +306,7 @@ class DataSource(BelongsToOrgMixin, db.Model):
 
     def remove_group(self, group):
         DataSourceGroup.query.filter(DataSourceGroup.group == group, DataSourceGroup.data_source == self).delete()
+        permissions_cache.changed(db.session)
         db.session.commit()
 
     def update_group_permission(self, group, view_only):
@@ -280,6 +325,9 @@ class DataSource(BelongsToOrgMixin, db.Model):
 
         if self.uses_ssh_tunnel:
             query_runner = with_ssh_tunnel(query_runner, self.options.get("ssh_tunnel"))
+        elif query_runner is not None:
+            # Connections through SSH tunnels can't be pooled, as the tunnel is closed after each query.
+            query_runner.data_source_id = self.id
 
         return query_runner
 
@@ -290,8 +338,25 @@ class DataSource(BelongsToOrgMixin, db.Model):
     # XXX examine call sites to see if a regular SQLA collection would work better
     @property
     def groups(self):
-        groups = DataSourceGroup.query.filter(DataSourceGroup.data_source == self)
-        return dict([(group.group_id, group.view_only) for group in groups])
+        if self.id is None:
+            return {}
+
+        def load():
+            groups = DataSourceGroup.query.filter(DataSourceGroup.data_source_id == self.id)
+            return [(group.group_id, group.view_only) for group in groups]
+
+        return dict(permissions_cache.get_or_load("data_source_groups", self.id, load))
+
+    @classmethod
+    def groups_by_data_source(cls, data_source_ids):
+        """Returns the `groups` of each of the given data sources, with a single query."""
+        groups = {data_source_id: {} for data_source_id in data_source_ids if data_source_id is not None}
+        if not groups:
+            return groups
+
+        for group in DataSourceGroup.query.filter(DataSourceGroup.data_source_id.in_(groups.keys())):
+            groups[group.data_source_id][group.group_id] = group.view_only
+        return groups
 
 
 @generic_repr("id", "data_source_id", "group_id", "view_only")
@@ -308,6 +373,133 @@ class DataSourceGroup(db.Model):
     __table_args__ = ({"extend_existing": True},)
 
 
+@listens_for(DataSourceGroup, "after_insert")
+@listens_for(DataSourceGroup, "after_update")
+@listens_for(DataSourceGroup, "after_delete")
+def data_source_group_changed(mapper, connection, target):
+    permissions_cache.changed(db.session)
+
+
+@generic_repr("content_hash", "refcount", "size", "store")
+class QueryResultBlob(db.Model):
+    """
+    The stored payload of query results, shared by all the results with the same content. `refcount` is the number of
+    query results that reference it, and the blob is deleted when it drops to zero.
+
+    Large payloads are offloaded to an external store (see `redash.utils.blob_store`), in which case the blob only
+    keeps the store name and the payload's key in it.
+    """
+
+    # sha256 of the encoded payload the blob was first stored with.
+    content_hash = Column(db.String(64), primary_key=True)
+    # Payloads are only loaded when they're used, see `QueryResult.with_data`.
+    _data = deferred(Column("data", QueryResultData, nullable=True))
+    store = Column(db.String(32), nullable=True)
+    location = Column(db.String(255), nullable=True)
+    size = Column(db.BigInteger, nullable=True)
+    refcount = Column(db.Integer, nullable=False, default=0)
+
+    __tablename__ = "query_result_blobs"
+
+    # Session.info key of the offloaded payloads to delete once the transaction that released them commits.
+    RELEASED_PAYLOADS = "released_query_result_payloads"
+    # Session.info key of the payloads offloaded by the current transaction, to delete if it's rolled back.
+    STORED_PAYLOADS = "stored_query_result_payloads"
+
+    @property
+    def data(self):
+        if self.store is None:
+            return self._data
+
+        # Payloads never change, so it's safe to keep the decoded one for as long as the instance lives.
+        if "_offloaded_data" not in self.__dict__:
+            with closing(get_blob_store(self.store).open(self.location)) as payload:
+                self._offloaded_data = decode_result_stream(payload)
+
+        return self._offloaded_data
+
+    @staticmethod
+    def hash_payload(payload):
+        return hashlib.sha256(payload).hexdigest()
+
+    @classmethod
+    def acquire(cls, connection, content_hash, payload):
+        """Adds a reference to the blob of `payload`, storing it if it doesn't exist yet."""
+        table = cls.__table__
+        referenced = connection.execute(
+            table.update().where(table.c.content_hash == content_hash).values(refcount=table.c.refcount + 1)
+        ).rowcount
+
+        # Identical payloads only need the update above, without sending the payload again.
+        if referenced:
+            return
+
+        values = {"content_hash": content_hash, "refcount": 1, "size": len(payload), "data": payload}
+        store = blob_store_for(payload)
+        if store is not None:
+            location = store.new_key(content_hash)
+            store.put(location, payload)
+            stored = (store.name, location)
+            db.session.info.setdefault(cls.STORED_PAYLOADS, []).append(stored)
+            values.update(data=None, store=store.name, location=location)
+
+        insert_blob = pg_insert(table).values(**values)
+        stored_location = connection.execute(
+            insert_blob.on_conflict_do_update(
+                index_elements=[table.c.content_hash], set_={"refcount": table.c.refcount + 1}
+            ).returning(table.c.location)
+        ).scalar()
+
+        # Another transaction stored the same payload meanwhile.
+        if store is not None and stored_location != values["location"]:
+            store.delete(values["location"])
+            db.session.info[cls.STORED_PAYLOADS].remove(stored)
+
+    @classmethod
+    def release(cls, connection, content_hashes):
+        """Removes a reference to each of the given blobs (a hash can be repeated), deleting the unreferenced ones."""
+        counts = Counter(content_hash for content_hash in content_hashes if content_hash is not None)
+        if not counts:
+            return
+
+        table = cls.__table__
+        connection.execute(
+            table.update()
+            .where(table.c.content_hash == bindparam("released_hash"))
+            .values(refcount=table.c.refcount - bindparam("released_count")),
+            [{"released_hash": content_hash, "released_count": count} for content_hash, count in counts.items()],
+        )
+        deleted = connection.execute(
+            table.delete()
+            .where(and_(table.c.content_hash.in_(list(counts)), table.c.refcount <= 0))
+            .returning(table.c.store, table.c.location)
+        ).fetchall()
+
+        offloaded = [(row.store, row.location) for row in deleted if row.store is not None]
+        if offloaded:
+            db.session.info.setdefault(cls.RELEASED_PAYLOADS, []).extend(offloaded)
+
+
+def _delete_payloads(payloads):
+    for store, location in payloads:
+        try:
+            get_blob_store(store).delete(location)
+        except Exception:
+            logging.exception("Failed deleting query result payload %s from the %s store.", location, store)
+
+
+@listens_for(SASession, "after_commit")
+def delete_released_payloads(session):
+    session.info.pop(QueryResultBlob.STORED_PAYLOADS, None)
+    _delete_payloads(session.info.pop(QueryResultBlob.RELEASED_PAYLOADS, []))
+
+
+@listens_for(SASession, "after_rollback")
+def delete_stored_payloads(session):
+    session.info.pop(QueryResultBlob.RELEASED_PAYLOADS, None)
+    _delete_payloads(session.info.pop(QueryResultBlob.STORED_PAYLOADS, []))
+
+
 @generic_repr("id", "org_id", "data_source_id", "query_hash", "runtime", "retrieved_at")
 class QueryResult(db.Model, BelongsToOrgMixin):
     id = primary_key("QueryResult")
@@ -317,15 +509,79 @@ class QueryResult(db.Model, BelongsToOrgMixin):
     data_source = db.relationship(DataSource, backref=backref("query_results"))
     query_hash = Column(db.String(32), index=True)
     query_text = Column("query", db.Text)
-    data = Column(JSONText, nullable=True)
+    # Only set for results stored before payloads were deduplicated into blobs. Like the blobs' payloads, it's only
+    # loaded when it's used, see `with_data`.
+    _data = deferred(Column("data", QueryResultData, nullable=True))
+    # The JSON text of results stored before payloads were binary, until `manage.py query_results reencode` moves it
+    # to `_data`.
+    _legacy_data = deferred(Column("legacy_data", JSONText, nullable=True))
+    blob_hash = Column(db.String(64), db.ForeignKey("query_result_blobs.content_hash"), nullable=True, index=True)
+    blob = db.relationship(QueryResultBlob, viewonly=True)
+    # See `redash.utils.column_stats`.
+    column_stats = Column(JSONB, nullable=True)
     runtime = Column(DOUBLE_PRECISION)
     retrieved_at = Column(db.DateTime(True))
 
     __tablename__ = "query_results"
+    # Lets the cleanup walk the table by id and check the results' age without reading the (large) rows.
+    __table_args__ = (db.Index("ix_query_results_id_retrieved_at", "id", "retrieved_at"),)
 
     def __str__(self):
         return "%d | %s | %s" % (self.id, self.query_hash, self.retrieved_at)
 
+    @property
+    def data(self):
+        if self.blob_hash is None:
+            return self._data if self._data is not None else self._legacy_data
+
+        # The data this instance was given, as long as it's still the result's data.
+        content_hash, data = self.__dict__.get("_blob_data", (None, None))
+        if content_hash == self.blob_hash:
+            return data
+
+        return self.blob.data
+
+    @data.setter
+    def data(self, data):
+        self._data = None
+        self._legacy_data = None
+        if data is None:
+            self.blob_hash = None
+            return
+
+        # The blob is stored (or referenced) when the result gets flushed, see `store_query_result_blob`.
+        payload = encode_result(data)
+        content_hash = QueryResultBlob.hash_payload(payload)
+        if content_hash != self.blob_hash:
+            self.blob_hash = content_hash
+            self._blob_payload = payload
+        self._blob_data = (content_hash, data)
+        # Kept past the flush (unlike `_blob_payload`), for the results cache.
+        self._blob_encoded = (content_hash, payload)
+
+    @classmethod
+    def with_data(cls, relationship=None):
+        """Returns the loader options that load the results' data along with them, instead of when it's first used.
+
+        `relationship` is the one the results are loaded through, e.g. `QueryResult.with_data(Query.latest_query_data)`.
+        """
+        if relationship is not None:
+            results = joinedload(relationship)
+        else:
+            results = Load(cls)
+        return [
+            results.undefer(cls._data),
+            results.undefer(cls._legacy_data),
+            results.joinedload(cls.blob).undefer(QueryResultBlob._data),
+        ]
+
+    @classmethod
+    def get_by_id_and_org(cls, object_id, org, with_data=False):
+        query = cls.query.filter(cls.id == object_id, cls.org == org)
+        if with_data:
+            query = query.options(*cls.with_data())
+        return query.one()
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -345,28 +601,148 @@ class QueryResult(db.Model, BelongsToOrgMixin):
         )
 
     @classmethod
-    def get_latest(cls, data_source, query, max_age=0):
-        query_hash = gen_query_hash(query)
-
+    def delete_unused(cls, after_id, limit, age_threshold, until_id=None):
+        """Deletes the unused results (that aren't the latest result of any query) retrieved before `age_threshold`,
+        among the `limit` results following `after_id` (and up to `until_id`).
+
+        Returns the number of deleted results, the id of the last result that was looked at (None if there are no
+        results in the range) and whether all the results that were looked at are newer than `age_threshold`.
+        """
+        results = cls.__table__
+        batch = select([results.c.id, results.c.retrieved_at]).where(results.c.id > after_id)
+        if until_id is not None:
+            batch = batch.where(results.c.id <= until_id)
+        rows = db.session.execute(batch.order_by(results.c.id).limit(limit)).fetchall()
+
+        if not rows:
+            return 0, None, False
+
+        old_ids = [row.id for row in rows if row.retrieved_at is not None and row.retrieved_at < age_threshold]
+        if not old_ids:
+            return 0, rows[-1].id, True
+
+        in_use = exists().where(Query.__table__.c.latest_query_data_id == results.c.id)
+        deleted = db.session.execute(
+            results.delete().where(results.c.id.in_(old_ids)).where(~in_use).returning(results.c.blob_hash)
+        ).fetchall()
+        QueryResultBlob.release(db.session, [row.blob_hash for row in deleted])
+        return len(deleted), rows[-1].id, False
+
+    @staticmethod
+    def _max_age(max_age):
         if max_age == -1 and settings.QUERY_RESULTS_EXPIRED_TTL_ENABLED:
-            max_age = settings.QUERY_RESULTS_EXPIRED_TTL
+            return settings.QUERY_RESULTS_EXPIRED_TTL
+        return max_age
 
-        if max_age == -1:
-            query = cls.query.filter(cls.query_hash == query_hash, cls.data_source == data_source)
-        else:
-            query = cls.query.filter(
-                cls.query_hash == query_hash,
-                cls.data_source == data_source,
-                (
-                    db.func.timezone("utc", cls.retrieved_at) + datetime.timedelta(seconds=max_age)
-                    >= db.func.timezone("utc", db.func.now())
-                ),
+    @classmethod
+    def _recent(cls, max_age, with_data):
+        max_age = cls._max_age(max_age)
+
+        query = cls.query
+        if max_age != -1:
+            query = query.filter(
+                db.func.timezone("utc", cls.retrieved_at) + datetime.timedelta(seconds=max_age)
+                >= db.func.timezone("utc", db.func.now())
             )
 
-        return query.order_by(cls.retrieved_at.desc()).first()
+        if with_data:
+            query = query.options(*cls.with_data())
+
+        return query
+
+    @classmethod
+    def _get_cached_latest(cls, queries, max_age, with_data):
+        """Returns the latest results of the (data source id, query hash) pairs that have recent enough ones in the
+        results cache, by pair."""
+        max_age = cls._max_age(max_age)
+        entries = {query: entry for query, entry in result_cache.get_many(queries).items() if entry.is_recent(max_age)}
+        if not entries:
+            return {}
+
+        payloads = result_cache.get_payloads([entry.blob_hash for entry in entries.values()]) if with_data else {}
+        # The results with cached payloads don't need to load their data.
+        cached_ids = [entry.id for entry in entries.values() if entry.blob_hash in payloads]
+        other_ids = [entry.id for entry in entries.values() if entry.blob_hash not in payloads]
+
+        results = []
+        if cached_ids:
+            results.extend(cls.query.filter(cls.id.in_(cached_ids)))
+        if other_ids:
+            query = cls.query.filter(cls.id.in_(other_ids))
+            if with_data:
+                query = query.options(*cls.with_data())
+            results.extend(query)
+
+        latest = {}
+        for result in results:
+            query = (result.data_source_id, result.query_hash)
+            if query in entries and entries[query].id == result.id:
+                if result.blob_hash in payloads and "_blob_data" not in result.__dict__:
+                    result._blob_data = (result.blob_hash, decode_result(payloads[result.blob_hash]))
+                latest[query] = result
+
+        # The results that were deleted since they were cached.
+        result_cache.forget([query for query in entries if query not in latest])
+
+        return latest
+
+    def cache(self):
+        """Caches the result as the latest one of its query, along with its payload if this instance stored it."""
+        content_hash, payload = self.__dict__.get("_blob_encoded", (None, None))
+        result_cache.store(
+            self.data_source_id,
+            self.query_hash,
+            self.id,
+            self.retrieved_at,
+            self.blob_hash,
+            payload if content_hash == self.blob_hash else None,
+        )
 
     @classmethod
-    def store_result(cls, org, data_source, query_hash, query, data, run_time, retrieved_at):
+    def get_latest(cls, data_source, query, max_age=0, with_data=False):
+        query_hash = gen_query_hash(query)
+
+        cached = cls._get_cached_latest([(data_source.id, query_hash)], max_age, with_data)
+        if cached:
+            return cached[(data_source.id, query_hash)]
+
+        query = cls._recent(max_age, with_data).filter(cls.query_hash == query_hash, cls.data_source == data_source)
+        result = query.order_by(cls.retrieved_at.desc()).first()
+
+        if result is not None:
+            result.cache()
+
+        return result
+
+    @classmethod
+    def get_latest_many(cls, queries, max_age=0, with_data=False):
+        """Like `get_latest`, for many (data source id, query hash) pairs at once.
+
+        Returns the latest result of each pair that has a recent enough one, by pair."""
+        queries = list(set(queries))
+        if not queries:
+            return {}
+
+        latest = cls._get_cached_latest(queries, max_age, with_data)
+        misses = [query for query in queries if query not in latest]
+        if not misses:
+            return latest
+
+        query = (
+            cls._recent(max_age, with_data)
+            .filter(tuple_(cls.data_source_id, cls.query_hash).in_(misses))
+            .distinct(cls.data_source_id, cls.query_hash)
+            .order_by(cls.data_source_id, cls.query_hash, cls.retrieved_at.desc())
+        )
+
+        for result in query:
+            result.cache()
+            latest[(result.data_source_id, result.query_hash)] = result
+
+        return latest
+
+    @classmethod
+    def store_result(cls, org, data_source, query_hash, query, data, run_time, retrieved_at, column_stats=None):
         query_result = cls(
             org_id=org,
             query_hash=query_hash,
@@ -375,6 +751,7 @@ class QueryResult(db.Model, BelongsToOrgMixin):
             data_source=data_source,
             retrieved_at=retrieved_at,
             data=data,
+            column_stats=column_stats,
         )
 
         db.session.add(query_result)
@@ -392,6 +769,14 @@ def should_schedule_next(previous_iteration, now, interval, time=None, day_of_we
     # so we should schedule it immediately
     if previous_iteration is None:
         return True
+
+    next_iteration = next_scheduled_iteration(previous_iteration, interval, time, day_of_week, failures)
+    return next_iteration is not None and now > next_iteration
+
+
+def next_scheduled_iteration(previous_iteration, interval, time=None, day_of_week=None, failures=0):
+    """Returns the time after which a query that last ran at `previous_iteration` should run again, or None if the
+    failures backoff pushed it past the representable range."""
     # if time exists then interval > 23 hours (82800s)
     # if day_of_week exists then interval > 6 days (518400s)
     if time is None:
@@ -423,8 +808,8 @@ def should_schedule_next(previous_iteration, now, interval, time=None, day_of_we
         try:
             next_iteration += datetime.timedelta(minutes=2**failures)
         except OverflowError:
-            return False
-    return now > next_iteration
+            return None
+    return next_iteration
 
 
 @gfk_type
@@ -450,7 +835,9 @@ class Query(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model):
     org = db.relationship(Organization, backref="queries")
     data_source_id = Column(key_type("DataSource"), db.ForeignKey("data_sources.id"), nullable=True)
     data_source = db.relationship(DataSource, backref="queries")
-    latest_query_data_id = Column(key_type("QueryResult"), db.ForeignKey("query_results.id"), nullable=True)
+    latest_query_data_id = Column(
+        key_type("QueryResult"), db.ForeignKey("query_results.id"), nullable=True, index=True
+    )
     latest_query_data = db.relationship(QueryResult)
     name = Column(db.String(255))
     description = Column(db.String(4096), nullable=True)
@@ -466,6 +853,9 @@ class Query(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model):
     schedule = Column(MutableDict.as_mutable(JSONB), nullable=True)
     interval = json_cast_property(db.Integer, "schedule", "interval", default=0)
     schedule_failures = Column(db.Integer, default=0)
+    # The earliest time the query might be due for a scheduled run (see `outdated_queries`). It's reset whenever
+    # anything that affects the schedule changes.
+    next_run_at = Column(db.DateTime(True), nullable=True)
     visualizations = db.relationship("Visualization", cascade="all, delete-orphan")
     options = Column(MutableDict.as_mutable(JSONB), default={})
     search_vector = Column(
@@ -483,6 +873,11 @@ class Query(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model):
     query_class = SearchBaseQuery
     __tablename__ = "queries"
     __mapper_args__ = {"version_id_col": version, "version_id_generator": False}
+    # Only covers scheduled queries, so unscheduled ones (which never get a `next_run_at`) don't match the scheduler's
+    # lookup of due queries.
+    __table_args__ = (
+        db.Index("ix_queries_next_run_at", next_run_at, postgresql_where=func.jsonb_typeof(schedule) != "null"),
+    )
 
     def __str__(self):
         return str(self.id)
@@ -591,47 +986,61 @@ class Query(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model):
 
     @classmethod
     def outdated_queries(cls):
+        """Returns the scheduled queries that are due to run.
+
+        Only queries whose `next_run_at` has passed (or isn't known yet) are evaluated. The next run time of the ones
+        that aren't due is stored back, so they are skipped until then. The caller is responsible for committing it.
+        """
+        now = utils.utcnow()
         queries = (
             Query.query.options(joinedload(Query.latest_query_data).load_only("retrieved_at"))
+            # Matches the predicate of the `next_run_at` index, so both conditions can be looked up with it.
             .filter(func.jsonb_typeof(Query.schedule) != "null")
+            .filter(or_(Query.next_run_at.is_(None), Query.next_run_at <= now))
             .order_by(Query.id)
             .all()
         )
 
-        now = utils.utcnow()
         outdated_queries = {}
-        scheduled_queries_executions.refresh()
+        next_runs = {}
+        scheduled_queries_executions.refresh([query.id for query in queries])
 
         for query in queries:
             try:
                 if query.schedule.get("disabled"):
+                    next_runs[query.id] = SCHEDULE_NEVER
                     continue
 
                 # Skip queries that have None for all schedule values. It's unclear whether this
                 # something that can happen in practice, but we have a test case for it.
                 if all(value is None for value in query.schedule.values()):
+                    next_runs[query.id] = SCHEDULE_NEVER
                     continue
 
                 if query.schedule["until"]:
                     schedule_until = pytz.utc.localize(datetime.datetime.strptime(query.schedule["until"], "%Y-%m-%d"))
 
                     if schedule_until <= now:
+                        next_runs[query.id] = SCHEDULE_NEVER
                         continue
 
                 retrieved_at = scheduled_queries_executions.get(query.id) or (
                     query.latest_query_data and query.latest_query_data.retrieved_at
                 )
-
-                if should_schedule_next(
+                # A query that has never run is due right away.
+                next_iteration = retrieved_at and next_scheduled_iteration(
                     retrieved_at,
-                    now,
                     query.schedule["interval"],
                     query.schedule["time"],
                     query.schedule["day_of_week"],
                     query.schedule_failures,
-                ):
+                )
+
+                if retrieved_at is None or (next_iteration is not None and now > next_iteration):
                     key = "{}:{}".format(query.query_hash, query.data_source_id)
                     outdated_queries[key] = query
+                else:
+                    next_runs[query.id] = next_iteration or SCHEDULE_NEVER
             except Exception as e:
                 query.schedule["disabled"] = True
                 db.session.commit()
@@ -643,8 +1052,43 @@ class Query(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model):
                 logging.info(message)
                 sentry.capture_exception(type(e)(message).with_traceback(e.__traceback__))
 
+        cls._store_next_runs(next_runs)
         return list(outdated_queries.values())
 
+    @classmethod
+    def _store_next_runs(cls, next_runs):
+        if not next_runs:
+            return
+
+        # Bypass the ORM, so this doesn't count as a modification of the queries (`updated_at`, version, etc.).
+        table = cls.__table__
+        db.session.execute(
+            table.update().where(table.c.id == bindparam("query_id")).values(next_run_at=bindparam("next_run")),
+            [{"query_id": query_id, "next_run": next_run} for query_id, next_run in next_runs.items()],
+        )
+        for query_id, next_run in next_runs.items():
+            query = db.session.identity_map.get(identity_key(cls, query_id))
+            if query is not None:
+                set_committed_value(query, "next_run_at", next_run)
+
+    @classmethod
+    def _search_conditions(cls, tokens):
+        fields = {"name": cls.name, "query": cls.query_text, "description": cls.description}
+        default_fields = [cls.name, cls.description]
+
+        conditions = []
+        text_tokens = []
+        for field, value in tokens:
+            if field == "id":
+                if value.isdigit():
+                    conditions.append(cls.id == int(value))
+                    continue
+                field = None
+            text_tokens.append((field, value))
+
+        conditions.append(search.like_conditions(text_tokens, fields, default_fields))
+        return conditions, search.rank(text_tokens, fields, default_fields)
+
     @classmethod
     def _do_multi_byte_search(cls, all_queries, term, limit=None):
         # term examples:
@@ -655,32 +1099,27 @@ class Query(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model):
         #    - name:"multiple words"
         #    - word1 word2 word3
         #    - word1 "multiple word" query:"select foo"
-        tokens = re.findall(r'(?:([^:\s]+):)?(?:"([^"]+)"|(\S+))', term)
-        conditions = []
-        for token in tokens:
-            key = None
-            if token[0]:
-                key = token[0]
+        tokens, _ = search.parse_term(term, ["id", "name", "query", "description"])
+        conditions, rank = cls._search_conditions(tokens)
+        order = [rank.desc()] if rank is not None else []
 
-            if token[1]:
-                value = token[1]
-            else:
-                value = token[2]
-
-            pattern = f"%{value}%"
-
-            if key == "id" and value.isdigit():
-                conditions.append(cls.id.equal(int(value)))
-            elif key == "name":
-                conditions.append(cls.name.ilike(pattern))
-            elif key == "query":
-                conditions.append(cls.query_text.ilike(pattern))
-            elif key == "description":
-                conditions.append(cls.description.ilike(pattern))
-            else:
-                conditions.append(or_(cls.name.ilike(pattern), cls.description.ilike(pattern)))
+        return all_queries.filter(*conditions).order_by(*order, Query.id).limit(limit)
+
+    @classmethod
+    def _do_full_text_search(cls, all_queries, term, limit=None):
+        # Tokens scoped to a field (e.g. name:word) filter on that field, the rest of the term is searched for in the
+        # search vector.
+        tokens, text = search.parse_term(term, ["name", "query", "description"])
+        scoped_tokens = [(field, value) for field, value in tokens if field]
+        if scoped_tokens:
+            conditions, rank = cls._search_conditions(scoped_tokens)
+            all_queries = all_queries.filter(*conditions)
 
-        return all_queries.filter(and_(*conditions)).order_by(Query.id).limit(limit)
+        if text.strip() or not scoped_tokens:
+            # sort the result using the weight as defined in the search vector column
+            return all_queries.search(text, sort=True).limit(limit)
+
+        return all_queries.order_by(rank.desc(), Query.id).limit(limit)
 
     @classmethod
     def search(
@@ -704,8 +1143,7 @@ class Query(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model):
             # Since tsvector doesn't work well with CJK languages, use `ilike` too
             return cls._do_multi_byte_search(all_queries, term, limit)
 
-        # sort the result using the weight as defined in the search vector column
-        return all_queries.search(term, sort=True).limit(limit)
+        return cls._do_full_text_search(all_queries, term, limit)
 
     @classmethod
     def search_by_user(cls, term, user, limit=None, multi_byte_search=False):
@@ -713,7 +1151,7 @@ class Query(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model):
             # Since tsvector doesn't work well with CJK languages, use `ilike` too
             return cls._do_multi_byte_search(cls.by_user(user), term, limit)
 
-        return cls.by_user(user).search(term, sort=True).limit(limit)
+        return cls._do_full_text_search(cls.by_user(user), term, limit)
 
     @classmethod
     def recent(cls, group_ids, user_id=None, limit=20):
@@ -779,12 +1217,17 @@ class Query(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model):
             Query.is_archived.is_(False),
         )
 
+        replaced_result_ids = set()
         for q in queries:
+            replaced_result_ids.add(q.latest_query_data_id)
             q.latest_query_data = query_result
             # don't auto-update the updated_at timestamp
             q.skip_updated_at = True
             db.session.add(q)
 
+        # Options of dropdowns based on these queries are parsed from their latest results.
+        invalidate_dropdown_options(replaced_result_ids - {query_result.id})
+
         query_ids = [q.id for q in queries]
         logging.info(
             "Updated %s queries with result (%s).",
@@ -896,6 +1339,37 @@ def query_last_modified_by(target, val, oldval, initiator):
     target.last_modified_by_id = val
 
 
+@listens_for(Query.schedule, "set")
+@listens_for(Query.schedule, "modified")
+@listens_for(Query.schedule_failures, "set")
+@listens_for(Query.latest_query_data, "set")
+@listens_for(Query.latest_query_data_id, "set")
+def reset_next_run(target, *args):
+    target.next_run_at = None
+    # The stored value might differ from the loaded one (it's updated outside of the ORM), make sure it's written.
+    flag_modified(target, "next_run_at")
+
+
+@listens_for(QueryResult, "before_insert")
+@listens_for(QueryResult, "before_update")
+def store_query_result_blob(mapper, connection, target):
+    payload = target.__dict__.pop("_blob_payload", None)
+    if payload is None:
+        return
+
+    QueryResultBlob.acquire(connection, target.blob_hash, payload)
+
+
+@listens_for(QueryResult, "after_update")
+def release_replaced_query_result_blob(mapper, connection, target):
+    QueryResultBlob.release(connection, get_history(target, "blob_hash").deleted)
+
+
+@listens_for(QueryResult, "after_delete")
+def release_query_result_blob(mapper, connection, target):
+    QueryResultBlob.release(connection, [target.blob_hash])
+
+
 @generic_repr("id", "object_type", "object_id", "user_id", "org_id")
 class Favorite(TimestampMixin, db.Model):
     id = primary_key("Favorite")
@@ -1012,11 +1486,27 @@ class Alert(TimestampMixin, BelongsToOrgMixin, db.Model):
     def get_by_id_and_org(cls, object_id, org):
         return super(Alert, cls).get_by_id_and_org(object_id, org, Query)
 
+    def _column_stats(self):
+        query_result = self.query_rel.latest_query_data
+        if query_result is None:
+            return None, None
+
+        column = self.options.get("column")
+        result_stats = query_result.column_stats
+        # Results stored before their stats were computed.
+        if result_stats is None:
+            result_stats = compute_column_stats(query_result.data, [column])
+
+        if result_stats is None:
+            return None, None
+
+        return result_stats["row_count"], result_stats["columns"].get(column)
+
     def evaluate(self):
-        data = self.query_rel.latest_query_data.data if self.query_rel.latest_query_data else None
+        row_count, stats = self._column_stats()
         new_state = self.UNKNOWN_STATE
 
-        if data and data["rows"] and self.options["column"] in data["rows"][0]:
+        if row_count and stats is not None and stats["present"]:
             op = OPERATORS.get(self.options["op"], lambda v, t: False)
 
             if "selector" not in self.options:
@@ -1024,22 +1514,12 @@ class Alert(TimestampMixin, BelongsToOrgMixin, db.Model):
             else:
                 selector = self.options["selector"]
 
-            try:
-                if selector == "max":
-                    max_val = float("-inf")
-                    for i in range(len(data["rows"])):
-                        max_val = max(max_val, float(data["rows"][i][self.options["column"]]))
-                    value = max_val
-                elif selector == "min":
-                    min_val = float("inf")
-                    for i in range(len(data["rows"])):
-                        min_val = min(min_val, float(data["rows"][i][self.options["column"]]))
-                    value = min_val
-                else:
-                    value = data["rows"][0][self.options["column"]]
-
-            except ValueError:
-                return self.UNKNOWN_STATE
+            if selector in ("max", "min"):
+                if not stats["numeric"]:
+                    return self.UNKNOWN_STATE
+                value = stats[selector]
+            else:
+                value = stats["first"]
 
             threshold = self.options["value"]
 
@@ -1141,6 +1621,31 @@ class Dashboard(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model
     def name_as_slug(self):
         return utils.slugify(self.name)
 
+    def load_widgets(self):
+        """Returns the dashboard's widgets, along with their visualizations and the visualizations' queries (and their
+        users) in a single query."""
+        query_rel = joinedload(Widget.visualization).joinedload(Visualization.query_rel)
+        return (
+            self.widgets.options(
+                query_rel.joinedload(Query.user),
+                query_rel.joinedload(Query.last_modified_by),
+                query_rel.joinedload(Query.org),
+            )
+            .order_by(Widget.id)
+            .all()
+        )
+
+    def load_query_widgets(self):
+        """Returns the dashboard's visualization widgets, along with their visualizations and the visualizations'
+        queries (and their data sources) in a single query."""
+        query_rel = joinedload(Widget.visualization).joinedload(Visualization.query_rel)
+        return (
+            self.widgets.filter(Widget.visualization_id.isnot(None))
+            .options(query_rel.joinedload(Query.data_source))
+            .order_by(Widget.id)
+            .all()
+        )
+
     @classmethod
     def all(cls, org, group_ids, user_id):
         query = (
@@ -1161,14 +1666,30 @@ class Dashboard(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model
 
         return query
 
+    @classmethod
+    def _search(cls, dashboards, term):
+        # Dashboards only have a name to search in, which all tokens apply to.
+        tokens, _ = search.parse_term(term, [])
+        fields = {}
+        default_fields = [cls.name]
+        dashboard_ids = dashboards.filter(search.like_conditions(tokens, fields, default_fields)).with_entities(cls.id)
+        rank = search.rank(tokens, fields, default_fields)
+        order = [rank.desc()] if rank is not None else []
+
+        # The (distinct) dashboards are fetched by id, so they can be ordered by rank.
+        return (
+            cls.query.options(joinedload(Dashboard.user).load_only("id", "name", "details", "email"))
+            .filter(cls.id.in_(dashboard_ids))
+            .order_by(*order, cls.id)
+        )
+
     @classmethod
     def search(cls, org, groups_ids, user_id, search_term):
-        # TODO: switch to FTS
-        return cls.all(org, groups_ids, user_id).filter(cls.name.ilike("%{}%".format(search_term)))
+        return cls._search(cls.all(org, groups_ids, user_id), search_term)
 
     @classmethod
     def search_by_user(cls, term, user, limit=None):
-        return cls.by_user(user).filter(cls.name.ilike("%{}%".format(term))).limit(limit)
+        return cls._search(cls.by_user(user), term).limit(limit)
 
     @classmethod
     def all_tags(cls, org, user):
@@ -1190,7 +1711,8 @@ class Dashboard(ChangeTrackingMixin, TimestampMixin, BelongsToOrgMixin, db.Model
         if base_query is None:
             base_query = cls.all(user.org, user.group_ids, user.id)
         return (
-            base_query.distinct(cls.lowercase_name, Dashboard.created_at, Dashboard.slug, Favorite.created_at)
+            base_query.order_by(None)
+            .distinct(cls.lowercase_name, Dashboard.created_at, Dashboard.slug, Favorite.created_at)
             .join(
                 (
                     Favorite,
@@ -1297,7 +1819,7 @@ class Widget(TimestampMixin, BelongsToOrgMixin, db.Model):
 
 @generic_repr("id", "object_type", "object_id", "action", "user_id", "org_id", "created_at")
 class Event(db.Model):
-    id = primary_key("Event")
+    id = Column(key_type("Event"), primary_key=True, autoincrement=True)
     org_id = Column(key_type("Organization"), db.ForeignKey("organizations.id"))
     org = db.relationship(Organization, back_populates="events")
     user_id = Column(key_type("User"), db.ForeignKey("users.id"), nullable=True)
@@ -1306,9 +1828,20 @@ class Event(db.Model):
     object_type = Column(db.String(255))
     object_id = Column(db.String(255), nullable=True)
     additional_properties = Column(MutableDict.as_mutable(JSONB), nullable=True, default={})
-    created_at = Column(db.DateTime(True), default=db.func.now())
+    # The table is partitioned by month of created_at (see `create_partition`), which has to be part of its primary
+    # key. Events are still identified by their id alone.
+    created_at = Column(db.DateTime(True), default=db.func.now(), primary_key=True)
 
     __tablename__ = "events"
+    # Events without a partition are kept in the default partition.
+    __table_args__ = (
+        db.Index("ix_events_org_id_created_at_id", "org_id", created_at.desc(), id.desc()),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    __mapper_args__ = {"primary_key": [id]}
+
+    DEFAULT_PARTITION = "events_default"
+    PARTITION_NAME = re.compile(r"^events_y(\d{4})m(\d{2})$")
 
     def __str__(self):
         return "%s,%s,%s,%s" % (
@@ -1329,8 +1862,8 @@ class Event(db.Model):
             "created_at": self.created_at.isoformat(),
         }
 
-    @classmethod
-    def record(cls, event):
+    @staticmethod
+    def _values(event):
         org_id = event.pop("org_id")
         user_id = event.pop("user_id", None)
         action = event.pop("action")
@@ -1339,7 +1872,7 @@ class Event(db.Model):
 
         created_at = datetime.datetime.utcfromtimestamp(event.pop("timestamp"))
 
-        event = cls(
+        return dict(
             org_id=org_id,
             user_id=user_id,
             action=action,
@@ -1348,9 +1881,111 @@ class Event(db.Model):
             additional_properties=event,
             created_at=created_at,
         )
+
+    @classmethod
+    def record(cls, event):
+        event = cls(**cls._values(event))
         db.session.add(event)
         return event
 
+    @classmethod
+    def page(cls, org, page_size, before=None):
+        """Returns the org's events, newest first, following the (created_at, id) of the `before` event."""
+        query = cls.query.filter(cls.org == org)
+        if before is not None:
+            created_at, event_id = before
+            # The redundant condition on created_at alone lets Postgres skip the partitions of newer events.
+            query = query.filter(
+                cls.created_at <= created_at,
+                db.tuple_(cls.created_at, cls.id) < db.tuple_(created_at, event_id),
+            )
+
+        return query.order_by(cls.created_at.desc(), cls.id.desc()).limit(page_size).all()
+
+    @staticmethod
+    def _month_bounds(month):
+        if getattr(month, "tzinfo", None) is not None:
+            month = month.astimezone(pytz.utc)
+        start = datetime.datetime(month.year, month.month, 1, tzinfo=pytz.utc)
+        end = datetime.datetime(month.year + month.month // 12, month.month % 12 + 1, 1, tzinfo=pytz.utc)
+        return start, end
+
+    @classmethod
+    def partitions(cls):
+        """Returns the start of the month of each of the monthly partitions, by partition name."""
+        names = db.session.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = CAST(:table AS regclass)",
+            {"table": cls.__tablename__},
+        ).fetchall()
+
+        partitions = {}
+        for (name,) in names:
+            match = cls.PARTITION_NAME.match(name)
+            if match:
+                partitions[name] = datetime.datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=pytz.utc)
+        return partitions
+
+    @classmethod
+    def create_partition(cls, month):
+        """Creates the partition of the given month if it doesn't exist, moving its events out of the default
+        partition."""
+        start, end = cls._month_bounds(month)
+        name = "events_y{:04d}m{:02d}".format(start.year, start.month)
+        if name in cls.partitions():
+            return name
+
+        # Attaching a partition fails while the default partition has rows in its range, so they're moved to the new
+        # table before it's attached. The lock keeps new events out of the default partition meanwhile, and (as it
+        # conflicts with itself) makes concurrent calls wait for each other, so only the first one creates the
+        # partition.
+        db.session.execute("LOCK TABLE {} IN SHARE ROW EXCLUSIVE MODE".format(cls.DEFAULT_PARTITION))
+        if name in cls.partitions():
+            return name
+
+        bounds = {"start": start, "end": end}
+        db.session.execute("CREATE TABLE IF NOT EXISTS {} (LIKE events INCLUDING DEFAULTS)".format(name))
+        db.session.execute(
+            "WITH moved AS (DELETE FROM {default} WHERE created_at >= :start AND created_at < :end RETURNING *) "
+            "INSERT INTO {name} SELECT * FROM moved".format(default=cls.DEFAULT_PARTITION, name=name),
+            bounds,
+        )
+        db.session.execute(
+            db.text(
+                "ALTER TABLE events ATTACH PARTITION {} FOR VALUES FROM (:start) TO (:end)".format(name)
+            ).bindparams(**bounds)
+        )
+        return name
+
+    @classmethod
+    def drop_partitions(cls, before):
+        """Drops the partitions (and deletes the events of the default partition) older than `before`."""
+        dropped = []
+        for name, month in sorted(cls.partitions().items()):
+            if cls._month_bounds(month)[1] <= before:
+                db.session.execute("DROP TABLE {}".format(name))
+                dropped.append(name)
+
+        db.session.execute(
+            "DELETE FROM {} WHERE created_at < :before".format(cls.DEFAULT_PARTITION), {"before": before}
+        )
+        return dropped
+
+    @classmethod
+    def record_many(cls, events):
+        """Inserts the events with a single multi-row INSERT, and returns them as (transient) Event objects."""
+        values = [cls._values(dict(event)) for event in events]
+        if values:
+            db.session.execute(cls.__table__.insert().values(values))
+
+        return [cls(**event_values) for event_values in values]
+
+
+@listens_for(Event.__table__, "after_create")
+def create_default_event_partition(target, connection, **kwargs):
+    connection.execute("CREATE TABLE {} PARTITION OF events DEFAULT".format(Event.DEFAULT_PARTITION))
+
 
 @generic_repr("id", "created_by_id", "org_id", "active")
 class ApiKey(TimestampMixin, GFKBase, db.Model):
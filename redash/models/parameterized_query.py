@@ -1,4 +1,6 @@
 import re
+import threading
+from collections import OrderedDict
 from functools import partial
 from numbers import Number
 
@@ -6,7 +8,8 @@ import pystache
 from dateutil.parser import parse
 from funcy import distinct
 
-from redash.utils import mustache_render
+from redash import redis_connection, settings
+from redash.utils import json_dumps, json_loads, mustache_render
 
 
 def _pluck_name_and_value(default_column, row):
@@ -17,23 +20,94 @@ def _pluck_name_and_value(default_column, row):
     return {"name": row[name_column], "value": str(row[value_column])}
 
 
-def _load_result(query_id, org):
+def _latest_result_id(query_id, org):
     from redash import models
 
     query = models.Query.get_by_id_and_org(query_id, org)
 
     if query.data_source:
-        query_result = models.QueryResult.get_by_id_and_org(query.latest_query_data_id, org)
-        return query_result.data
+        return query.latest_query_data_id
     else:
         raise QueryDetachedFromDataSourceError(query_id)
 
 
+def _load_result(query_result_id, org):
+    from redash import models
+
+    return models.QueryResult.get_by_id_and_org(query_result_id, org, with_data=True).data
+
+
+class DropdownOptions:
+    def __init__(self, options):
+        self.options = options
+        # For checking parameter values without going through the options.
+        self.values = frozenset(option["value"] for option in options)
+
+
+DROPDOWN_OPTIONS_KEY = "dropdown_options:{}"
+# Options by query result id (which never changes once stored), least recently used first.
+_dropdown_options = OrderedDict()
+_dropdown_options_lock = threading.Lock()
+
+
+def _cached_dropdown_options(query_result_id, load):
+    with _dropdown_options_lock:
+        if query_result_id in _dropdown_options:
+            _dropdown_options.move_to_end(query_result_id)
+            return _dropdown_options[query_result_id]
+
+    key = DROPDOWN_OPTIONS_KEY.format(query_result_id)
+    cached = redis_connection.get(key) if settings.DROPDOWN_OPTIONS_CACHE_TTL else None
+    if cached is not None:
+        options = DropdownOptions(json_loads(cached))
+    else:
+        options = DropdownOptions(load())
+        if settings.DROPDOWN_OPTIONS_CACHE_TTL:
+            redis_connection.set(key, json_dumps(options.options), ex=settings.DROPDOWN_OPTIONS_CACHE_TTL)
+
+    with _dropdown_options_lock:
+        _dropdown_options[query_result_id] = options
+        while len(_dropdown_options) > settings.DROPDOWN_OPTIONS_CACHE_SIZE:
+            _dropdown_options.popitem(last=False)
+
+    return options
+
+
+def invalidate_dropdown_options(query_result_ids):
+    """Drops the cached options of the given query results, which are no longer the latest results of their
+    queries."""
+    query_result_ids = [query_result_id for query_result_id in query_result_ids if query_result_id is not None]
+    if not query_result_ids:
+        return
+
+    with _dropdown_options_lock:
+        for query_result_id in query_result_ids:
+            _dropdown_options.pop(query_result_id, None)
+
+    redis_connection.delete(*[DROPDOWN_OPTIONS_KEY.format(query_result_id) for query_result_id in query_result_ids])
+
+
+def clear_dropdown_options():
+    with _dropdown_options_lock:
+        _dropdown_options.clear()
+
+
+def dropdown_options(query_id, org):
+    """Returns the options of a dropdown of the given query's latest result, parsing the result only when the options
+    aren't cached yet."""
+    query_result_id = _latest_result_id(query_id, org)
+
+    def load():
+        data = _load_result(query_result_id, org)
+        first_column = data["columns"][0]["name"]
+        pluck = partial(_pluck_name_and_value, first_column)
+        return list(map(pluck, data["rows"]))
+
+    return _cached_dropdown_options(query_result_id, load)
+
+
 def dropdown_values(query_id, org):
-    data = _load_result(query_id, org)
-    first_column = data["columns"][0]["name"]
-    pluck = partial(_pluck_name_and_value, first_column)
-    return list(map(pluck, data["rows"]))
+    return dropdown_options(query_id, org).options
 
 
 def join_parameter_list_values(parameters, schema):
@@ -110,7 +184,7 @@ def _is_date_range(obj):
 
 def _is_value_within_options(value, dropdown_options, allow_list=False):
     if isinstance(value, list):
-        return allow_list and set(map(str, value)).issubset(set(dropdown_options))
+        return allow_list and set(map(str, value)).issubset(dropdown_options)
     return str(value) in dropdown_options
 
 
@@ -158,9 +232,7 @@ class ParameterizedQuery:
             "number": _is_number,
             "enum": lambda value: _is_value_within_options(value, enum_options, allow_multiple_values),
             "query": lambda value: _is_value_within_options(
-                value,
-                [v["value"] for v in dropdown_values(query_id, self.org)],
-                allow_multiple_values,
+                value, dropdown_options(query_id, self.org).values, allow_multiple_values
             ),
             "date": _is_date,
             "datetime-local": _is_date,
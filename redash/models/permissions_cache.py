@@ -0,0 +1,99 @@
+"""
+Caches the data authorization checks read from the database: the permissions granted by groups and the groups of data
+sources.
+
+Values are memoized for the duration of a request, and when `PERMISSIONS_CACHE_TTL` is set, cached in Redis as well.
+Redis entries are stamped with a version that is bumped whenever a group or the groups of a data source change, so
+changes made through Redash take effect right away.
+"""
+from flask import g, has_request_context
+from sqlalchemy.event import listens_for
+from sqlalchemy.orm import Session
+
+from redash import redis_connection, settings
+from redash.utils import json_dumps, json_loads
+
+from .base import db
+
+VERSION_KEY = "permissions_cache:version"
+# Session.info key marking that the transaction changed cached data, and the cache should be invalidated on commit.
+CHANGED = "permissions_cache_changed"
+
+
+def _memo():
+    if not has_request_context():
+        return None
+
+    if "permissions_cache" not in g:
+        g.permissions_cache = {}
+
+    return g.permissions_cache
+
+
+def _reset_memo():
+    g.pop("permissions_cache", None)
+
+
+def _version(memo):
+    if memo is not None and VERSION_KEY in memo:
+        return memo[VERSION_KEY]
+
+    version = redis_connection.get(VERSION_KEY) or 0
+    if memo is not None:
+        memo[VERSION_KEY] = version
+
+    return version
+
+
+def get_or_load(name, key, load):
+    """Returns the cached `name` value for `key`, calling `load` if it isn't cached. Values must be JSON serializable
+    (and survive a round trip: dict keys are strings after it)."""
+    memo = _memo()
+    cache_key = "{}:{}".format(name, key)
+    if memo is not None and cache_key in memo:
+        return memo[cache_key]
+
+    # Values loaded by a transaction that changed them might never be committed.
+    if settings.PERMISSIONS_CACHE_TTL and not db.session.info.get(CHANGED):
+        redis_key = "permissions_cache:{}:{}".format(_version(memo), cache_key)
+        cached = redis_connection.get(redis_key)
+        if cached is not None:
+            value = json_loads(cached)
+        else:
+            value = load()
+            redis_connection.set(redis_key, json_dumps(value), ex=settings.PERMISSIONS_CACHE_TTL)
+    else:
+        value = load()
+
+    if memo is not None:
+        memo[cache_key] = value
+
+    return value
+
+
+def invalidate():
+    redis_connection.incr(VERSION_KEY)
+    if has_request_context():
+        _reset_memo()
+
+
+def changed(session):
+    """Invalidates the cache once the session's transaction commits, and right away for the current request."""
+    session.info[CHANGED] = True
+    if has_request_context():
+        _reset_memo()
+
+
+@listens_for(Session, "after_commit")
+def invalidate_changed(session):
+    if session.info.pop(CHANGED, False):
+        invalidate()
+
+
+@listens_for(Session, "after_rollback")
+def forget_changed(session):
+    session.info.pop(CHANGED, None)
+
+
+def init_app(app):
+    app.before_request(_reset_memo)
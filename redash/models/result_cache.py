@@ -0,0 +1,135 @@
+"""
+Caches the latest result of each query (by data source and query hash) in Redis, so looking it up doesn't need to scan
+the query's results in the database.
+
+Each query's entry holds its latest result's id, retrieval time and blob hash, and expires after
+`QUERY_RESULTS_CACHE_TTL` seconds. The stored payloads of the results are cached as well (by blob hash, like the blobs
+themselves), up to `QUERY_RESULTS_CACHE_SIZE` megabytes of them: the least recently used payloads are evicted to make
+room for new ones.
+"""
+import time
+from collections import namedtuple
+
+import redis
+
+from redash import redis_connection, settings
+
+ENTRY_KEY = "query_results_cache:{}:{}"
+PAYLOAD_KEY = "query_results_cache:payload:"
+PAYLOADS_LRU_KEY = "query_results_cache:payloads:lru"
+PAYLOAD_SIZES_KEY = "query_results_cache:payloads:sizes"
+PAYLOADS_SIZE_KEY = "query_results_cache:payloads:size"
+
+# Payloads are bytes, which the (decoding) Redash connection can't return.
+payloads_connection = redis.from_url(settings._REDIS_URL)
+
+# Replaces the entry (KEYS[1]), unless it holds a result retrieved after this one.
+STORE_ENTRY_SCRIPT = """
+local retrieved_at = redis.call('HGET', KEYS[1], 'retrieved_at')
+if retrieved_at and tonumber(retrieved_at) > tonumber(ARGV[2]) then
+    return 0
+end
+
+redis.call('HSET', KEYS[1], 'id', ARGV[1], 'retrieved_at', ARGV[2], 'blob_hash', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+# Caches a payload (ARGV[3]) by its blob hash (ARGV[2]), then evicts the least recently used payloads while they take
+# more than ARGV[6] bytes.
+STORE_PAYLOAD_SCRIPT = """
+local lru, sizes, total = KEYS[1], KEYS[2], KEYS[3]
+local prefix, content_hash, payload = ARGV[1], ARGV[2], ARGV[3]
+
+if redis.call('HSETNX', sizes, content_hash, string.len(payload)) == 1 then
+    redis.call('INCRBY', total, string.len(payload))
+end
+redis.call('SET', prefix .. content_hash, payload, 'EX', ARGV[4])
+redis.call('ZADD', lru, ARGV[5], content_hash)
+
+while tonumber(redis.call('GET', total)) > tonumber(ARGV[6]) do
+    local oldest = redis.call('ZPOPMIN', lru)
+    if #oldest == 0 then
+        break
+    end
+
+    redis.call('DEL', prefix .. oldest[1])
+    redis.call('DECRBY', total, redis.call('HGET', sizes, oldest[1]) or 0)
+    redis.call('HDEL', sizes, oldest[1])
+end
+"""
+
+_store_entry_script = redis_connection.register_script(STORE_ENTRY_SCRIPT)
+_store_payload_script = payloads_connection.register_script(STORE_PAYLOAD_SCRIPT)
+
+
+class CachedResult(namedtuple("CachedResult", ["id", "retrieved_at", "blob_hash"])):
+    def is_recent(self, max_age):
+        """Whether the result is at most `max_age` seconds old (any age is recent enough for -1)."""
+        return max_age == -1 or self.retrieved_at + max_age >= time.time()
+
+
+def _max_payload_size():
+    return settings.QUERY_RESULTS_CACHE_MAX_PAYLOAD_SIZE * 1024
+
+
+def get_many(queries):
+    """Returns the cached latest result of each of the given (data source id, query hash) pairs that has one, by
+    pair."""
+    if not settings.QUERY_RESULTS_CACHE_TTL or not queries:
+        return {}
+
+    with redis_connection.pipeline() as pipe:
+        for data_source_id, query_hash in queries:
+            pipe.hgetall(ENTRY_KEY.format(data_source_id, query_hash))
+        entries = pipe.execute()
+
+    return {
+        query: CachedResult(int(entry["id"]), float(entry["retrieved_at"]), entry["blob_hash"] or None)
+        for query, entry in zip(queries, entries)
+        if entry
+    }
+
+
+def get_payloads(content_hashes):
+    """Returns the cached payloads of the given blob hashes, by hash, and marks them as recently used."""
+    content_hashes = list({content_hash for content_hash in content_hashes if content_hash is not None})
+    if not settings.QUERY_RESULTS_CACHE_TTL or not _max_payload_size() or not content_hashes:
+        return {}
+
+    with payloads_connection.pipeline() as pipe:
+        pipe.mget([PAYLOAD_KEY + content_hash for content_hash in content_hashes])
+        for content_hash in content_hashes:
+            pipe.expire(PAYLOAD_KEY + content_hash, settings.QUERY_RESULTS_CACHE_TTL)
+            pipe.zadd(PAYLOADS_LRU_KEY, {content_hash: time.time()}, xx=True)
+        payloads = pipe.execute()[0]
+
+    return {content_hash: payload for content_hash, payload in zip(content_hashes, payloads) if payload is not None}
+
+
+def store(data_source_id, query_hash, result_id, retrieved_at, blob_hash=None, payload=None):
+    """Caches the result as the latest one of its query (unless a newer one is cached), along with its payload if it's
+    given and small enough."""
+    if not settings.QUERY_RESULTS_CACHE_TTL:
+        return
+
+    ttl = settings.QUERY_RESULTS_CACHE_TTL
+    _store_entry_script(
+        keys=[ENTRY_KEY.format(data_source_id, query_hash)],
+        args=[result_id, retrieved_at.timestamp(), blob_hash or "", ttl],
+    )
+
+    max_size = settings.QUERY_RESULTS_CACHE_SIZE * 1024 * 1024
+    if blob_hash is not None and payload is not None and len(payload) <= min(_max_payload_size(), max_size):
+        _store_payload_script(
+            keys=[PAYLOADS_LRU_KEY, PAYLOAD_SIZES_KEY, PAYLOADS_SIZE_KEY],
+            args=[PAYLOAD_KEY, blob_hash, payload, ttl, time.time(), max_size],
+        )
+
+
+def forget(queries):
+    """Drops the cached latest results of the given (data source id, query hash) pairs."""
+    if queries:
+        redis_connection.delete(
+            *[ENTRY_KEY.format(data_source_id, query_hash) for data_source_id, query_hash in queries]
+        )
@@ -0,0 +1,108 @@
+"""
+Helpers for searching queries and dashboards by their text fields.
+
+Search terms may scope tokens to a field (`name:word`, `query:"select foo"`). Scoped tokens and searches the full text
+search can't handle (e.g. CJK text) match with ILIKE patterns, which are served by trigram indexes of the searched
+columns rather than by scanning the tables. The indexes need the pg_trgm extension (one of Postgres' standard contrib
+modules), and are only created where it's available.
+"""
+import re
+
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.event import listens_for
+
+from .base import db
+
+TOKEN = re.compile(r'(?:([^:\s]+):)?(?:"([^"]+)"|(\S+))')
+
+# (index name, table, column)
+TRIGRAM_INDEXES = [
+    ("ix_queries_name_trgm", "queries", "name"),
+    ("ix_queries_description_trgm", "queries", "description"),
+    ("ix_queries_query_trgm", "queries", "query"),
+    ("ix_dashboards_name_trgm", "dashboards", "name"),
+]
+
+
+def parse_term(term, fields):
+    """
+    Splits the search term into (field, value) tokens, and returns them along with the rest of the term: the tokens
+    that aren't scoped to any of the given fields (their field is None).
+
+    Examples: `word`, `name:word`, `"multiple words"`, `name:"multiple words"`, `word1 query:"select foo"`.
+    """
+    tokens = []
+    rest = []
+    for match in TOKEN.finditer(term):
+        field, quoted, value = match.groups()
+        if field in fields:
+            tokens.append((field, quoted or value))
+        else:
+            tokens.append((None, match.group(0).strip('"') if field is None else match.group(0)))
+            rest.append(match.group(0))
+
+    return tokens, " ".join(rest)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _columns(field, fields, default_fields):
+    return [fields[field]] if field else default_fields
+
+
+def like_conditions(tokens, fields, default_fields):
+    """Returns a condition matching all tokens: each token's field (or any of the default fields for tokens without
+    one) has to contain its value."""
+    conditions = []
+    for field, value in tokens:
+        pattern = "%{}%".format(_escape(value))
+        conditions.append(or_(*[column.ilike(pattern) for column in _columns(field, fields, default_fields)]))
+
+    return and_(*conditions)
+
+
+def rank(tokens, fields, default_fields):
+    """Ranks matches by how well their fields match the tokens: exact matches first, then the ones starting with the
+    tokens' values, then the ones containing them. Matches of the first default field (e.g. the name) count twice."""
+    scores = []
+    for field, value in tokens:
+        escaped = _escape(value)
+        for column in _columns(field, fields, default_fields):
+            score = case(
+                [
+                    (func.lower(column) == value.lower(), 3),
+                    (column.ilike("{}%".format(escaped)), 2),
+                    (column.ilike("%{}%".format(escaped)), 1),
+                ],
+                else_=0,
+            )
+            scores.append(score * 2 if column is default_fields[0] else score)
+
+    return sum(scores[1:], scores[0]) if scores else None
+
+
+def create_trigram_indexes(connection):
+    connection.execute(
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+                CREATE EXTENSION IF NOT EXISTS pg_trgm;
+                {}
+            END IF;
+        END
+        $$
+        """.format(
+            "\n".join(
+                "CREATE INDEX IF NOT EXISTS {} ON {} USING gin ({} gin_trgm_ops);".format(name, table, column)
+                for name, table, column in TRIGRAM_INDEXES
+            )
+        )
+    )
+
+
+@listens_for(db.metadata, "after_create")
+def _create_trigram_indexes(target, connection, **kwargs):
+    create_trigram_indexes(connection)
@@ -5,6 +5,7 @@ from sqlalchemy_utils import EncryptedType
 
 from redash.utils import json_dumps, json_loads
 from redash.utils.configuration import ConfigurationContainer
+from redash.utils.result_encoding import decode_result, encode_result
 
 from .base import db
 
@@ -45,6 +46,22 @@ class JSONText(TypeDecorator):
         return json_loads(value)
 
 
+# Query results payload, stored in the (compressed) columnar format or as legacy JSON text. See
+# redash.utils.result_encoding for details.
+class QueryResultData(TypeDecorator):
+    impl = db.LargeBinary
+
+    def process_bind_param(self, value, dialect):
+        # Payloads that are already encoded (e.g. to hash them) are stored as they are.
+        if value is None or isinstance(value, bytes):
+            return value
+
+        return encode_result(value)
+
+    def process_result_value(self, value, dialect):
+        return decode_result(value)
+
+
 class MutableDict(Mutable, dict):
     @classmethod
     def coerce(cls, key, value):
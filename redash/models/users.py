@@ -9,12 +9,14 @@ from flask import current_app, request_started, url_for
 from flask_login import AnonymousUserMixin, UserMixin, current_user
 from passlib.apps import custom_app_context as pwd_context
 from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.event import listens_for
 from sqlalchemy_utils import EmailType
 from sqlalchemy_utils.models import generic_repr
 
 from redash import redis_connection
 from redash.utils import dt_from_timestamp, generate_token
 
+from . import permissions_cache
 from .base import Column, GFKBase, db, key_type, primary_key
 from .mixins import BelongsToOrgMixin, TimestampMixin
 from .types import MutableDict, MutableList, json_cast_property
@@ -171,8 +173,7 @@ class User(TimestampMixin, db.Model, BelongsToOrgMixin, UserMixin, PermissionsCh
 
     @property
     def permissions(self):
-        # TODO: this should be cached.
-        return list(itertools.chain(*[g.permissions for g in Group.query.filter(Group.id.in_(self.group_ids))]))
+        return Group.permissions_of(self.group_ids)
 
     @classmethod
     def get_by_org(cls, org):
@@ -299,6 +300,23 @@ class Group(db.Model, BelongsToOrgMixin):
         result = cls.query.filter(cls.org == org, cls.name.in_(group_names))
         return list(result)
 
+    @classmethod
+    def permissions_of(cls, group_ids):
+        """Returns the permissions granted by the given groups."""
+        group_ids = sorted(set(group_ids or []))
+
+        def load():
+            return list(itertools.chain(*[g.permissions for g in cls.query.filter(cls.id.in_(group_ids))]))
+
+        return permissions_cache.get_or_load("group_permissions", ",".join(map(str, group_ids)), load)
+
+
+@listens_for(Group, "after_insert")
+@listens_for(Group, "after_update")
+@listens_for(Group, "after_delete")
+def group_changed(mapper, connection, target):
+    permissions_cache.changed(db.session)
+
 
 @generic_repr("id", "object_type", "object_id", "access_type", "grantor_id", "grantee_id")
 class AccessPermission(GFKBase, db.Model):
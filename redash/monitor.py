@@ -5,6 +5,7 @@ from rq.registry import StartedJobRegistry
 
 from redash import __version__, redis_connection, rq_redis_connection, settings
 from redash.models import Dashboard, Query, QueryResult, Widget, db
+from redash.tasks.concurrency import concurrency_status
 
 
 def get_redis_status():
@@ -35,7 +36,8 @@ def get_db_sizes():
     queries = [
         [
             "Query Results Size",
-            "select pg_total_relation_size('query_results') as size from (select 1) as a",
+            "select pg_total_relation_size('query_results') + pg_total_relation_size('query_result_blobs') as size "
+            "from (select 1) as a",
         ],
         ["Redash DB Size", "select pg_database_size(current_database()) as size"],
     ]
@@ -117,4 +119,4 @@ def rq_workers():
 
 
 def rq_status():
-    return {"queues": rq_queues(), "workers": rq_workers()}
+    return {"queues": rq_queues(), "workers": rq_workers(), "data_sources": concurrency_status()}
@@ -37,7 +37,13 @@ def has_access_to_groups(obj, user, need_view_only):
     if "admin" in user.permissions:
         return True
 
-    matching_groups = set(groups.keys()).intersection(user.group_ids)
+    return groups_grant_access(groups, user.group_ids, need_view_only)
+
+
+def groups_grant_access(groups, group_ids, need_view_only):
+    """Returns whether members of `group_ids` have the needed access to an object with the given groups (a dict of
+    group id to view only flag), regardless of their permissions."""
+    matching_groups = set(groups.keys()).intersection(group_ids)
 
     if not matching_groups:
         return False
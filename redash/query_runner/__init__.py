@@ -23,6 +23,7 @@ __all__ = [
     "InterruptException",
     "JobTimeoutException",
     "BaseSQLQueryRunner",
+    "RESULT_BUDGET_OPTIONS",
     "TYPE_DATETIME",
     "TYPE_BOOLEAN",
     "TYPE_INTEGER",
@@ -105,6 +106,18 @@ def find_last_keyword_idx(parsed_query):
     return -1
 
 
+# Configuration options that limit the size of the results fetched from a data source. They override the
+# REDASH_QUERY_RESULTS_MAX_ROWS and REDASH_QUERY_RESULTS_MAX_BYTES settings.
+RESULT_BUDGET_OPTIONS = {
+    "max_result_rows": {"type": "number", "title": "Maximum Number of Result Rows"},
+    "max_result_bytes": {"type": "number", "title": "Maximum Result Size (bytes)"},
+}
+
+
+def _estimate_row_size(row):
+    return sum(len(value) if isinstance(value, (str, bytes)) else 8 for value in row)
+
+
 class InterruptException(Exception):
     pass
 
@@ -120,6 +133,9 @@ class BaseQueryRunner:
     limit_query = " LIMIT 1000"
     limit_keywords = ["LIMIT", "OFFSET"]
     limit_after_select = False
+    supports_connection_pooling = False
+    # Set for the query runners of saved data sources, see `redash.query_runner.connection_pool`.
+    data_source_id = None
 
     def __init__(self, configuration):
         self.syntax = "sql"
@@ -212,6 +228,18 @@ class BaseQueryRunner:
     def run_query(self, query, user):
         raise NotImplementedError()
 
+    def connect(self):
+        """Opens a new connection to the data source. Required by query runners that support connection pooling."""
+        raise NotImplementedError()
+
+    def is_connection_usable(self, connection):
+        """Health check of an idle pooled connection, before it's reused."""
+        return True
+
+    def reset_connection(self, connection):
+        """Clears the session state a query might have left on a connection before it's returned to the pool."""
+        pass
+
     def fetch_columns(self, columns):
         column_names = set()
         duplicates_counters = defaultdict(int)
@@ -231,6 +259,55 @@ class BaseQueryRunner:
     def get_schema(self, get_stats=False):
         raise NotSupported()
 
+    @property
+    def result_budget(self):
+        """Returns the maximum number of rows and (approximate) bytes to fetch for a single result, 0 meaning
+        unlimited."""
+        max_rows = self.configuration.get("max_result_rows") or settings.QUERY_RESULTS_MAX_ROWS
+        max_bytes = self.configuration.get("max_result_bytes") or settings.QUERY_RESULTS_MAX_BYTES
+        return int(max_rows), int(max_bytes)
+
+    def fetch_rows(self, cursor, columns, convert_row=None):
+        """Reads the rows of a DB-API cursor in `fetchmany` batches, until the result budget is exhausted.
+
+        Returns the rows as dictionaries keyed by the names of `columns`, and whether the result was truncated.
+        """
+        column_names = [column["name"] for column in columns]
+        max_rows, max_bytes = self.result_budget
+        rows = []
+        size = 0
+
+        while True:
+            batch = cursor.fetchmany(settings.QUERY_RESULTS_FETCH_SIZE)
+            if not batch:
+                return rows, False
+
+            for row in batch:
+                if max_rows and len(rows) >= max_rows:
+                    return rows, True
+
+                if convert_row is not None:
+                    row = convert_row(row)
+
+                if max_bytes:
+                    size += _estimate_row_size(row)
+                    if size > max_bytes:
+                        return rows, True
+
+                rows.append(dict(zip(column_names, row)))
+
+    def fetch_data(self, cursor, columns, convert_row=None):
+        """Builds the query result data from the rows of a DB-API cursor (see `fetch_rows`), flagging truncated
+        results in their metadata."""
+        rows, truncated = self.fetch_rows(cursor, columns, convert_row)
+        data = {"columns": columns, "rows": rows}
+
+        if truncated:
+            logger.warning("Result truncated to %d rows, as it exceeded the data source's result budget.", len(rows))
+            data["metadata"] = {"truncated": True}
+
+        return data
+
     def _handle_run_query_error(self, error):
         if error is None:
             return
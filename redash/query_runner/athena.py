@@ -2,6 +2,7 @@ import logging
 import os
 
 from redash.query_runner import (
+    RESULT_BUDGET_OPTIONS,
     TYPE_BOOLEAN,
     TYPE_DATE,
     TYPE_DATETIME,
@@ -99,9 +100,17 @@ class Athena(BaseQueryRunner):
                     "title": "Minutes to reuse Athena query results",
                     "default": 60,
                 },
+                **RESULT_BUDGET_OPTIONS,
             },
             "required": ["region", "s3_staging_dir"],
-            "extra_options": ["glue", "catalog_ids", "cost_per_tb", "result_reuse_enable", "result_reuse_minutes"],
+            "extra_options": [
+                "glue",
+                "catalog_ids",
+                "cost_per_tb",
+                "result_reuse_enable",
+                "result_reuse_minutes",
+                *RESULT_BUDGET_OPTIONS,
+            ],
             "order": [
                 "region",
                 "s3_staging_dir",
@@ -267,7 +276,7 @@ class Athena(BaseQueryRunner):
             cursor.execute(query)
             column_tuples = [(i[0], _TYPE_MAPPINGS.get(i[1], None)) for i in cursor.description]
             columns = self.fetch_columns(column_tuples)
-            rows = [dict(zip(([c["name"] for c in columns]), r)) for i, r in enumerate(cursor.fetchall())]
+            data = self.fetch_data(cursor, columns)
             qbytes = None
             athena_query_id = None
             try:
@@ -280,15 +289,13 @@ class Athena(BaseQueryRunner):
                 logger.debug("Athena Upstream can't get query_id: %s", e)
 
             price = self.configuration.get("cost_per_tb", 5)
-            data = {
-                "columns": columns,
-                "rows": rows,
-                "metadata": {
+            data.setdefault("metadata", {}).update(
+                {
                     "data_scanned": qbytes,
                     "athena_query_id": athena_query_id,
                     "query_cost": price * qbytes * 10e-12,
-                },
-            }
+                }
+            )
 
             error = None
         except Exception:
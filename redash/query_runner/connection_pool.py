@@ -0,0 +1,175 @@
+"""
+Pools of idle query runner connections, so processes that run several queries against the same data source don't pay
+for connection setup (and TLS handshakes) on every query.
+
+Pooling is opt-in per query runner class (`supports_connection_pooling`) and only used for data sources that have been
+saved (the pool is keyed on the data source id) and don't connect through an SSH tunnel. Each data source's pool is
+tied to a hash of its options, so changing them drops the connections opened with the old ones.
+
+Connections are never shared between processes, so RQ work horses (forked for each job) don't reuse their parent's.
+Workers reuse connections across query jobs when they run the jobs in-process (`RQ_WORKER_IN_PROCESS`).
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from redash import settings
+from redash.utils import json_dumps
+
+logger = logging.getLogger(__name__)
+
+
+def _close(connection):
+    try:
+        connection.close()
+    except Exception:
+        logger.debug("Failed closing pooled connection.", exc_info=True)
+
+
+class ConnectionPool:
+    def __init__(self, max_size, max_idle_time):
+        self.max_size = max_size
+        self.max_idle_time = max_idle_time
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Returns the most recently released connection, or None if there is no connection that has been idle for
+        less than `max_idle_time`."""
+        with self._lock:
+            if not self._idle:
+                return None
+
+            connection, released_at = self._idle.pop()
+            if time.monotonic() - released_at <= self.max_idle_time:
+                return connection
+
+            # The remaining connections have been idle even longer.
+            expired = [connection] + [c for c, _ in self._idle]
+            self._idle = []
+
+        for c in expired:
+            _close(c)
+        return None
+
+    def put(self, connection):
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append((connection, time.monotonic()))
+                return
+
+        _close(connection)
+
+    def clear(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for connection, _ in idle:
+            _close(connection)
+
+    def __len__(self):
+        return len(self._idle)
+
+
+# data source id -> (options hash, pool)
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = os.getpid()
+# Pools inherited from a parent process. Their connections share sockets with the parent's, so they are kept referenced
+# instead of being closed (or garbage collected) by the child.
+_inherited_pools = []
+
+
+def _options_hash(query_runner):
+    configuration = query_runner.configuration
+    if hasattr(configuration, "to_dict"):
+        configuration = configuration.to_dict()
+    return hashlib.md5(json_dumps(configuration, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _pooling_enabled(query_runner):
+    return (
+        settings.QUERY_RUNNER_CONNECTION_POOL_SIZE > 0
+        and query_runner.supports_connection_pooling
+        and query_runner.data_source_id is not None
+    )
+
+
+def get_pool(query_runner):
+    """Returns the connection pool of the query runner's data source, or None if its connections aren't pooled."""
+    global _pools_pid
+
+    if not _pooling_enabled(query_runner):
+        return None
+
+    options_hash = _options_hash(query_runner)
+
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            _inherited_pools.extend(pool for _, pool in _pools.values())
+            _pools.clear()
+            _pools_pid = os.getpid()
+
+        current_hash, pool = _pools.get(query_runner.data_source_id, (None, None))
+        if current_hash == options_hash:
+            return pool
+
+        stale_pool = pool
+        pool = ConnectionPool(
+            settings.QUERY_RUNNER_CONNECTION_POOL_SIZE, settings.QUERY_RUNNER_CONNECTION_POOL_MAX_IDLE_TIME
+        )
+        _pools[query_runner.data_source_id] = (options_hash, pool)
+
+    if stale_pool is not None:
+        logger.info("Options of data source %s changed, closing its pooled connections.", query_runner.data_source_id)
+        stale_pool.clear()
+
+    return pool
+
+
+def acquire_connection(query_runner):
+    """Returns an idle pooled connection of the query runner's data source that passes its health check, or a new
+    connection."""
+    pool = get_pool(query_runner)
+
+    while pool is not None:
+        connection = pool.get()
+        if connection is None:
+            break
+
+        if query_runner.is_connection_usable(connection):
+            return connection
+
+        _close(connection)
+
+    return query_runner.connect()
+
+
+def release_connection(query_runner, connection, reusable=True):
+    """Returns the connection to the pool of the query runner's data source, or closes it when it isn't pooled or not
+    `reusable` (e.g. after an interrupted query)."""
+    pool = get_pool(query_runner) if reusable else None
+
+    if pool is None:
+        _close(connection)
+        return
+
+    try:
+        query_runner.reset_connection(connection)
+    except Exception:
+        logger.debug("Failed resetting connection, closing it.", exc_info=True)
+        _close(connection)
+        return
+
+    pool.put(connection)
+
+
+def clear_pools():
+    with _pools_lock:
+        pools = [pool for _, pool in _pools.values()]
+        _pools.clear()
+
+    for pool in pools:
+        pool.clear()
@@ -1,6 +1,7 @@
 import logging
 
 from redash.query_runner import (
+    RESULT_BUDGET_OPTIONS,
     TYPE_BOOLEAN,
     TYPE_DATE,
     TYPE_DATETIME,
@@ -71,6 +72,7 @@ class DuckDB(BaseSQLQueryRunner):
                     "type": "string",
                     "title": "Extensions (comma separated)",
                 },
+                **RESULT_BUDGET_OPTIONS,
             },
             "order": ["dbpath", "extensions"],
             "required": ["dbpath"],
@@ -104,9 +106,7 @@ class DuckDB(BaseSQLQueryRunner):
             columns = self.fetch_columns(
                 [(d[0], TYPES_MAP.get(d[1].upper(), TYPE_STRING)) for d in cursor.description]
             )
-            rows = [dict(zip((col["name"] for col in columns), row)) for row in cursor.fetchall()]
-            data = {"columns": columns, "rows": rows}
-            return data, None
+            return self.fetch_data(cursor, columns), None
         except duckdb.InterruptException:
             raise InterruptException("Query cancelled by user.")
         except Exception as e:
@@ -2,7 +2,9 @@ import logging
 import os
 import threading
 
+from redash import settings
 from redash.query_runner import (
+    RESULT_BUDGET_OPTIONS,
     TYPE_DATE,
     TYPE_DATETIME,
     TYPE_FLOAT,
@@ -17,6 +19,7 @@ from redash.settings import parse_boolean
 
 try:
     import MySQLdb
+    from MySQLdb.cursors import SSCursor
 
     enabled = True
 except ImportError:
@@ -67,6 +70,7 @@ class Mysql(BaseSQLQueryRunner):
                 "charset": {"type": "string", "default": "utf8mb4"},
                 "use_unicode": {"type": "boolean", "default": True},
                 "autocommit": {"type": "boolean", "default": False},
+                **RESULT_BUDGET_OPTIONS,
             },
             "order": [
                 "host",
@@ -228,24 +232,18 @@ class Mysql(BaseSQLQueryRunner):
 
     def _run_query(self, query, user, connection, r, ev):
         try:
-            cursor = connection.cursor()
+            # Unbuffered, so the rows are read from the server as they're fetched rather than all at once.
+            cursor = connection.cursor(SSCursor)
             logger.debug("MySQL running query: %s", query)
             cursor.execute(query)
 
-            data = cursor.fetchall()
-            desc = cursor.description
+            data = self._fetch_result_set(cursor)
 
-            while cursor.nextset():
+            while self._next_result_set(cursor):
                 if cursor.description is not None:
-                    data = cursor.fetchall()
-                    desc = cursor.description
-
-            # TODO - very similar to pg.py
-            if desc is not None:
-                columns = self.fetch_columns([(i[0], types_map.get(i[1], None)) for i in desc])
-                rows = [dict(zip((column["name"] for column in columns), row)) for row in data]
+                    data = self._fetch_result_set(cursor)
 
-                data = {"columns": columns, "rows": rows}
+            if data is not None:
                 r.data = data
                 r.error = None
             else:
@@ -263,6 +261,21 @@ class Mysql(BaseSQLQueryRunner):
             if connection:
                 connection.close()
 
+    def _next_result_set(self, cursor):
+        # MySQLdb reads the rows left in the current result set (e.g. of a truncated result) all at once before moving
+        # on to the next one, so they're skipped in batches first.
+        while cursor.fetchmany(settings.QUERY_RESULTS_FETCH_SIZE):
+            pass
+
+        return cursor.nextset()
+
+    def _fetch_result_set(self, cursor):
+        if cursor.description is None:
+            return None
+
+        columns = self.fetch_columns([(i[0], types_map.get(i[1], None)) for i in cursor.description])
+        return self.fetch_data(cursor, columns)
+
     def _get_ssl_parameters(self):
         if not self.configuration.get("use_ssl"):
             return None
@@ -321,6 +334,7 @@ class RDSMySQL(Mysql):
                 "port": {"type": "number", "default": 3306},
                 "use_ssl": {"type": "boolean", "title": "Use SSL"},
                 "charset": {"type": "string", "default": "utf8mb4"},
+                **RESULT_BUDGET_OPTIONS,
             },
             "order": ["host", "port", "user", "passwd", "db"],
             "required": ["db", "user", "passwd", "host"],
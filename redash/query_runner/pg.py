@@ -6,9 +6,12 @@ from tempfile import NamedTemporaryFile
 from uuid import uuid4
 
 import psycopg2
+import sqlparse
 from psycopg2.extras import Range
 
+from redash import settings
 from redash.query_runner import (
+    RESULT_BUDGET_OPTIONS,
     TYPE_BOOLEAN,
     TYPE_DATE,
     TYPE_DATETIME,
@@ -19,6 +22,11 @@ from redash.query_runner import (
     InterruptException,
     JobTimeoutException,
     register,
+    split_sql_statements,
+)
+from redash.query_runner.connection_pool import (
+    acquire_connection,
+    release_connection,
 )
 
 logger = logging.getLogger(__name__)
@@ -71,6 +79,57 @@ def _wait(conn, timeout=None):
             raise psycopg2.OperationalError("select.error received")
 
 
+class _ServerSideCursor:
+    """
+    Reads the result of a query declared as a server-side cursor (DECLARE ... CURSOR) in `fetchmany` batches, so libpq
+    only holds the rows of one batch at a time. Named psycopg2 cursors would do the same, but async connections don't
+    support them.
+    """
+
+    name = "redash_result"
+
+    def __init__(self, connection, cursor):
+        self.connection = connection
+        self.cursor = cursor
+        # The first batch is fetched right away, for the description of the result.
+        self._first_batch = self._fetch(settings.QUERY_RESULTS_FETCH_SIZE)
+        self.description = cursor.description
+
+    def _fetch(self, size):
+        self.cursor.execute("FETCH FORWARD %s FROM {}".format(self.name), (size,))
+        _wait(self.connection)
+        return self.cursor.fetchall()
+
+    def fetchmany(self, size):
+        if self._first_batch is not None:
+            batch, self._first_batch = self._first_batch, None
+            return batch
+
+        return self._fetch(size)
+
+    def close(self):
+        """Ends the transaction, closing the cursor without reading the rest of a truncated result. Returns whether the
+        connection is still usable (it isn't when it's closed, or still busy with an interrupted FETCH)."""
+        if self.connection.closed or self.connection.isexecuting():
+            return False
+
+        try:
+            self.cursor.execute("COMMIT")
+            _wait(self.connection)
+        except (psycopg2.Error, select.error, OSError):
+            return False
+
+        return True
+
+
+def _can_declare_cursor(statement):
+    # SELECT ... INTO creates a table rather than returning rows, so it can't be declared as a cursor.
+    parsed = sqlparse.parse(statement)[0]
+    return parsed.get_type() == "SELECT" and not any(
+        token.match(sqlparse.tokens.Keyword, "INTO") for token in parsed.tokens
+    )
+
+
 def full_table_name(schema, name):
     if "." in name:
         name = '"{}"'.format(name)
@@ -149,6 +208,8 @@ def _parse_dsn(configuration):
 
 class PostgreSQL(BaseSQLQueryRunner):
     noop_query = "SELECT 1"
+    supports_connection_pooling = True
+    server_side_cursors = True
 
     @classmethod
     def configuration_schema(cls):
@@ -177,6 +238,7 @@ class PostgreSQL(BaseSQLQueryRunner):
                 "sslrootcertFile": {"type": "string", "title": "SSL Root Certificate"},
                 "sslcertFile": {"type": "string", "title": "SSL Client Certificate"},
                 "sslkeyFile": {"type": "string", "title": "SSL Client Key"},
+                **RESULT_BUDGET_OPTIONS,
             },
             "order": ["host", "port", "user", "password"],
             "required": ["dbname"],
@@ -186,6 +248,7 @@ class PostgreSQL(BaseSQLQueryRunner):
                 "sslrootcertFile",
                 "sslcertFile",
                 "sslkeyFile",
+                *RESULT_BUDGET_OPTIONS,
             ],
         }
 
@@ -268,25 +331,74 @@ class PostgreSQL(BaseSQLQueryRunner):
 
         return connection
 
-    def run_query(self, query, user):
+    def connect(self):
         connection = self._get_connection()
+
+        try:
+            _wait(connection, timeout=10)
+        except Exception:
+            connection.close()
+            raise
+        finally:
+            # The certificates are only needed while connecting.
+            _cleanup_ssl_certs(self.ssl_config)
+
+        return connection
+
+    def is_connection_usable(self, connection):
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            _wait(connection, timeout=10)
+        except (psycopg2.Error, OSError):
+            return False
+
+        return True
+
+    def reset_connection(self, connection):
+        cursor = connection.cursor()
+        cursor.execute("DISCARD ALL")
         _wait(connection, timeout=10)
 
+    def _execute(self, connection, cursor, query):
+        """Runs the query, and returns the cursor to read its result from: a server-side cursor for single SELECT
+        statements (which are the ones that can be declared as cursors), or else the client-side `cursor`."""
+        statements = split_sql_statements(query)
+        if self.server_side_cursors and len(statements) == 1 and _can_declare_cursor(statements[0]):
+            try:
+                # Declaring the cursor only plans the query, it's run as its rows are fetched.
+                cursor.execute(
+                    "BEGIN; DECLARE {} NO SCROLL CURSOR FOR {}".format(_ServerSideCursor.name, statements[0])
+                )
+                _wait(connection)
+                return _ServerSideCursor(connection, cursor)
+            except psycopg2.errors.FeatureNotSupported:
+                # E.g. data-modifying WITH queries, which can't be declared as cursors. Other errors (like a missing
+                # column) are the query's own, and would only fail again.
+                cursor.execute("ROLLBACK")
+                _wait(connection)
+
+        cursor.execute(query)
+        _wait(connection)
+        return cursor
+
+    def run_query(self, query, user):
+        connection = acquire_connection(self)
         cursor = connection.cursor()
+        result = None
+        reusable = False
 
         try:
-            cursor.execute(query)
-            _wait(connection)
+            result = self._execute(connection, cursor, query)
 
-            if cursor.description is not None:
-                columns = self.fetch_columns([(i[0], types_map.get(i[1], None)) for i in cursor.description])
-                rows = [dict(zip((column["name"] for column in columns), row)) for row in cursor]
-
-                data = {"columns": columns, "rows": rows}
+            if result.description is not None:
+                columns = self.fetch_columns([(i[0], types_map.get(i[1], None)) for i in result.description])
+                data = self.fetch_data(result, columns)
                 error = None
             else:
                 error = "Query completed but it returned no data."
                 data = None
+            reusable = True
         except (select.error, OSError):
             error = "Query interrupted. Please retry."
             data = None
@@ -297,13 +409,19 @@ class PostgreSQL(BaseSQLQueryRunner):
             connection.cancel()
             raise
         finally:
-            connection.close()
-            _cleanup_ssl_certs(self.ssl_config)
+            if isinstance(result, _ServerSideCursor):
+                reusable = result.close() and reusable
+            release_connection(self, connection, reusable)
 
         return data, error
 
 
 class Redshift(PostgreSQL):
+    # Redshift doesn't support DISCARD, so there is no way to reset the session of a pooled connection.
+    supports_connection_pooling = False
+    # Redshift materializes the whole result of cursors on the leader node.
+    server_side_cursors = False
+
     @classmethod
     def type(cls):
         return "redshift"
@@ -351,6 +469,7 @@ class Redshift(PostgreSQL):
                     "title": "Query Group for Scheduled Queries",
                     "default": "default",
                 },
+                **RESULT_BUDGET_OPTIONS,
             },
             "order": [
                 "host",
@@ -467,6 +586,7 @@ class RedshiftIAM(Redshift):
                     "title": "Query Group for Scheduled Queries",
                     "default": "default",
                 },
+                **RESULT_BUDGET_OPTIONS,
             },
             "order": [
                 "rolename",
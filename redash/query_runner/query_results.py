@@ -2,11 +2,16 @@ import datetime
 import decimal
 import hashlib
 import logging
+import os
 import re
 import sqlite3
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import parse_qs
 
-from redash import models
+from flask import current_app, has_app_context
+
+from redash import models, settings
 from redash.permissions import has_access, view_only
 from redash.query_runner import (
     TYPE_STRING,
@@ -63,43 +68,88 @@ def replace_query_parameters(query_text, params):
     return query_text
 
 
+def _check_cached_result(query):
+    if query.latest_query_data_id is None:
+        raise Exception("No cached result available for query {}.".format(query.id))
+
+
+def _run_query(query, user, params=None):
+    """Returns a function that runs the query, which doesn't need the database session."""
+    query_id = query.id
+    query_runner = query.data_source.query_runner
+    query_text = query.query_text
+    if params is not None:
+        query_text = replace_query_parameters(query_text, params)
+
+    def run():
+        results, error = query_runner.run_query(query_text, user)
+        if error:
+            raise Exception("Failed loading results for query id {}.".format(query_id))
+
+        return results
+
+    return run
+
+
 def get_query_results(user, query_id, bring_from_cache, params=None):
     query = _load_query(user, query_id)
     if bring_from_cache:
-        if query.latest_query_data_id is not None:
-            results = query.latest_query_data.data
-        else:
-            raise Exception("No cached result available for query {}.".format(query.id))
-    else:
-        query_text = query.query_text
-        if params is not None:
-            query_text = replace_query_parameters(query_text, params)
+        _check_cached_result(query)
+        return query.latest_query_data.data
 
-        results, error = query.data_source.query_runner.run_query(query_text, user)
-        if error:
-            raise Exception("Failed loading results for query id {}.".format(query.id))
+    return _run_query(query, user, params)()
 
+
+def _run_in_parallel(functions):
+    """Calls the functions in a thread pool (with the current app context, as the Query Results data source may be
+    queried itself), returning their results in order."""
+    if len(functions) <= 1 or settings.QUERY_RESULTS_RUNNER_PARALLELISM <= 1:
+        return [function() for function in functions]
+
+    app = current_app._get_current_object() if has_app_context() else None
+
+    def call(function):
+        if app is None:
+            return function()
+
+        with app.app_context():
+            return function()
+
+    pool = ThreadPoolExecutor(max_workers=settings.QUERY_RESULTS_RUNNER_PARALLELISM)
+    try:
+        results = list(pool.map(call, functions))
+    except BaseException:
+        # The job timing out or being cancelled (or a failed query) shouldn't wait for the other queries to finish.
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+
+    pool.shutdown()
     return results
 
 
 def create_tables_from_query_ids(user, connection, query_ids, query_params, cached_query_ids=[]):
     for query_id in set(cached_query_ids):
-        results = get_query_results(user, query_id, True)
+        query = _load_query(user, query_id)
+        _check_cached_result(query)
         table_name = "cached_query_{query_id}".format(query_id=query_id)
-        create_table(connection, table_name, results)
+        create_cached_table(connection, table_name, query)
 
+    # Queries (and permissions) are loaded here, the queries themselves run in parallel.
+    tables = []
     for query in set(query_params):
-        results = get_query_results(user, query[0], False, query[1])
         table_hash = hashlib.md5(
             "query_{query}_{hash}".format(query=query[0], hash=query[1]).encode(), usedforsecurity=False
         ).hexdigest()
         table_name = "query_{query_id}_{param_hash}".format(query_id=query[0], param_hash=table_hash)
-        create_table(connection, table_name, results)
+        tables.append((table_name, _run_query(_load_query(user, query[0]), user, query[1])))
 
     for query_id in set(query_ids):
-        results = get_query_results(user, query_id, False)
         table_name = "query_{query_id}".format(query_id=query_id)
-        create_table(connection, table_name, results)
+        tables.append((table_name, _run_query(_load_query(user, query_id), user)))
+
+    results = _run_in_parallel([run for _, run in tables])
+    for (table_name, _), table_results in zip(tables, results):
+        create_table(connection, table_name, table_results)
 
 
 def fix_column_name(name):
@@ -137,9 +187,95 @@ def create_table(connection, table_name, query_results):
         place_holders=",".join(["?"] * len(columns)),
     )
 
-    for row in query_results["rows"]:
-        values = [flatten(row.get(column)) for column in columns]
-        connection.execute(insert_template, values)
+    connection.executemany(
+        insert_template, ([flatten(row.get(column)) for column in columns] for row in query_results["rows"])
+    )
+
+
+# Name of the table in the files of the disk cache.
+CACHE_TABLE = "results"
+
+
+def _cache_path(query_result_id):
+    return os.path.join(settings.QUERY_RESULTS_RUNNER_CACHE_PATH, "{}.sqlite".format(query_result_id))
+
+
+def _write_cache_file(path, query_results):
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+
+    # Built aside and moved into place, so other processes never attach a partially written file.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        cache = sqlite3.connect(tmp_path)
+        try:
+            create_table(cache, CACHE_TABLE, query_results)
+            cache.commit()
+        finally:
+            cache.close()
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def _evict_cache_files(max_size):
+    """Deletes the least recently used cache files until the cache takes no more than `max_size` bytes."""
+    entries = []
+    with os.scandir(settings.QUERY_RESULTS_RUNNER_CACHE_PATH) as it:
+        for entry in it:
+            if entry.name.endswith(".sqlite"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_size -= size
+
+
+def create_cached_table(connection, table_name, query):
+    """Creates the table from the latest result of `query`. Loaded results are kept on disk (keyed by the query result
+    id), so later runs copy them into the table instead of loading them from the results' rows again."""
+    if not settings.QUERY_RESULTS_RUNNER_CACHE_PATH:
+        create_table(connection, table_name, query.latest_query_data.data)
+        return
+
+    path = _cache_path(query.latest_query_data_id)
+    try:
+        # Marks the file as recently used.
+        os.utime(path)
+    except FileNotFoundError:
+        _write_cache_file(path, query.latest_query_data.data)
+        _evict_cache_files(settings.QUERY_RESULTS_RUNNER_CACHE_SIZE * 1024 * 1024)
+
+    try:
+        connection.execute("ATTACH DATABASE ? AS result_cache", (path,))
+        try:
+            connection.execute(
+                "CREATE TABLE {table_name} AS SELECT * FROM result_cache.{cache_table}".format(
+                    table_name=table_name, cache_table=CACHE_TABLE
+                )
+            )
+        finally:
+            connection.execute("DETACH DATABASE result_cache")
+    except sqlite3.Error:
+        # The file was evicted by another process meanwhile (or is unreadable). Attaching a missing file creates an
+        # empty one, which shouldn't be mistaken for a cached table later.
+        logger.warning("Failed loading %s from the cache, loading it from the query result.", table_name)
+        try:
+            if os.path.getsize(path) == 0:
+                os.remove(path)
+        except OSError:
+            pass
+        connection.execute("DROP TABLE IF EXISTS {table_name}".format(table_name=table_name))
+        create_table(connection, table_name, query.latest_query_data.data)
 
 
 def prepare_parameterized_query(query, query_params):
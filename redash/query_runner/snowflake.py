@@ -11,6 +11,7 @@ from base64 import b64decode
 
 from redash import __version__
 from redash.query_runner import (
+    RESULT_BUDGET_OPTIONS,
     TYPE_BOOLEAN,
     TYPE_DATE,
     TYPE_DATETIME,
@@ -57,6 +58,7 @@ class Snowflake(BaseSQLQueryRunner):
                     "default": False,
                 },
                 "host": {"type": "string"},
+                **RESULT_BUDGET_OPTIONS,
             },
             "order": [
                 "account",
@@ -73,6 +75,7 @@ class Snowflake(BaseSQLQueryRunner):
             "secret": ["password", "private_key_File", "private_key_pwd"],
             "extra_options": [
                 "host",
+                *RESULT_BUDGET_OPTIONS,
             ],
         }
 
@@ -139,10 +142,7 @@ class Snowflake(BaseSQLQueryRunner):
         columns = self.fetch_columns(
             [(self._column_name(i[0]), self.determine_type(i[1], i[5])) for i in cursor.description]
         )
-        rows = [dict(zip((column["name"] for column in columns), row)) for row in cursor]
-
-        data = {"columns": columns, "rows": rows}
-        return data
+        return self.fetch_data(cursor, columns)
 
     def run_query(self, query, user):
         connection = self._get_connection()
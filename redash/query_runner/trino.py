@@ -3,6 +3,7 @@ import os
 
 from redash.models.users import ApiUser, User
 from redash.query_runner import (
+    RESULT_BUDGET_OPTIONS,
     TYPE_BOOLEAN,
     TYPE_DATE,
     TYPE_DATETIME,
@@ -87,6 +88,7 @@ class Trino(BaseSQLQueryRunner):
                     "default": "email",
                     "extendedEnum": [{"value": "email", "name": "Email"}, {"value": "name", "name": "Name"}],
                 },
+                **RESULT_BUDGET_OPTIONS,
             },
             "order": [
                 "protocol",
@@ -106,6 +108,7 @@ class Trino(BaseSQLQueryRunner):
                 "client_tags",
                 "impersonation",
                 "impersonationField",
+                *RESULT_BUDGET_OPTIONS,
             ],
         }
 
@@ -213,12 +216,9 @@ class Trino(BaseSQLQueryRunner):
 
         try:
             cursor.execute(query)
-            results = cursor.fetchall()
             description = cursor.description
             columns = self.fetch_columns([(c[0], TRINO_TYPES_MAPPING.get(c[1], None)) for c in description])
-            column_names = [c["name"] for c in columns]
-            rows = [dict(zip(column_names, [_convert_row_types(v) for v in r])) for r in results]
-            data = {"columns": columns, "rows": rows}
+            data = self.fetch_data(cursor, columns, lambda row: [_convert_row_types(v) for v in row])
             error = None
         except DatabaseError as db:
             data = None
@@ -11,11 +11,14 @@ from rq.timeouts import JobTimeoutException
 
 from redash import models
 from redash.models.parameterized_query import ParameterizedQuery
-from redash.permissions import has_access, view_only
+from redash.permissions import groups_grant_access, has_access, view_only
 from redash.serializers.query_result import (
     serialize_query_result,
+    serialize_query_result_page,
     serialize_query_result_to_dsv,
     serialize_query_result_to_xlsx,
+    stream_query_result_to_dsv,
+    stream_query_result_to_ndjson,
 )
 
 
@@ -55,13 +58,7 @@ def public_dashboard(dashboard):
         ("name", "layout", "dashboard_filters_enabled", "updated_at", "created_at", "options"),
     )
 
-    widget_list = (
-        models.Widget.query.filter(models.Widget.dashboard_id == dashboard.id)
-        .outerjoin(models.Visualization)
-        .outerjoin(models.Query)
-    )
-
-    dashboard_dict["widgets"] = [public_widget(w) for w in widget_list]
+    dashboard_dict["widgets"] = [public_widget(w) for w in dashboard.load_widgets()]
     return dashboard_dict
 
 
@@ -212,10 +209,23 @@ def serialize_dashboard(obj, with_widgets=False, user=None, with_favorite_state=
     widgets = []
 
     if with_widgets:
-        for w in obj.widgets:
+        dashboard_widgets = obj.load_widgets()
+        if user and not user.is_api_user():
+            is_admin = "admin" in user.permissions
+            # The groups of all the widgets' data sources, instead of looking them up for each widget.
+            groups = models.DataSource.groups_by_data_source(
+                w.visualization.query_rel.data_source_id for w in dashboard_widgets if w.visualization is not None
+            )
+
+        def can_view(query):
+            if user.is_api_user():
+                return has_access(query, user, view_only)
+            return is_admin or groups_grant_access(groups.get(query.data_source_id, {}), user.group_ids, view_only)
+
+        for w in dashboard_widgets:
             if w.visualization_id is None:
                 widgets.append(serialize_widget(w))
-            elif user and has_access(w.visualization.query_rel, user, view_only):
+            elif user and can_view(w.visualization.query_rel):
                 widgets.append(serialize_widget(w))
             else:
                 widget = project(
@@ -324,9 +334,13 @@ def serialize_job(job):
         error = ""
         result = query_result_id = job.result
 
+    return serialize_job_status(job.id, status, updated_at, error, result, query_result_id)
+
+
+def serialize_job_status(job_id, status, updated_at=0, error="", result=None, query_result_id=None):
     return {
         "job": {
-            "id": job.id,
+            "id": job_id,
             "updated_at": updated_at,
             "status": status,
             "error": error,
@@ -7,6 +7,7 @@ from funcy import project, rpartial
 
 from redash.authentication.org_resolving import current_org
 from redash.query_runner import TYPE_BOOLEAN, TYPE_DATE, TYPE_DATETIME
+from redash.utils import COMPACT_SEPARATORS, json_dumps
 
 
 def _convert_format(fmt):
@@ -80,24 +81,93 @@ def serialize_query_result(query_result, is_api_user):
         return query_result.to_dict()
 
 
-def serialize_query_result_to_dsv(query_result, delimiter):
-    s = io.StringIO()
+def _slice_rows(rows, offset, limit):
+    end = offset + limit if limit is not None else None
+    return rows[offset:end]
 
-    query_data = query_result.data
 
-    fieldnames, special_columns = _get_column_lists(query_data["columns"] or [])
+def serialize_query_result_page(query_result, offset=0, limit=None):
+    """
+    Serializes only the `[offset, offset + limit)` row range of the result. The returned `pagination` object holds
+    the total row count and the offset of the next page (`None` when this is the last one).
+    """
+    d = query_result.to_dict()
+    query_data = d["data"] or {}
+    rows = query_data.get("rows", [])
+
+    d["data"] = dict(query_data, rows=_slice_rows(rows, offset, limit))
+
+    next_offset = offset + limit if limit is not None and offset + limit < len(rows) else None
+    d["pagination"] = {"offset": offset, "limit": limit, "row_count": len(rows), "next_offset": next_offset}
+
+    return d
+
+
+def stream_query_result_to_ndjson(query_result, offset=0, limit=None, chunk_size=1000):
+    """
+    Returns a generator of newline delimited JSON. The first line is the query result without its rows (and with a
+    `row_count` in `data`), followed by one line per row of the requested range.
+    """
+    d = query_result.to_dict()
+    query_data = d["data"] or {}
+    rows = _slice_rows(query_data.get("rows", []), offset, limit)
+
+    d["data"] = {k: v for k, v in query_data.items() if k != "rows"}
+    d["data"]["row_count"] = len(query_data.get("rows", []))
+
+    def generate():
+        yield json_dumps({"query_result": d}, separators=COMPACT_SEPARATORS) + "\n"
+
+        for start in range(0, len(rows), chunk_size):
+            yield "".join(
+                json_dumps(row, separators=COMPACT_SEPARATORS) + "\n" for row in rows[start : start + chunk_size]
+            )
+
+    return generate()
+
+
+# Number of rows written to the buffer before a chunk of a streamed DSV response is sent out.
+DSV_CHUNK_SIZE = 1000
+
+
+def _generate_dsv(rows, fieldnames, special_columns, delimiter, chunk_size):
+    s = io.StringIO()
 
     writer = csv.DictWriter(s, extrasaction="ignore", fieldnames=fieldnames, delimiter=delimiter)
     writer.writeheader()
 
-    for row in query_data["rows"]:
-        for col_name, converter in special_columns.items():
-            if col_name in row:
-                row[col_name] = converter(row[col_name])
+    for i, row in enumerate(rows, 1):
+        converted = {
+            col_name: converter(row[col_name]) for col_name, converter in special_columns.items() if col_name in row
+        }
+        writer.writerow({**row, **converted} if converted else row)
+
+        if i % chunk_size == 0:
+            yield s.getvalue()
+            s.seek(0)
+            s.truncate()
+
+    if s.tell():
+        yield s.getvalue()
+
 
-        writer.writerow(row)
+def stream_query_result_to_dsv(query_result, delimiter, chunk_size=DSV_CHUNK_SIZE):
+    """
+    Returns a generator of DSV chunks, each one covering up to `chunk_size` rows. Special column converters are
+    applied to copies of the rows, so the result data itself is never modified.
 
-    return s.getvalue()
+    The column lists are resolved right away (they depend on the current org's settings), the rows are serialized
+    lazily as the generator is consumed.
+    """
+    query_data = query_result.data
+
+    fieldnames, special_columns = _get_column_lists(query_data["columns"] or [])
+
+    return _generate_dsv(query_data["rows"], fieldnames, special_columns, delimiter, chunk_size)
+
+
+def serialize_query_result_to_dsv(query_result, delimiter):
+    return "".join(stream_query_result_to_dsv(query_result, delimiter))
 
 
 def serialize_query_result_to_xlsx(query_result):
@@ -1,6 +1,7 @@
 import importlib
 import os
 import ssl
+import tempfile
 
 from flask_talisman import talisman
 from funcy import distinct, remove
@@ -44,11 +45,73 @@ RQ_REDIS_URL = os.environ.get("RQ_REDIS_URL", _REDIS_URL)
 QUERY_RESULTS_CLEANUP_ENABLED = parse_boolean(os.environ.get("REDASH_QUERY_RESULTS_CLEANUP_ENABLED", "true"))
 QUERY_RESULTS_CLEANUP_COUNT = int(os.environ.get("REDASH_QUERY_RESULTS_CLEANUP_COUNT", "100"))
 QUERY_RESULTS_CLEANUP_MAX_AGE = int(os.environ.get("REDASH_QUERY_RESULTS_CLEANUP_MAX_AGE", "7"))
+# Each run of the cleanup job keeps deleting results for up to QUERY_RESULTS_CLEANUP_TIME_LIMIT seconds, in batches
+# (starting at QUERY_RESULTS_CLEANUP_COUNT results) that get resized to take about QUERY_RESULTS_CLEANUP_BATCH_TIME
+# seconds each.
+QUERY_RESULTS_CLEANUP_TIME_LIMIT = int(os.environ.get("REDASH_QUERY_RESULTS_CLEANUP_TIME_LIMIT", "60"))
+QUERY_RESULTS_CLEANUP_BATCH_TIME = float(os.environ.get("REDASH_QUERY_RESULTS_CLEANUP_BATCH_TIME", "1"))
 
 QUERY_RESULTS_EXPIRED_TTL_ENABLED = parse_boolean(os.environ.get("REDASH_QUERY_RESULTS_EXPIRED_TTL_ENABLED", "false"))
 # default set query results expired ttl 86400 seconds
 QUERY_RESULTS_EXPIRED_TTL = int(os.environ.get("REDASH_QUERY_RESULTS_EXPIRED_TTL", "86400"))
 
+# Seconds to cache the latest result of each query in Redis, so looking it up doesn't scan the query's results in the
+# database (0 disables the cache). The payloads of new results of up to QUERY_RESULTS_CACHE_MAX_PAYLOAD_SIZE kilobytes
+# are cached too, up to QUERY_RESULTS_CACHE_SIZE megabytes of them (least recently used payloads are evicted).
+QUERY_RESULTS_CACHE_TTL = int(os.environ.get("REDASH_QUERY_RESULTS_CACHE_TTL", "0"))
+QUERY_RESULTS_CACHE_SIZE = int(os.environ.get("REDASH_QUERY_RESULTS_CACHE_SIZE", "256"))
+QUERY_RESULTS_CACHE_MAX_PAYLOAD_SIZE = int(os.environ.get("REDASH_QUERY_RESULTS_CACHE_MAX_PAYLOAD_SIZE", "1024"))
+
+# The Query Results data source keeps the cached_query_N tables it loads in a disk cache, keyed by query result id, up
+# to QUERY_RESULTS_RUNNER_CACHE_SIZE megabytes (least recently used tables are evicted). Set the path to an empty value
+# to disable the cache. Up to QUERY_RESULTS_RUNNER_PARALLELISM of the query_N queries it references run at the same
+# time.
+QUERY_RESULTS_RUNNER_CACHE_PATH = os.environ.get(
+    "REDASH_QUERY_RESULTS_RUNNER_CACHE_PATH", os.path.join(tempfile.gettempdir(), "redash_query_results_cache")
+)
+QUERY_RESULTS_RUNNER_CACHE_SIZE = int(os.environ.get("REDASH_QUERY_RESULTS_RUNNER_CACHE_SIZE", "1024"))
+QUERY_RESULTS_RUNNER_PARALLELISM = int(os.environ.get("REDASH_QUERY_RESULTS_RUNNER_PARALLELISM", "4"))
+
+# The options of dropdown (query based) parameters are cached by the id of the dropdown query's result: the last
+# DROPDOWN_OPTIONS_CACHE_SIZE option sets in each process, and for DROPDOWN_OPTIONS_CACHE_TTL seconds in Redis (0
+# disables the Redis cache).
+DROPDOWN_OPTIONS_CACHE_SIZE = int(os.environ.get("REDASH_DROPDOWN_OPTIONS_CACHE_SIZE", "32"))
+DROPDOWN_OPTIONS_CACHE_TTL = int(os.environ.get("REDASH_DROPDOWN_OPTIONS_CACHE_TTL", "86400"))
+
+# Storage format of new query results: "columnar" (column-major arrays, compressed) or "json" (plain row dicts).
+# Results stored in either format are always readable.
+QUERY_RESULTS_STORAGE_FORMAT = os.environ.get("REDASH_QUERY_RESULTS_STORAGE_FORMAT", "columnar")
+# Compression codec for columnar results: "zlib", "zstd" (requires zstandard), "lz4" (requires lz4) or "none".
+QUERY_RESULTS_COMPRESSION = os.environ.get("REDASH_QUERY_RESULTS_COMPRESSION", "zlib")
+
+# Stored result payloads larger than QUERY_RESULTS_BLOB_STORE_THRESHOLD bytes are offloaded from the database to an
+# external store: "filesystem" (under QUERY_RESULTS_BLOB_STORE_PATH, which should be shared by all the Redash
+# processes) or "s3" (set QUERY_RESULTS_BLOB_STORE_S3_ENDPOINT_URL to use an S3 compatible service). AWS credentials
+# are read from the usual boto3 sources. Leave empty to keep all payloads in the database.
+QUERY_RESULTS_BLOB_STORE = os.environ.get("REDASH_QUERY_RESULTS_BLOB_STORE", "")
+QUERY_RESULTS_BLOB_STORE_THRESHOLD = int(os.environ.get("REDASH_QUERY_RESULTS_BLOB_STORE_THRESHOLD", str(1024 * 1024)))
+QUERY_RESULTS_BLOB_STORE_PATH = os.environ.get("REDASH_QUERY_RESULTS_BLOB_STORE_PATH", "/var/lib/redash/query_results")
+QUERY_RESULTS_BLOB_STORE_S3_BUCKET = os.environ.get("REDASH_QUERY_RESULTS_BLOB_STORE_S3_BUCKET")
+QUERY_RESULTS_BLOB_STORE_S3_PREFIX = os.environ.get("REDASH_QUERY_RESULTS_BLOB_STORE_S3_PREFIX", "query_results/")
+QUERY_RESULTS_BLOB_STORE_S3_ENDPOINT_URL = os.environ.get("REDASH_QUERY_RESULTS_BLOB_STORE_S3_ENDPOINT_URL")
+
+# The number of rows SQL query runners fetch from the cursor at a time, and the maximum number of rows and
+# (approximate) bytes of a single result (0 is unlimited). Results over the budget are truncated. The limits can be
+# overridden for each data source with its "max_result_rows" and "max_result_bytes" options.
+QUERY_RESULTS_FETCH_SIZE = int(os.environ.get("REDASH_QUERY_RESULTS_FETCH_SIZE", "1000"))
+QUERY_RESULTS_MAX_ROWS = int(os.environ.get("REDASH_QUERY_RESULTS_MAX_ROWS", "0"))
+QUERY_RESULTS_MAX_BYTES = int(os.environ.get("REDASH_QUERY_RESULTS_MAX_BYTES", "0"))
+
+# Number of idle connections kept per data source by query runners that support connection pooling (PostgreSQL and
+# CockroachDB, which reset the sessions of released connections with DISCARD ALL), and how long (in seconds) a
+# connection may stay idle before it's closed. Pooling is disabled when the size is 0. RQ work horses are forked per
+# job and never reuse the connections of their parent, so connections are only reused across query jobs by workers
+# running jobs in-process (RQ_WORKER_IN_PROCESS).
+QUERY_RUNNER_CONNECTION_POOL_SIZE = int(os.environ.get("REDASH_QUERY_RUNNER_CONNECTION_POOL_SIZE", "0"))
+QUERY_RUNNER_CONNECTION_POOL_MAX_IDLE_TIME = int(
+    os.environ.get("REDASH_QUERY_RUNNER_CONNECTION_POOL_MAX_IDLE_TIME", "300")
+)
+
 SCHEMAS_REFRESH_SCHEDULE = int(os.environ.get("REDASH_SCHEMAS_REFRESH_SCHEDULE", 30))
 SCHEMAS_REFRESH_TIMEOUT = int(os.environ.get("REDASH_SCHEMAS_REFRESH_TIMEOUT", 300))
 
@@ -215,7 +278,26 @@ SCHEDULED_QUERY_TIME_LIMIT = int(os.environ.get("REDASH_SCHEDULED_QUERY_TIME_LIM
 # Time limit (in seconds) for adhoc queries. Set this to -1 to execute without a time limit.
 ADHOC_QUERY_TIME_LIMIT = int(os.environ.get("REDASH_ADHOC_QUERY_TIME_LIMIT", -1))
 
+# Maximum number of adhoc queries running at once on each data source (0 for no limit). Queries over the limit are held
+# until a slot frees up, taking turns between users. See `query_concurrency_limit` in dynamic_settings to set it per
+# data source.
+ADHOC_QUERY_CONCURRENCY_LIMIT = int(os.environ.get("REDASH_ADHOC_QUERY_CONCURRENCY_LIMIT", "0"))
+
+# Adhoc queries whose recent runtimes (the last QUERY_RUNTIME_HISTORY_SIZE of them) have a median of at least
+# SLOW_QUERY_THRESHOLD seconds are routed to the slow lane of their data source's queue, "<queue name>_slow" (e.g.
+# "queries_slow"), instead of the queue itself (0 disables it). No worker listens to the slow lanes by default: when
+# enabling it, run dedicated workers for them, e.g. `./manage.py rq worker queries_slow` (or QUEUES=queries_slow with
+# the Docker image's worker command). Keeping them apart from the other workers is what stops quick queries from
+# waiting behind slow ones.
+SLOW_QUERY_THRESHOLD = float(os.environ.get("REDASH_SLOW_QUERY_THRESHOLD", "0"))
+QUERY_RUNTIME_HISTORY_SIZE = int(os.environ.get("REDASH_QUERY_RUNTIME_HISTORY_SIZE", "10"))
+
 JOB_EXPIRY_TIME = int(os.environ.get("REDASH_JOB_EXPIRY_TIME", 3600 * 12))
+# Clients may wait up to JOB_STATUS_MAX_WAIT seconds for the status of a query job to change (long polling). It's
+# opt-in and disabled by default: the client asks to wait for 30 seconds, but with 0 the server answers right away and
+# the client polls the job as it used to. Each waiting client holds a web worker, so only enable it with asynchronous
+# (e.g. gevent) gunicorn workers.
+JOB_STATUS_MAX_WAIT = int(os.environ.get("REDASH_JOB_STATUS_MAX_WAIT", "0"))
 JOB_DEFAULT_FAILURE_TTL = int(os.environ.get("REDASH_JOB_DEFAULT_FAILURE_TTL", 7 * 24 * 60 * 60))
 
 LOG_LEVEL = os.environ.get("REDASH_LOG_LEVEL", "INFO")
@@ -225,6 +307,11 @@ LOG_FORMAT = os.environ.get(
     "REDASH_LOG_FORMAT",
     LOG_PREFIX + "[%(asctime)s][PID:%(process)d][%(levelname)s][%(name)s] %(message)s",
 )
+# Run jobs in the worker process itself instead of a work horse forked for each job (like RQ's SimpleWorker), so
+# state kept across jobs, such as pooled data source connections, is reused. Jobs' time limits are still enforced,
+# but running jobs can't be cancelled, and the hard time limit of a job that doesn't respond to its time limit isn't
+# enforced. A job crashing the interpreter takes the worker down with it.
+RQ_WORKER_IN_PROCESS = parse_boolean(os.environ.get("REDASH_RQ_WORKER_IN_PROCESS", "false"))
 RQ_WORKER_JOB_LOG_FORMAT = os.environ.get(
     "REDASH_RQ_WORKER_JOB_LOG_FORMAT",
     (
@@ -272,6 +359,11 @@ THROTTLE_LOGIN_PATTERN = os.environ.get("REDASH_THROTTLE_LOGIN_PATTERN", "50/hou
 LIMITER_STORAGE = os.environ.get("REDASH_LIMITER_STORAGE", REDIS_URL)
 THROTTLE_PASS_RESET_PATTERN = os.environ.get("REDASH_THROTTLE_PASS_RESET_PATTERN", "10/hour")
 
+# Seconds to cache the permissions granted by groups and the groups of data sources in Redis, on top of caching them
+# for the duration of a request (0 disables the Redis cache). Changes made through Redash invalidate the cache right
+# away.
+PERMISSIONS_CACHE_TTL = int(os.environ.get("REDASH_PERMISSIONS_CACHE_TTL", "0"))
+
 # CORS settings for the Query Result API (and possibly future external APIs).
 # In most cases all you need to do is set REDASH_CORS_ACCESS_CONTROL_ALLOW_ORIGIN
 # to the calling domain (or domains in a comma separated list).
@@ -390,6 +482,19 @@ DESTINATIONS = distinct(enabled_destinations + additional_destinations)
 
 EVENT_REPORTING_WEBHOOKS = array_from_string(os.environ.get("REDASH_EVENT_REPORTING_WEBHOOKS", ""))
 
+# Events are buffered in Redis and recorded in batches of up to EVENTS_BATCH_SIZE by a periodic job that runs every
+# EVENTS_FLUSH_INTERVAL seconds. With EVENT_REPORTING_WEBHOOKS_BATCHED, webhooks get a single request per batch (with a
+# list of events as its data) instead of a request per event. Failed deliveries are retried on the following runs, up
+# to EVENT_REPORTING_WEBHOOKS_MAX_RETRIES times.
+EVENTS_BATCH_SIZE = int(os.environ.get("REDASH_EVENTS_BATCH_SIZE", "1000"))
+EVENTS_FLUSH_INTERVAL = int(os.environ.get("REDASH_EVENTS_FLUSH_INTERVAL", "10"))
+EVENT_REPORTING_WEBHOOKS_BATCHED = parse_boolean(os.environ.get("REDASH_EVENT_REPORTING_WEBHOOKS_BATCHED", "false"))
+EVENT_REPORTING_WEBHOOKS_MAX_RETRIES = int(os.environ.get("REDASH_EVENT_REPORTING_WEBHOOKS_MAX_RETRIES", "3"))
+
+# The events table is partitioned by month. With EVENTS_RETENTION_DAYS set, the partitions of months that ended longer
+# than that ago are dropped as a whole (0 keeps all events).
+EVENTS_RETENTION_DAYS = int(os.environ.get("REDASH_EVENTS_RETENTION_DAYS", "0"))
+
 # Support for Sentry (https://getsentry.com/). Just set your Sentry DSN to enable it:
 SENTRY_DSN = os.environ.get("REDASH_SENTRY_DSN", "")
 SENTRY_ENVIRONMENT = os.environ.get("REDASH_SENTRY_ENVIRONMENT")
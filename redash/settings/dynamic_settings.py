@@ -11,6 +11,14 @@ def query_time_limit(is_scheduled, user_id, org_id):
         return settings.ADHOC_QUERY_TIME_LIMIT
 
 
+# Replace this method with your own implementation in case you want to limit the number of concurrent queries of
+# certain data sources differently. 0 means no limit.
+def query_concurrency_limit(data_source):
+    from redash import settings
+
+    return settings.ADHOC_QUERY_CONCURRENCY_LIMIT
+
+
 def periodic_jobs():
     """Schedule any custom periodic jobs here. For example:
 
@@ -2,6 +2,12 @@ from rq.connections import pop_connection, push_connection
 
 from redash import rq_redis_connection
 from redash.tasks.alerts import check_alerts_for_query
+from redash.tasks.concurrency import reconcile_concurrency
+from redash.tasks.events import (
+    enqueue_event,
+    flush_events,
+    maintain_event_partitions,
+)
 from redash.tasks.failure_report import send_aggregated_errors
 from redash.tasks.general import (
     record_event,
@@ -0,0 +1,170 @@
+"""
+Limits the number of queries running at once on each data source, and shares each data source's slots fairly between
+its users.
+
+Jobs of queries with a concurrency limit are held, instead of being pushed to their queue, until their data source
+has a free slot. Users with held jobs take turns (round robin), so one user firing many queries can't hold back
+everyone else's. Slots are freed by the workers when the jobs end, and by `reconcile_concurrency` for jobs whose
+workers died.
+"""
+import time
+
+from rq.exceptions import NoSuchJobError
+from rq.job import JobStatus
+from rq.utils import utcnow
+
+from redash import redis_connection, rq_redis_connection, statsd_client
+from redash.tasks.worker import Job, Queue
+from redash.worker import get_job_logger
+
+logger = get_job_logger(__name__)
+
+DATA_SOURCES_KEY = "query_concurrency:data_sources"
+LIMITS_KEY = "query_concurrency:limits"
+RUNNING_KEY = "query_concurrency:{}:running"
+USERS_KEY = "query_concurrency:{}:users"
+HELD_KEY = "query_concurrency:{}:held:"
+
+ENDED_STATUSES = (JobStatus.FINISHED, JobStatus.FAILED, JobStatus.CANCELED, JobStatus.STOPPED)
+
+# Optionally holds a job (ARGV[4]) of a user (ARGV[3]), then admits held jobs while the data source has free slots,
+# taking one job of each user in turn. Returns the admitted job ids.
+DISPATCH_SCRIPT = """
+local running, users = KEYS[1], KEYS[2]
+local limit, held_prefix = tonumber(ARGV[1]), ARGV[2]
+
+if ARGV[4] ~= '' then
+    if redis.call('RPUSH', held_prefix .. ARGV[3], ARGV[4]) == 1 then
+        redis.call('RPUSH', users, ARGV[3])
+    end
+end
+
+local admitted = {}
+while redis.call('ZCARD', running) < limit do
+    local user = redis.call('LPOP', users)
+    if not user then
+        break
+    end
+
+    local held = held_prefix .. user
+    local job_id = redis.call('LPOP', held)
+    if redis.call('LLEN', held) > 0 then
+        redis.call('RPUSH', users, user)
+    end
+
+    if job_id then
+        redis.call('ZADD', running, ARGV[5], job_id)
+        table.insert(admitted, job_id)
+    end
+end
+
+return admitted
+"""
+
+_dispatch_script = redis_connection.register_script(DISPATCH_SCRIPT)
+
+
+def _admit(job_ids):
+    """Pushes the admitted jobs to their queues. Returns the ids of the ones that were cancelled (or expired) while
+    they were held, to free their slots."""
+    skipped = []
+    for job_id in job_ids:
+        try:
+            job = Job.fetch(job_id, connection=rq_redis_connection)
+        except NoSuchJobError:
+            skipped.append(job_id)
+            continue
+
+        if job.is_cancelled or job.get_status() in ENDED_STATUSES:
+            skipped.append(job_id)
+            continue
+
+        statsd_client.timing("rq.jobs.held.{}".format(job.origin), 1000 * (utcnow() - job.created_at).total_seconds())
+        job.meta["admitted"] = True
+        Queue(job.origin, connection=rq_redis_connection).enqueue_job(job)
+
+    return skipped
+
+
+def _dispatch(data_source_id, limit, user=None, job_id=None):
+    running_key = RUNNING_KEY.format(data_source_id)
+    args = [limit, HELD_KEY.format(data_source_id)]
+    if job_id:
+        args.extend([user, job_id])
+    else:
+        args.extend(["", ""])
+
+    while True:
+        admitted = _dispatch_script(keys=[running_key, USERS_KEY.format(data_source_id)], args=args + [time.time()])
+        skipped = _admit(admitted)
+        if not skipped:
+            return
+
+        redis_connection.zrem(running_key, *skipped)
+        args[2:4] = ["", ""]
+
+
+def hold(job):
+    """Holds the (saved) job until its data source has a free slot, or admits it right away if it has one."""
+    data_source_id = job.meta["data_source_id"]
+    limit = job.meta["concurrency_limit"]
+
+    with redis_connection.pipeline() as pipe:
+        pipe.sadd(DATA_SOURCES_KEY, data_source_id)
+        pipe.hset(LIMITS_KEY, data_source_id, limit)
+        pipe.execute()
+
+    _dispatch(data_source_id, limit, str(job.meta["user_id"]), job.id)
+
+
+def release(job):
+    """Frees the slot of the job, and admits the next held job of its data source."""
+    data_source_id = job.meta["data_source_id"]
+    redis_connection.zrem(RUNNING_KEY.format(data_source_id), job.id)
+    _dispatch(data_source_id, job.meta["concurrency_limit"])
+
+
+def reconcile_concurrency():
+    """Frees the slots of jobs that ended without releasing them (e.g. when their worker was killed), and admits held
+    jobs to the freed slots."""
+    limits = redis_connection.hgetall(LIMITS_KEY)
+    for data_source_id in redis_connection.smembers(DATA_SOURCES_KEY):
+        running_key = RUNNING_KEY.format(data_source_id)
+        job_ids = redis_connection.zrange(running_key, 0, -1)
+        jobs = Job.fetch_many(job_ids, connection=rq_redis_connection)
+        ended = [job_id for job_id, job in zip(job_ids, jobs) if job is None or job.get_status() in ENDED_STATUSES]
+        if ended:
+            logger.info("Freeing the slots of ended jobs of data source %s: %s", data_source_id, ended)
+            redis_connection.zrem(running_key, *ended)
+
+        _dispatch(data_source_id, int(limits.get(data_source_id, 0)))
+
+        running = redis_connection.zcard(running_key)
+        users = redis_connection.llen(USERS_KEY.format(data_source_id))
+        statsd_client.gauge("query_concurrency.{}.running".format(data_source_id), running)
+        if not running and not users:
+            redis_connection.srem(DATA_SOURCES_KEY, data_source_id)
+
+
+def concurrency_status():
+    """Returns the limit, running and held jobs of each data source with limited concurrency."""
+    limits = redis_connection.hgetall(LIMITS_KEY)
+    status = []
+    for data_source_id in sorted(redis_connection.smembers(DATA_SOURCES_KEY), key=int):
+        users = redis_connection.lrange(USERS_KEY.format(data_source_id), 0, -1)
+        with redis_connection.pipeline() as pipe:
+            for user in users:
+                pipe.llen(HELD_KEY.format(data_source_id) + user)
+            held = pipe.execute()
+
+        status.append(
+            {
+                "data_source_id": int(data_source_id),
+                "limit": int(limits.get(data_source_id, 0)),
+                "running": redis_connection.zcard(RUNNING_KEY.format(data_source_id)),
+                "held": sum(held),
+                "waiting_users": len(users),
+            }
+        )
+
+    return status
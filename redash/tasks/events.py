@@ -0,0 +1,184 @@
+import time
+from datetime import timedelta
+from uuid import uuid4
+
+import requests
+from sqlalchemy.exc import DataError, IntegrityError
+
+from redash import models, redis_connection, settings, statsd_client
+from redash.utils import json_dumps, json_loads, utcnow
+from redash.worker import get_job_logger
+
+logger = get_job_logger(__name__)
+
+EVENTS_KEY = "events:pending"
+WEBHOOKS_RETRY_KEY = "events:webhooks:retry"
+FLUSH_LOCK_KEY = "events:flush:lock"
+
+WEBHOOK_SCHEMA = "iglu:io.redash.webhooks/event/jsonschema/1-0-0"
+BATCH_WEBHOOK_SCHEMA = "iglu:io.redash.webhooks/events/jsonschema/1-0-0"
+WEBHOOK_TIMEOUT = 10
+
+# Errors of events that can't be recorded (e.g. of a user that was deleted meanwhile, or malformed ones), as opposed to
+# errors of the database, which leave the events in the buffer to be recorded by the next run.
+BAD_EVENT_ERRORS = (IntegrityError, DataError, KeyError, TypeError, ValueError)
+
+# Deletes the lock (KEYS[1]) only if it's still held by this run (ARGV[1]), rather than by a run that took it after
+# this one's expired.
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_release_lock_script = redis_connection.register_script(RELEASE_LOCK_SCRIPT)
+
+
+def enqueue_event(event):
+    """Buffers the event, to be recorded by the next `flush_events` run."""
+    redis_connection.rpush(EVENTS_KEY, json_dumps(event))
+
+
+def _record(events):
+    """Records the events, dropping the ones that can't be recorded. Database errors (e.g. during an outage) are
+    raised, so the events aren't removed from the buffer."""
+    try:
+        recorded = models.Event.record_many(events)
+        models.db.session.commit()
+        return recorded
+    except BAD_EVENT_ERRORS:
+        models.db.session.rollback()
+        logger.exception("Failed recording a batch of %d events, recording them one by one.", len(events))
+    except Exception:
+        models.db.session.rollback()
+        raise
+
+    # A single bad event shouldn't hold back the others.
+    recorded = []
+    for event in events:
+        try:
+            recorded.extend(models.Event.record_many([event]))
+            models.db.session.commit()
+        except BAD_EVENT_ERRORS:
+            models.db.session.rollback()
+            logger.exception("Dropping event: %s", event)
+            statsd_client.incr("events.dropped")
+        except Exception:
+            models.db.session.rollback()
+            raise
+
+    return recorded
+
+
+def _post(session, hook, payload):
+    try:
+        response = session.post(hook, json=payload, timeout=WEBHOOK_TIMEOUT)
+        if response.status_code == 200:
+            return True
+        logger.error("Failed posting to %s: %s", hook, response.content)
+    except Exception:
+        logger.exception("Failed posting to %s", hook)
+
+    return False
+
+
+def _deliver(session, deliveries):
+    """Posts each (hook, payload, attempts) delivery, and queues the failed ones to be retried by the next runs."""
+    failed_hooks = set()
+    for hook, payload, attempts in deliveries:
+        # Don't wait on a hook that is down for every payload.
+        if hook not in failed_hooks:
+            logger.debug("Forwarding events to: %s", hook)
+            if _post(session, hook, payload):
+                statsd_client.incr("events.webhooks.delivered")
+                continue
+
+            failed_hooks.add(hook)
+            attempts += 1
+
+        statsd_client.incr("events.webhooks.failed")
+        if attempts > settings.EVENT_REPORTING_WEBHOOKS_MAX_RETRIES:
+            logger.error("Giving up posting to %s after %d attempts.", hook, attempts)
+            continue
+
+        redis_connection.rpush(
+            WEBHOOKS_RETRY_KEY, json_dumps({"hook": hook, "payload": payload, "attempts": attempts})
+        )
+
+
+def _webhook_payloads(events):
+    data = [event.to_dict() for event in events]
+    if settings.EVENT_REPORTING_WEBHOOKS_BATCHED:
+        return [{"schema": BATCH_WEBHOOK_SCHEMA, "data": data}]
+
+    return [{"schema": WEBHOOK_SCHEMA, "data": event_data} for event_data in data]
+
+
+def _pop_webhook_retries():
+    # Only the retries queued before this run, failures get queued again.
+    pending = redis_connection.llen(WEBHOOKS_RETRY_KEY)
+    retries = redis_connection.lrange(WEBHOOKS_RETRY_KEY, 0, pending - 1) if pending else []
+    redis_connection.ltrim(WEBHOOKS_RETRY_KEY, len(retries), -1)
+    return [json_loads(retry) for retry in retries]
+
+
+def flush_events():
+    """
+    Records the buffered events in batches, and forwards them to the event reporting webhooks.
+
+    Events are removed from the buffer only after they're committed, so a run that fails midway records some of them
+    again on the next run rather than losing them.
+    """
+    # Runs that take longer than the interval shouldn't record the same events concurrently.
+    lock_timeout = max(settings.EVENTS_FLUSH_INTERVAL * 10, 60)
+    lock_token = str(uuid4())
+    if not redis_connection.set(FLUSH_LOCK_KEY, lock_token, nx=True, ex=lock_timeout):
+        logger.info("Another run is flushing events, skipping.")
+        return
+
+    started_at = time.time()
+    recorded = 0
+    try:
+        with requests.Session() as session:
+            retries = _pop_webhook_retries()
+            _deliver(session, [(retry["hook"], retry["payload"], retry["attempts"]) for retry in retries])
+
+            while time.time() - started_at < settings.EVENTS_FLUSH_INTERVAL:
+                raw_events = redis_connection.lrange(EVENTS_KEY, 0, settings.EVENTS_BATCH_SIZE - 1)
+                if not raw_events:
+                    break
+
+                events = _record([json_loads(raw_event) for raw_event in raw_events])
+                redis_connection.ltrim(EVENTS_KEY, len(raw_events), -1)
+                recorded += len(events)
+
+                payloads = _webhook_payloads(events) if settings.EVENT_REPORTING_WEBHOOKS else []
+                _deliver(
+                    session, [(hook, payload, 0) for hook in settings.EVENT_REPORTING_WEBHOOKS for payload in payloads]
+                )
+
+                if len(raw_events) < settings.EVENTS_BATCH_SIZE:
+                    break
+    finally:
+        _release_lock_script(keys=[FLUSH_LOCK_KEY], args=[lock_token])
+
+    statsd_client.incr("events.recorded", recorded)
+    statsd_client.gauge("events.pending", redis_connection.llen(EVENTS_KEY))
+    statsd_client.timing("events.flush", 1000 * (time.time() - started_at))
+    logger.info("Recorded %d events in %.2f seconds.", recorded, time.time() - started_at)
+
+
+def maintain_event_partitions():
+    """Creates the partitions of the events table for this month and the next one, and drops the ones older than
+    `EVENTS_RETENTION_DAYS`."""
+    now = utcnow()
+    for month in (now, now.replace(day=1) + timedelta(days=32)):
+        name = models.Event.create_partition(month)
+        logger.info("Events partition %s is ready.", name)
+
+    if settings.EVENTS_RETENTION_DAYS:
+        dropped = models.Event.drop_partitions(now - timedelta(days=settings.EVENTS_RETENTION_DAYS))
+        logger.info("Dropped events partitions: %s", dropped)
+
+    models.db.session.commit()
@@ -11,6 +11,8 @@ from redash.worker import get_job_logger, job
 logger = get_job_logger(__name__)
 
 
+# Events are recorded in batches by `redash.tasks.events.flush_events`. This job only records the events enqueued by
+# earlier versions.
 @job("default")
 def record_event(raw_event):
     event = models.Event.record(raw_event)
@@ -1,7 +1,8 @@
 import signal
 import sys
 import time
-from collections import deque
+from collections import defaultdict, deque
+from uuid import uuid4
 
 import redis
 from rq import get_current_job
@@ -9,16 +10,25 @@ from rq.exceptions import NoSuchJobError
 from rq.job import JobStatus
 from rq.timeouts import JobTimeoutException
 
-from redash import models, redis_connection, settings
+from redash import models, redis_connection, settings, statsd_client
 from redash.query_runner import InterruptException
 from redash.tasks.alerts import check_alerts_for_query
 from redash.tasks.failure_report import track_failure
+from redash.tasks.queries.job_status import (
+    FAILED,
+    FINISHED,
+    STARTED,
+    publish_job_status,
+)
+from redash.tasks.queries.runtimes import predict_runtime, record_runtime
 from redash.tasks.worker import Job, Queue
 from redash.utils import gen_query_hash, utcnow
+from redash.utils.column_stats import compute_column_stats
 from redash.worker import get_job_logger
 
 logger = get_job_logger(__name__)
 TIMEOUT_MESSAGE = "Query exceeded Redash query execution time limit."
+ENQUEUE_BATCH_SIZE = 500
 
 
 def _job_lock_id(query_hash, data_source_id):
@@ -72,6 +82,7 @@ def enqueue_query(query, data_source, user_id, is_api_key=False, scheduled_query
             if not job:
                 pipe.multi()
 
+                predicted_runtime = None
                 if scheduled_query:
                     queue_name = data_source.scheduled_queue_name
                     scheduled_query_id = scheduled_query.id
@@ -79,6 +90,13 @@ def enqueue_query(query, data_source, user_id, is_api_key=False, scheduled_query
                     queue_name = data_source.queue_name
                     scheduled_query_id = None
 
+                    # Queries predicted to run long go to the slow lane of their data source's queue, so they don't
+                    # hold back quick ones.
+                    if settings.SLOW_QUERY_THRESHOLD:
+                        predicted_runtime = predict_runtime(data_source.id, query_hash)
+                        if predicted_runtime is not None and predicted_runtime >= settings.SLOW_QUERY_THRESHOLD:
+                            queue_name = "{}_slow".format(data_source.queue_name)
+
                 time_limit = settings.dynamic_settings.query_time_limit(scheduled_query, user_id, data_source.org_id)
                 metadata["Queue"] = queue_name
 
@@ -95,11 +113,16 @@ def enqueue_query(query, data_source, user_id, is_api_key=False, scheduled_query
                         "scheduled": scheduled_query_id is not None,
                         "query_id": metadata.get("query_id"),
                         "user_id": user_id,
+                        "predicted_runtime": predicted_runtime,
                     },
                 }
 
                 if not scheduled_query:
                     enqueue_kwargs["result_ttl"] = settings.JOB_EXPIRY_TIME
+                    # Held (by the queue) while the data source has as many queries running.
+                    concurrency_limit = settings.dynamic_settings.query_concurrency_limit(data_source)
+                    if concurrency_limit:
+                        enqueue_kwargs["meta"]["concurrency_limit"] = concurrency_limit
 
                 job = queue.enqueue(execute_query, query, data_source.id, metadata, **enqueue_kwargs)
 
@@ -123,6 +146,115 @@ def enqueue_query(query, data_source, user_id, is_api_key=False, scheduled_query
     return job
 
 
+def _scheduled_query_metadata(query):
+    return {"query_id": query.id, "Username": query.user.get_actual_user()}
+
+
+def _prepare_scheduled_job(query_text, query, job_id):
+    data_source = query.data_source
+    metadata = _scheduled_query_metadata(query)
+    metadata["Queue"] = data_source.scheduled_queue_name
+
+    return Queue.prepare_data(
+        execute_query,
+        args=(query_text, data_source.id, metadata),
+        kwargs={"user_id": query.user_id, "scheduled_query_id": query.id, "is_api_key": False},
+        timeout=settings.dynamic_settings.query_time_limit(query, query.user_id, data_source.org_id),
+        failure_ttl=settings.JOB_DEFAULT_FAILURE_TTL,
+        job_id=job_id,
+        meta={
+            "data_source_id": data_source.id,
+            "org_id": data_source.org_id,
+            "scheduled": True,
+            "query_id": query.id,
+            "user_id": query.user_id,
+        },
+    )
+
+
+def _enqueue_scheduled_batch(batch):
+    """Enqueues a batch of (query text, query) pairs with a couple of pipelined Redis round-trips: one transaction
+    taking the job locks of the queries that don't have one, and one pipeline creating their jobs.
+
+    Returns the enqueued queries, and the pairs that still need to go through `enqueue_query` (queries that already
+    have a job lock, or all of them if the locks changed meanwhile)."""
+    lock_ids = [_job_lock_id(gen_query_hash(query_text), query.data_source_id) for query_text, query in batch]
+
+    with redis_connection.pipeline() as pipe:
+        try:
+            pipe.watch(*lock_ids)
+            existing_jobs = pipe.mget(lock_ids)
+
+            pending = {}
+            locked = []
+            for lock_id, job_id, (query_text, query) in zip(lock_ids, existing_jobs, batch):
+                if job_id or lock_id in pending:
+                    locked.append((query_text, query))
+                else:
+                    pending[lock_id] = (query_text, query, str(uuid4()))
+
+            job_datas = defaultdict(list)
+            for query_text, query, job_id in pending.values():
+                job_data = _prepare_scheduled_job(query_text, query, job_id)
+                job_datas[query.data_source.scheduled_queue_name].append(job_data)
+
+            pipe.multi()
+            for lock_id, (_, _, job_id) in pending.items():
+                pipe.set(lock_id, job_id, settings.JOB_EXPIRY_TIME)
+            pipe.execute()
+        except redis.WatchError:
+            logger.info("Job locks changed while enqueueing scheduled queries, enqueueing them one by one.")
+            return [], batch
+
+    queues = [Queue(queue_name) for queue_name in job_datas]
+    if queues:
+        jobs_pipe = queues[0].connection.pipeline()
+        for queue in queues:
+            queue.enqueue_many(job_datas[queue.name], pipeline=jobs_pipe)
+        jobs_pipe.execute()
+
+        for queue in queues:
+            statsd_client.incr("rq.jobs.created.{}".format(queue.name), len(job_datas[queue.name]))
+
+    logger.info("Created %d jobs for scheduled queries.", len(pending))
+    return [query for _, query, _ in pending.values()], locked
+
+
+def enqueue_scheduled_queries(queries, batch_size=ENQUEUE_BATCH_SIZE):
+    """Enqueues the executions of scheduled queries, given as (query text, query) pairs, in pipelined batches instead
+    of a Redis transaction per query.
+
+    Returns the enqueued queries, and the (query, exception) pairs of the ones that couldn't be enqueued.
+    """
+    enqueued = []
+    failed = []
+
+    for start in range(0, len(queries), batch_size):
+        batch = queries[start : start + batch_size]
+        try:
+            batch_enqueued, remaining = _enqueue_scheduled_batch(batch)
+        except Exception:
+            logger.exception("Failed enqueueing a batch of scheduled queries, enqueueing them one by one.")
+            batch_enqueued, remaining = [], batch
+
+        enqueued.extend(batch_enqueued)
+
+        for query_text, query in remaining:
+            try:
+                enqueue_query(
+                    query_text,
+                    query.data_source,
+                    query.user_id,
+                    scheduled_query=query,
+                    metadata=_scheduled_query_metadata(query),
+                )
+                enqueued.append(query)
+            except Exception as e:
+                failed.append((query, e))
+
+    return enqueued, failed
+
+
 def signal_handler(*args):
     raise InterruptException
 
@@ -197,9 +329,10 @@ class QueryExecutor:
     def run(self):
         signal.signal(signal.SIGINT, signal_handler)
         started_at = time.time()
+        self.started_at = utcnow()
 
         logger.debug("Executing query:\n%s", self.query)
-        self._log_progress("executing_query")
+        self._log_progress("executing_query", STARTED)
 
         query_runner = self.data_source.query_runner
         annotated_query = self._annotate_query(query_runner)
@@ -216,6 +349,7 @@ class QueryExecutor:
             logger.warning("Unexpected error while running query:", exc_info=1)
 
         run_time = time.time() - started_at
+        record_runtime(self.data_source.id, self.query_hash, run_time)
 
         logger.info(
             "job=execute_query query_hash=%s ds_id=%d data_length=%s error=[%s]",
@@ -248,6 +382,7 @@ class QueryExecutor:
                 data,
                 run_time,
                 utcnow(),
+                column_stats=compute_column_stats(data),
             )
 
             updated_query_ids = models.Query.update_latest_result(query_result)
@@ -256,10 +391,10 @@ class QueryExecutor:
             self._log_progress("checking_alerts")
             for query_id in updated_query_ids:
                 check_alerts_for_query.delay(query_id, self.metadata)
-            self._log_progress("finished")
-
             result = query_result.id
             models.db.session.commit()
+            query_result.cache()
+            self._log_progress("finished", FINISHED, query_result_id=result)
             return result
 
     def _annotate_query(self, query_runner):
@@ -269,7 +404,7 @@ class QueryExecutor:
 
         return query_runner.annotate_query(self.query, self.metadata)
 
-    def _log_progress(self, state):
+    def _log_progress(self, state, status=None, **kwargs):
         logger.info(
             "job=execute_query state=%s query_hash=%s type=%s ds_id=%d "
             "job_id=%s queue=%s query_id=%s username=%s",  # fmt: skip
@@ -283,6 +418,9 @@ class QueryExecutor:
             self.metadata.get("Username", "unknown"),
         )
 
+        if status is not None:
+            publish_job_status(self.job.id, status, self.started_at, **kwargs)
+
     def _load_data_source(self):
         logger.info("job=execute_query state=load_ds ds_id=%d", self.data_source_id)
         return models.DataSource.query.get(self.data_source_id)
@@ -309,4 +447,18 @@ def execute_query(
         ).run()
     except QueryExecutionError as e:
         models.db.session.rollback()
+        publish_job_status(get_current_job().id, FAILED, error=str(e))
         return e
+    except BaseException as e:
+        # Anything else (e.g. timing out or being cancelled while storing the result) fails the job in RQ, but the
+        # clients waiting on its status would still see it running.
+        if isinstance(e, JobTimeoutException):
+            error = TIMEOUT_MESSAGE
+        elif isinstance(e, InterruptException):
+            error = "Query cancelled by user."
+        else:
+            error = str(e)
+
+        publish_job_status(get_current_job().id, FAILED, error=error)
+        models.db.session.rollback()
+        raise
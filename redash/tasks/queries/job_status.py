@@ -0,0 +1,133 @@
+"""
+Pushes the status changes of query jobs to the clients waiting on them, instead of having each client poll the job.
+
+Workers publish each job's status (in the same format as `serialize_job`) on a Redis channel of its own, and keep the
+last one in a key. Each web process has a single subscriber to all the channels, which wakes up the requests waiting
+on the job, so any number of clients waiting on the same job share one notification.
+"""
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from redash import redis_connection, settings
+from redash.utils import json_dumps, json_loads
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUS_KEY = "job_status:{}"
+# Job statuses, as serialized by `serialize_job`.
+QUEUED, STARTED, FINISHED, FAILED = 1, 2, 3, 4
+SUBSCRIBE_TIMEOUT = 1
+
+_waiters = defaultdict(set)
+_waiters_lock = threading.Lock()
+_listener = None
+_listener_ready = threading.Event()
+_listener_pid = None
+
+
+def publish_job_status(job_id, status, updated_at=0, error="", query_result_id=None):
+    from redash.serializers import serialize_job_status
+
+    payload = serialize_job_status(job_id, status, updated_at, error, query_result_id, query_result_id)
+    message = json_dumps(payload)
+
+    try:
+        with redis_connection.pipeline() as pipe:
+            pipe.set(JOB_STATUS_KEY.format(job_id), message, settings.JOB_EXPIRY_TIME)
+            pipe.publish(JOB_STATUS_KEY.format(job_id), message)
+            pipe.execute()
+    except Exception:
+        # Waiting clients fall back to polling the job.
+        logger.exception("Failed publishing the status of job %s.", job_id)
+
+    return payload
+
+
+class _Waiter:
+    def __init__(self):
+        self.event = threading.Event()
+        self.payload = None
+
+    def notify(self, payload):
+        self.payload = payload
+        self.event.set()
+
+
+def _listen(ready):
+    channels = JOB_STATUS_KEY.format("*")
+    pubsub = redis_connection.pubsub()
+    try:
+        pubsub.psubscribe(channels)
+        for message in pubsub.listen():
+            if message["type"] == "psubscribe":
+                ready.set()
+            elif message["type"] == "pmessage":
+                job_id = message["channel"][len(channels) - 1 :]
+                with _waiters_lock:
+                    waiters = list(_waiters.get(job_id, ()))
+                if waiters:
+                    payload = json_loads(message["data"])
+                    for waiter in waiters:
+                        waiter.notify(payload)
+    except Exception:
+        logger.exception("Job status listener failed.")
+    finally:
+        ready.clear()
+        pubsub.close()
+
+
+def _ensure_listener():
+    """Starts the subscriber of this process (again, if it died or the process was forked since) and waits for it to
+    subscribe. Returns whether it's listening."""
+    global _listener, _listener_ready, _listener_pid
+
+    with _waiters_lock:
+        if _listener is None or not _listener.is_alive() or _listener_pid != os.getpid():
+            _listener_ready = threading.Event()
+            _listener_pid = os.getpid()
+            _listener = threading.Thread(
+                target=_listen, args=(_listener_ready,), name="job-status-listener", daemon=True
+            )
+            _listener.start()
+        ready = _listener_ready
+
+    return ready.wait(SUBSCRIBE_TIMEOUT)
+
+
+def _latest_job_status(job_id):
+    payload = redis_connection.get(JOB_STATUS_KEY.format(job_id))
+    return json_loads(payload) if payload else None
+
+
+def wait_for_job_status(job_id, known_status, timeout):
+    """
+    Waits up to `timeout` seconds for the job's status to change from `known_status`, and returns the new one, or
+    None if it didn't change (or its changes can't be listened to).
+    """
+    if not _ensure_listener():
+        return None
+
+    waiter = _Waiter()
+    with _waiters_lock:
+        _waiters[job_id].add(waiter)
+
+    try:
+        # The status might have changed before the waiter was registered.
+        payload = _latest_job_status(job_id)
+        deadline = time.time() + timeout
+        while payload is None or payload["job"]["status"] == known_status:
+            remaining = deadline - time.time()
+            if remaining <= 0 or not waiter.event.wait(remaining):
+                return None
+            waiter.event.clear()
+            payload = waiter.payload
+
+        return payload
+    finally:
+        with _waiters_lock:
+            _waiters[job_id].discard(waiter)
+            if not _waiters[job_id]:
+                del _waiters[job_id]
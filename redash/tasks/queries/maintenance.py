@@ -1,3 +1,4 @@
+import datetime
 import logging
 import time
 
@@ -11,13 +12,17 @@ from redash.models.parameterized_query import (
 from redash.monitor import rq_job_ids
 from redash.query_runner import NotSupported
 from redash.tasks.failure_report import track_failure
-from redash.utils import json_dumps, sentry
+from redash.utils import json_dumps, sentry, utcnow
 from redash.worker import get_job_logger, job
 
-from .execution import enqueue_query
+from .execution import enqueue_scheduled_queries
 
 logger = get_job_logger(__name__)
 
+CLEANUP_CURSOR_KEY = "query_results:cleanup:last_id"
+CLEANUP_MIN_BATCH_SIZE = 10
+CLEANUP_MAX_BATCH_SIZE = 10000
+
 
 def empty_schedules():
     logger.info("Deleting schedules of past scheduled queries...")
@@ -76,6 +81,13 @@ class RefreshQueriesError(Exception):
     pass
 
 
+def _report_enqueue_error(query, e):
+    message = "Could not enqueue query %d due to %s" % (query.id, repr(e))
+    logging.info(message)
+    error = RefreshQueriesError(message).with_traceback(e.__traceback__)
+    sentry.capture_exception(error)
+
+
 def _apply_auto_limit(query_text, query):
     should_apply_auto_limit = query.options.get("apply_auto_limit", False)
     return query.data_source.query_runner.apply_auto_limit(query_text, should_apply_auto_limit)
@@ -84,7 +96,7 @@ def _apply_auto_limit(query_text, query):
 def refresh_queries():
     started_at = time.time()
     logger.info("Refreshing queries...")
-    enqueued = []
+    pending = []
     for query in models.Query.outdated_queries():
         if not _should_refresh_query(query):
             continue
@@ -92,19 +104,13 @@ def refresh_queries():
         try:
             query_text = _apply_default_parameters(query)
             query_text = _apply_auto_limit(query_text, query)
-            enqueue_query(
-                query_text,
-                query.data_source,
-                query.user_id,
-                scheduled_query=query,
-                metadata={"query_id": query.id, "Username": query.user.get_actual_user()},
-            )
-            enqueued.append(query)
+            pending.append((query_text, query))
         except Exception as e:
-            message = "Could not enqueue query %d due to %s" % (query.id, repr(e))
-            logging.info(message)
-            error = RefreshQueriesError(message).with_traceback(e.__traceback__)
-            sentry.capture_exception(error)
+            _report_enqueue_error(query, e)
+
+    enqueued, failed = enqueue_scheduled_queries(pending)
+    for query, e in failed:
+        _report_enqueue_error(query, e)
 
     status = {
         "started_at": started_at,
@@ -112,32 +118,76 @@ def refresh_queries():
         "last_refresh_at": time.time(),
         "query_ids": json_dumps([q.id for q in enqueued]),
     }
+    # Stores the next run times computed by outdated_queries.
+    models.db.session.commit()
 
     redis_connection.hset("redash:status", mapping=status)
     logger.info("Done refreshing queries: %s" % status)
 
 
+def delete_unused_query_results(max_age, batch_size, batch_time, start_id=0, end_id=None, time_limit=None):
+    """
+    Walks the query results by id from `start_id`, deleting the unused ones that are `max_age` days old or more, and
+    committing after each batch. Batches are resized to take about `batch_time` seconds.
+
+    Yields the last id that was looked at, the number of deleted results and the size of each batch. The last id is
+    None once the walk reached the results newer than `max_age` (or `end_id`). Stops after `time_limit` seconds.
+    """
+    age_threshold = utcnow() - datetime.timedelta(days=max_age)
+    started_at = time.monotonic()
+    last_id = start_id
+
+    while time_limit is None or time.monotonic() - started_at < time_limit:
+        batch_started_at = time.monotonic()
+        deleted, last_id, only_recent = models.QueryResult.delete_unused(last_id, batch_size, age_threshold, end_id)
+        models.db.session.commit()
+
+        if last_id is None or only_recent:
+            yield None, deleted, batch_size
+            return
+
+        yield last_id, deleted, batch_size
+
+        elapsed = time.monotonic() - batch_started_at
+        if elapsed < batch_time / 2:
+            batch_size = min(batch_size * 2, CLEANUP_MAX_BATCH_SIZE)
+        elif elapsed > batch_time:
+            batch_size = max(batch_size // 2, CLEANUP_MIN_BATCH_SIZE)
+
+
 def cleanup_query_results():
     """
     Job to cleanup unused query results -- such that no query links to them anymore, and older than
     settings.QUERY_RESULTS_CLEANUP_MAX_AGE (a week by default, so it's less likely to be open in someone's browser and be used).
 
-    Each time the job deletes only settings.QUERY_RESULTS_CLEANUP_COUNT (100 by default) query results so it won't choke
-    the database in case of many such results.
+    Each time the job continues walking the results from where the previous one stopped, for up to
+    settings.QUERY_RESULTS_CLEANUP_TIME_LIMIT seconds, so it won't choke the database in case of many such results.
+    Once it reaches the recent results, the next run starts over.
     """
+    start_id = int(redis_connection.get(CLEANUP_CURSOR_KEY) or 0)
 
     logger.info(
-        "Running query results clean up (removing maximum of %d unused results, that are %d days old or more)",
-        settings.QUERY_RESULTS_CLEANUP_COUNT,
+        "Running query results clean up (removing unused results that are %d days old or more, from id %d)",
         settings.QUERY_RESULTS_CLEANUP_MAX_AGE,
+        start_id,
     )
 
-    unused_query_results = models.QueryResult.unused(settings.QUERY_RESULTS_CLEANUP_MAX_AGE)
-    deleted_count = models.QueryResult.query.filter(
-        models.QueryResult.id.in_(unused_query_results.limit(settings.QUERY_RESULTS_CLEANUP_COUNT).subquery())
-    ).delete(synchronize_session=False)
-    models.db.session.commit()
-    logger.info("Deleted %d unused query results.", deleted_count)
+    deleted_count = 0
+    last_id = start_id
+    for last_id, deleted, batch_size in delete_unused_query_results(
+        settings.QUERY_RESULTS_CLEANUP_MAX_AGE,
+        settings.QUERY_RESULTS_CLEANUP_COUNT,
+        settings.QUERY_RESULTS_CLEANUP_BATCH_TIME,
+        start_id=start_id,
+        time_limit=settings.QUERY_RESULTS_CLEANUP_TIME_LIMIT,
+    ):
+        deleted_count += deleted
+        redis_connection.set(CLEANUP_CURSOR_KEY, last_id or 0)
+        statsd_client.incr("query_results.cleanup.deleted", deleted)
+        statsd_client.gauge("query_results.cleanup.batch_size", batch_size)
+
+    statsd_client.gauge("query_results.cleanup.last_id", last_id or 0)
+    logger.info("Deleted %d unused query results, the next run starts from id %d.", deleted_count, last_id or 0)
 
 
 def remove_ghost_locks():
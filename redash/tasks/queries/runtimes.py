@@ -0,0 +1,52 @@
+"""
+Keeps a rolling profile of the runtimes of each query (by data source and query hash), to route the queries that are
+predicted to run long to a slow lane queue of their own, so quick queries don't wait behind them.
+"""
+from statistics import median
+
+from redash import models, redis_connection, settings
+
+RUNTIMES_KEY = "query_runtimes:{}:{}"
+RUNTIMES_TTL = 30 * 24 * 60 * 60
+
+
+def record_runtime(data_source_id, query_hash, runtime):
+    key = RUNTIMES_KEY.format(data_source_id, query_hash)
+    with redis_connection.pipeline() as pipe:
+        pipe.lpush(key, runtime)
+        pipe.ltrim(key, 0, settings.QUERY_RUNTIME_HISTORY_SIZE - 1)
+        pipe.expire(key, RUNTIMES_TTL)
+        pipe.execute()
+
+
+def _stored_runtimes(data_source_id, query_hash):
+    results = (
+        models.QueryResult.query.filter(
+            models.QueryResult.data_source_id == data_source_id,
+            models.QueryResult.query_hash == query_hash,
+        )
+        .order_by(models.QueryResult.retrieved_at.desc())
+        .with_entities(models.QueryResult.runtime)
+        .limit(settings.QUERY_RUNTIME_HISTORY_SIZE)
+    )
+    return [runtime for runtime, in results if runtime is not None]
+
+
+def predict_runtime(data_source_id, query_hash):
+    """Returns the median of the query's recent runtimes (in seconds), or None if it has none. The profile of queries
+    that weren't executed since it expired starts from the runtimes of their stored results."""
+    key = RUNTIMES_KEY.format(data_source_id, query_hash)
+    runtimes = [float(runtime) for runtime in redis_connection.lrange(key, 0, -1)]
+
+    if not runtimes:
+        runtimes = _stored_runtimes(data_source_id, query_hash)
+        if not runtimes:
+            return None
+
+        with redis_connection.pipeline() as pipe:
+            # Newest first, like `record_runtime` keeps them.
+            pipe.rpush(key, *runtimes)
+            pipe.expire(key, RUNTIMES_TTL)
+            pipe.execute()
+
+    return median(runtimes)
@@ -7,6 +7,8 @@ from rq.job import Job
 from rq_scheduler import Scheduler
 
 from redash import rq_redis_connection, settings
+from redash.tasks.concurrency import reconcile_concurrency
+from redash.tasks.events import flush_events, maintain_event_partitions
 from redash.tasks.failure_report import send_aggregated_errors
 from redash.tasks.general import sync_user_details, version_check
 from redash.tasks.queries import (
@@ -62,6 +64,7 @@ def periodic_job_definitions():
             "interval": timedelta(minutes=1),
             "result_ttl": 600,
         },
+        {"func": reconcile_concurrency, "interval": timedelta(minutes=1), "result_ttl": 600},
         {"func": empty_schedules, "interval": timedelta(minutes=60)},
         {
             "func": refresh_schemas,
@@ -73,6 +76,13 @@ def periodic_job_definitions():
             "interval": timedelta(minutes=1),
             "result_ttl": 600,
         },
+        {
+            "func": flush_events,
+            "timeout": settings.EVENTS_FLUSH_INTERVAL * 10,
+            "interval": settings.EVENTS_FLUSH_INTERVAL,
+            "result_ttl": 600,
+        },
+        {"func": maintain_event_partitions, "interval": timedelta(hours=1)},
         {
             "func": send_aggregated_errors,
             "interval": timedelta(minutes=settings.SEND_FAILURE_EMAIL_INTERVAL),
@@ -9,11 +9,13 @@ from rq.job import JobStatus
 from rq.timeouts import HorseMonitorTimeoutException
 from rq.utils import utcnow
 from rq.worker import (
+    DEFAULT_WORKER_TTL,
     HerokuWorker,  # HerokuWorker implements graceful shutdown on SIGTERM
     Worker,
+    WorkerStatus,
 )
 
-from redash import statsd_client
+from redash import settings, statsd_client
 
 # HerokuWorker does not work in OSX https://github.com/getredash/redash/issues/5413
 if sys.platform == "darwin":
@@ -49,7 +51,24 @@ class CancellableQueue(BaseQueue):
     job_class = CancellableJob
 
 
-class RedashQueue(StatsdRecordingQueue, CancellableQueue):
+class ConcurrencyLimitingQueue(BaseQueue):
+    """
+    RQ Queue Mixin that holds the jobs with a `concurrency_limit` (in their meta) until their data source has a free
+    slot, instead of pushing them to the queue right away (see `redash.tasks.concurrency`)
+    """
+
+    def enqueue_job(self, job, pipeline=None, at_front=False):
+        if not job.meta.get("concurrency_limit") or job.meta.get("admitted") or pipeline is not None:
+            return super().enqueue_job(job, pipeline=pipeline, at_front=at_front)
+
+        from redash.tasks.concurrency import hold
+
+        job.save()
+        hold(job)
+        return job
+
+
+class RedashQueue(ConcurrencyLimitingQueue, StatsdRecordingQueue, CancellableQueue):
     pass
 
 
@@ -61,6 +80,10 @@ class StatsdRecordingWorker(BaseWorker):
     def execute_job(self, job, queue):
         statsd_client.incr("rq.jobs.running.{}".format(queue.name))
         statsd_client.incr("rq.jobs.started.{}".format(queue.name))
+        if job.created_at:
+            statsd_client.timing(
+                "rq.jobs.wait.{}".format(queue.name), 1000 * (utcnow() - job.created_at).total_seconds()
+            )
         try:
             super().execute_job(job, queue)
         finally:
@@ -71,6 +94,52 @@ class StatsdRecordingWorker(BaseWorker):
                 statsd_client.incr("rq.jobs.failed.{}".format(queue.name))
 
 
+class ConcurrencyLimitingWorker(BaseWorker):
+    """
+    RQ Worker Mixin that frees the data source slots of jobs with a concurrency limit when they end
+    """
+
+    def execute_job(self, job, queue):
+        try:
+            super().execute_job(job, queue)
+        finally:
+            if job.meta.get("concurrency_limit"):
+                from redash.tasks.concurrency import release
+
+                release(job)
+
+
+class InProcessWorker(BaseWorker):
+    """
+    RQ Worker Mixin that runs jobs in the worker process itself when `RQ_WORKER_IN_PROCESS` is set (like RQ's
+    SimpleWorker), instead of in a work horse forked for each job, so state kept across jobs (e.g. pooled data source
+    connections, see `redash.query_runner.connection_pool`) is reused
+    """
+
+    def execute_job(self, job, queue):
+        if not settings.RQ_WORKER_IN_PROCESS:
+            return super().execute_job(job, queue)
+
+        from redash.models import db
+
+        self.set_state(WorkerStatus.BUSY)
+        try:
+            self.perform_job(job, queue)
+        finally:
+            # Forked work horses start every job with a new session.
+            db.session.remove()
+            self.set_state(WorkerStatus.IDLE)
+
+    def get_heartbeat_ttl(self, job):
+        if not settings.RQ_WORKER_IN_PROCESS:
+            return super().get_heartbeat_ttl(job)
+
+        # The worker doesn't send heartbeats while it runs a job.
+        if job.timeout == -1:
+            return DEFAULT_WORKER_TTL
+        return (job.timeout or DEFAULT_WORKER_TTL) + 60
+
+
 class HardLimitingWorker(BaseWorker):
     """
     RQ's work horses enforce time limits by setting a timed alarm and stopping jobs
@@ -191,7 +260,7 @@ class HardLimitingWorker(BaseWorker):
             self.handle_job_failure(job, queue=queue, exc_string=exc_string)
 
 
-class RedashWorker(StatsdRecordingWorker, HardLimitingWorker):
+class RedashWorker(StatsdRecordingWorker, ConcurrencyLimitingWorker, InProcessWorker, HardLimitingWorker):
     queue_class = RedashQueue
 
 
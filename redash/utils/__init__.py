@@ -13,6 +13,7 @@ import re
 import sys
 import uuid
 
+import orjson
 import pystache
 import pytz
 import sqlparse
@@ -71,13 +72,28 @@ def generate_token(length):
     return "".join(rand.choice(chars) for x in range(length))
 
 
+_custom_json_encoders = (set(), [])
+
+
+def custom_json_encoders():
+    """Returns the `custom_json_encoder` hooks of the registered query runners. The list is only rebuilt when the
+    registry changes, instead of on every encoding."""
+    global _custom_json_encoders
+    from redash.query_runner import query_runners
+
+    registry, encoders = _custom_json_encoders
+    if registry != query_runners.keys():
+        encoders = [r.custom_json_encoder for r in query_runners.values() if hasattr(r, "custom_json_encoder")]
+        _custom_json_encoders = (set(query_runners.keys()), encoders)
+
+    return encoders
+
+
 class JSONEncoder(json.JSONEncoder):
     """Adapter for `json.dumps`."""
 
     def __init__(self, **kwargs):
-        from redash.query_runner import query_runners
-
-        self.encoders = [r.custom_json_encoder for r in query_runners.values() if hasattr(r, "custom_json_encoder")]
+        self.encoders = custom_json_encoders()
         super().__init__(**kwargs)
 
     def default(self, o):
@@ -87,7 +103,8 @@ class JSONEncoder(json.JSONEncoder):
                 return result
         if isinstance(o, Query):
             result = list(o)
-        elif isinstance(o, decimal.Decimal):
+        # Float subclasses (e.g. numpy.float64) only reach here with orjson, which serializes exact floats only.
+        elif isinstance(o, (decimal.Decimal, float)):
             result = float(o)
         elif isinstance(o, (datetime.timedelta, uuid.UUID)):
             result = str(o)
@@ -132,9 +149,50 @@ def _sanitize_data(data):
     return data
 
 
+# Pass as `separators` to json_dumps for compact output, which is what large payloads (query results, API responses)
+# should use: besides being smaller, it is encoded by orjson in a single pass.
+COMPACT_SEPARATORS = (",", ":")
+
+# Datetimes go through JSONEncoder.default to keep their existing format. NaN and Infinity are serialized as null by
+# orjson itself, so there is no need to sanitize the data beforehand.
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+# The range of integers orjson can encode.
+ORJSON_MIN_INT, ORJSON_MAX_INT = -(2**63), 2**64 - 1
+
+
+def _can_use_orjson(args, kwargs):
+    return not args and kwargs.get("separators") == COMPACT_SEPARATORS and kwargs.keys() <= {"separators", "sort_keys"}
+
+
+def _has_oversized_int(data):
+    if isinstance(data, dict):
+        return any(_has_oversized_int(k) or _has_oversized_int(v) for k, v in data.items())
+    if isinstance(data, (list, tuple)):
+        return any(_has_oversized_int(v) for v in data)
+    return isinstance(data, int) and not ORJSON_MIN_INT <= data <= ORJSON_MAX_INT
+
+
+def _orjson_dumps(data, separators, sort_keys=False):
+    encoder = JSONEncoder()
+    option = ORJSON_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else ORJSON_OPTIONS
+    return orjson.dumps(data, default=encoder.default, option=option).decode("utf-8")
+
+
 def json_dumps(data, *args, **kwargs):
     """A custom JSON dumping function which passes all parameters to the
-    json.dumps function."""
+    json.dumps function.
+
+    Compact output (`separators=COMPACT_SEPARATORS`) is produced by orjson, which handles NaN/Inf and the custom
+    types in a single pass. Otherwise, or for data with integers orjson can't encode (beyond 64 bit), the data is
+    sanitized and passed to `json.dumps`."""
+    if _can_use_orjson(args, kwargs):
+        try:
+            return _orjson_dumps(data, **kwargs)
+        except orjson.JSONEncodeError:
+            # Only looked for once orjson failed, so the data isn't walked for the common case.
+            if not _has_oversized_int(data):
+                raise
+
     kwargs.setdefault("cls", JSONEncoder)
     kwargs.setdefault("ensure_ascii", False)
     # Float value nan or inf in Python should be render to None or null in json.
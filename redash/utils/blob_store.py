@@ -0,0 +1,124 @@
+"""
+External stores for query result payloads that are too large to keep in the database (see `QueryResultBlob`).
+
+Every stored payload gets a new key, so an object is only ever deleted by the blob that wrote it, even if a blob with
+the same content gets stored again meanwhile.
+"""
+import os
+import tempfile
+import uuid
+
+from redash import settings
+
+try:
+    import boto3
+except ImportError:
+    boto3 = None
+
+
+class BlobStoreError(Exception):
+    pass
+
+
+class BaseBlobStore:
+    name = None
+
+    def new_key(self, content_hash):
+        return "{}/{}-{}".format(content_hash[:2], content_hash, uuid.uuid4().hex)
+
+    def put(self, key, payload):
+        raise NotImplementedError()
+
+    def open(self, key):
+        """Returns a binary file-like object to read the payload stored under `key` from."""
+        raise NotImplementedError()
+
+    def delete(self, key):
+        raise NotImplementedError()
+
+
+class FileSystemBlobStore(BaseBlobStore):
+    name = "filesystem"
+
+    def __init__(self, path):
+        self.path = path
+
+    def _path(self, key):
+        return os.path.join(self.path, *key.split("/"))
+
+    def put(self, key, payload):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first, so a payload is never read while it's partially written.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def open(self, key):
+        return open(self._path(key), "rb")
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3BlobStore(BaseBlobStore):
+    name = "s3"
+
+    def __init__(self, bucket, prefix="", endpoint_url=None):
+        if boto3 is None:
+            raise BlobStoreError("The s3 query results store requires boto3, which isn't installed.")
+
+        self.bucket = bucket
+        self.prefix = prefix
+        # endpoint_url points the store at an S3 compatible service (MinIO, Ceph, etc.).
+        self.client = boto3.client("s3", endpoint_url=endpoint_url or None)
+
+    def put(self, key, payload):
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=payload)
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)["Body"]
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+
+def _create_blob_store(name):
+    if name == FileSystemBlobStore.name:
+        return FileSystemBlobStore(settings.QUERY_RESULTS_BLOB_STORE_PATH)
+
+    if name == S3BlobStore.name:
+        return S3BlobStore(
+            settings.QUERY_RESULTS_BLOB_STORE_S3_BUCKET,
+            settings.QUERY_RESULTS_BLOB_STORE_S3_PREFIX,
+            settings.QUERY_RESULTS_BLOB_STORE_S3_ENDPOINT_URL,
+        )
+
+    raise BlobStoreError("Unknown query results store: {}".format(name))
+
+
+_blob_stores = {}
+
+
+def get_blob_store(name):
+    if name not in _blob_stores:
+        _blob_stores[name] = _create_blob_store(name)
+
+    return _blob_stores[name]
+
+
+def blob_store_for(payload):
+    """Returns the store `payload` should be offloaded to, or None if it should be kept in the database."""
+    if not settings.QUERY_RESULTS_BLOB_STORE or len(payload) <= settings.QUERY_RESULTS_BLOB_STORE_THRESHOLD:
+        return None
+
+    return get_blob_store(settings.QUERY_RESULTS_BLOB_STORE)
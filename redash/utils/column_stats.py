@@ -0,0 +1,62 @@
+"""
+Per-column summary statistics of query results. They are computed once when a result is stored
+(`QueryResult.column_stats`), so alerts can be evaluated without decoding the result.
+"""
+import math
+
+
+def _column_stats(rows, name):
+    first_row = rows[0] if rows and isinstance(rows[0], dict) else {}
+    count = 0
+    null_count = 0
+    minimum = None
+    maximum = None
+    numeric = True
+
+    for row in rows:
+        value = row.get(name) if isinstance(row, dict) else None
+        if value is None:
+            null_count += 1
+            continue
+
+        count += 1
+        if not numeric:
+            continue
+
+        # Values are compared as floats by the min/max alert selectors.
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            numeric = False
+            continue
+
+        if math.isfinite(number):
+            minimum = number if minimum is None else min(minimum, number)
+            maximum = number if maximum is None else max(maximum, number)
+
+    return {
+        "present": name in first_row,
+        "first": first_row.get(name),
+        "count": count,
+        "null_count": null_count,
+        "numeric": numeric,
+        "min": minimum if numeric else None,
+        "max": maximum if numeric else None,
+    }
+
+
+def compute_column_stats(data, column_names=None):
+    """Returns the statistics of the given columns of a query result's data (all of its columns by default), or None if
+    the data isn't tabular."""
+    if not isinstance(data, dict) or not isinstance(data.get("rows"), list):
+        return None
+
+    rows = data["rows"]
+    if column_names is None:
+        columns = data.get("columns")
+        if not isinstance(columns, list):
+            return None
+
+        column_names = [column["name"] for column in columns if isinstance(column, dict) and "name" in column]
+
+    return {"row_count": len(rows), "columns": {name: _column_stats(rows, name) for name in column_names}}
@@ -0,0 +1,202 @@
+"""
+Storage encoding for query result payloads (`QueryResult.data`).
+
+Results used to be stored as a single JSON document of row dictionaries, repeating every column name in every row.
+The columnar format stores the column values as column-major arrays and compresses the serialized document, which
+makes large results both smaller in the database and faster to decode.
+
+Encoded payloads start with a small header: a magic prefix, the format version and the compression codec id.
+Anything that doesn't start with the magic prefix is treated as a legacy (plain JSON text) payload, so results stored
+before the columnar format was introduced keep reading transparently.
+"""
+import zlib
+
+from redash import settings
+from redash.utils import COMPACT_SEPARATORS, json_dumps, json_loads
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+MAGIC = b"RDQR"
+FORMAT_VERSION = 1
+HEADER_SIZE = len(MAGIC) + 2
+
+FORMAT_JSON = "json"
+FORMAT_COLUMNAR = "columnar"
+
+LAYOUT_COLUMNAR = "columnar"
+LAYOUT_RAW = "raw"
+
+
+class ResultEncodingError(Exception):
+    pass
+
+
+def _zstd_compress(payload):
+    return zstandard.ZstdCompressor().compress(payload)
+
+
+def _zstd_decompress(payload):
+    return zstandard.ZstdDecompressor().decompress(payload)
+
+
+# codec name -> (id, compress, decompress, available)
+CODECS = {
+    "none": (0, lambda p: p, lambda p: p, True),
+    "zlib": (1, lambda p: zlib.compress(p, 6), zlib.decompress, True),
+    "zstd": (2, _zstd_compress, _zstd_decompress, zstandard is not None),
+    "lz4": (3, lambda p: lz4_frame.compress(p), lambda p: lz4_frame.decompress(p), lz4_frame is not None),
+}
+CODECS_BY_ID = {codec[0]: name for name, codec in CODECS.items()}
+
+# codec name -> factory of an incremental decompressor (an object with a `decompress(chunk)` method)
+STREAM_DECOMPRESSORS = {
+    "zlib": zlib.decompressobj,
+    "zstd": lambda: zstandard.ZstdDecompressor().decompressobj(),
+    "lz4": lambda: lz4_frame.LZ4FrameDecompressor(),
+}
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+def _get_codec(name):
+    if name not in CODECS:
+        raise ResultEncodingError("Unknown query results compression codec: {}".format(name))
+
+    codec_id, compress, decompress, available = CODECS[name]
+    if not available:
+        raise ResultEncodingError("Compression codec {} requires a package which isn't installed.".format(name))
+
+    return codec_id, compress, decompress
+
+
+def _column_names(data):
+    columns = data.get("columns")
+    rows = data.get("rows")
+
+    if not isinstance(columns, list) or not isinstance(rows, list):
+        return None
+
+    if not all(isinstance(column, dict) and "name" in column for column in columns):
+        return None
+
+    names = [column["name"] for column in columns]
+    if len(set(names)) != len(names) or (not names and rows):
+        return None
+
+    return names
+
+
+def _to_columnar(data):
+    """Returns the columnar document for `data`, or None if the data can't be represented without loss (rows that
+    have keys that aren't part of `columns`, duplicate column names, non-tabular payloads, etc.)."""
+    if not isinstance(data, dict):
+        return None
+
+    names = _column_names(data)
+    if names is None:
+        return None
+
+    name_set = set(names)
+    values = [[] for _ in names]
+    for row in data["rows"]:
+        if not isinstance(row, dict) or row.keys() != name_set:
+            return None
+
+        for i, name in enumerate(names):
+            values[i].append(row[name])
+
+    meta = {key: value for key, value in data.items() if key != "rows"}
+    return {"layout": LAYOUT_COLUMNAR, "meta": meta, "values": values}
+
+
+def _from_columnar(document):
+    if document["layout"] == LAYOUT_RAW:
+        return document["data"]
+
+    data = document["meta"]
+    names = [column["name"] for column in data["columns"]]
+    data["rows"] = [dict(zip(names, row)) for row in zip(*document["values"])] if names else []
+    return data
+
+
+def is_encoded(payload):
+    return payload is not None and bytes(payload[: len(MAGIC)]) == MAGIC
+
+
+def encode_result(data, storage_format=None, compression=None):
+    """Serializes `data` into the bytes that get stored in `query_results.data`."""
+    storage_format = storage_format or settings.QUERY_RESULTS_STORAGE_FORMAT
+
+    if storage_format == FORMAT_JSON:
+        return json_dumps(data, separators=COMPACT_SEPARATORS).encode("utf-8")
+
+    if storage_format != FORMAT_COLUMNAR:
+        raise ResultEncodingError("Unknown query results storage format: {}".format(storage_format))
+
+    codec_id, compress, _ = _get_codec(compression or settings.QUERY_RESULTS_COMPRESSION)
+
+    document = _to_columnar(data)
+    if document is None:
+        document = {"layout": LAYOUT_RAW, "data": data}
+
+    header = MAGIC + bytes([FORMAT_VERSION, codec_id])
+    return header + compress(json_dumps(document, separators=COMPACT_SEPARATORS).encode("utf-8"))
+
+
+def _read_header(header):
+    version, codec_id = header[len(MAGIC)], header[len(MAGIC) + 1]
+    if version != FORMAT_VERSION:
+        raise ResultEncodingError("Unsupported query results format version: {}".format(version))
+
+    if codec_id not in CODECS_BY_ID:
+        raise ResultEncodingError("Unknown query results compression codec id: {}".format(codec_id))
+
+    return CODECS_BY_ID[codec_id]
+
+
+def decode_result(payload):
+    """Reverses `encode_result`. Accepts both columnar and legacy JSON payloads."""
+    if payload is None:
+        return None
+
+    if isinstance(payload, str):
+        return json_loads(payload)
+
+    payload = bytes(payload)
+    if not payload:
+        return None
+
+    if not is_encoded(payload):
+        return json_loads(payload.decode("utf-8"))
+
+    _, _, decompress = _get_codec(_read_header(payload))
+    document = json_loads(decompress(payload[HEADER_SIZE:]))
+    return _from_columnar(document)
+
+
+def decode_result_stream(stream, chunk_size=STREAM_CHUNK_SIZE):
+    """Like `decode_result`, for a payload read from a binary file-like object. The payload is decompressed as it's
+    read, so the compressed payload is never held in memory as a whole."""
+    header = stream.read(HEADER_SIZE)
+    if not is_encoded(header) or len(header) < HEADER_SIZE:
+        return decode_result(header + stream.read())
+
+    codec = _read_header(header)
+    _get_codec(codec)
+    decompressor = STREAM_DECOMPRESSORS[codec]() if codec in STREAM_DECOMPRESSORS else None
+
+    chunks = []
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        chunks.append(decompressor.decompress(chunk) if decompressor else chunk)
+    if hasattr(decompressor, "flush"):
+        chunks.append(decompressor.flush())
+
+    return _from_columnar(json_loads(b"".join(chunks)))
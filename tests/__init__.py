@@ -1,6 +1,7 @@
 import datetime
 import logging
 import os
+import re
 from contextlib import contextmanager
 from unittest import TestCase
 
@@ -18,9 +19,12 @@ os.environ["REDASH_RATELIMIT_ENABLED"] = "true"
 
 os.environ["REDASH_ENFORCE_CSRF"] = "false"
 
+from sqlalchemy import event  # noqa: E402
+
 from redash import limiter, redis_connection  # noqa: E402
 from redash.app import create_app  # noqa: E402
 from redash.models import db  # noqa: E402
+from redash.models.parameterized_query import clear_dropdown_options  # noqa: E402
 from redash.utils import json_dumps  # noqa: E402
 from tests.factories import Factory, user_factory  # noqa: E402
 
@@ -43,6 +47,34 @@ def authenticated_user(c, user=None):
     yield user
 
 
+# Selects the payload column of query results or their blobs (possibly aliased, as in joined loads).
+RESULT_PAYLOAD_COLUMN = re.compile(r"\bquery_result(s|_blobs)(_\d+)?\.data\b")
+
+
+@contextmanager
+def executed_statements(predicate=None):
+    """Records the SQL statements (matching `predicate`, if given) executed while the block runs."""
+    statements = []
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        if predicate is None or predicate(statement):
+            statements.append(statement)
+
+    engine = db.get_engine()
+    event.listen(engine, "before_cursor_execute", record_statement)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record_statement)
+
+
+def result_payload_loads():
+    """Records the statements that load query result payloads while the block runs."""
+    return executed_statements(
+        lambda statement: statement.lstrip().upper().startswith("SELECT") and RESULT_PAYLOAD_COLUMN.search(statement)
+    )
+
+
 class BaseTestCase(TestCase):
     def setUp(self):
         self.app = create_app()
@@ -62,6 +94,8 @@ class BaseTestCase(TestCase):
         db.get_engine(self.app).dispose()
         self.app_ctx.pop()
         redis_connection.flushdb()
+        # Query result ids start over in the next test.
+        clear_dropdown_options()
 
     def make_request(
         self,
@@ -1,8 +1,8 @@
 from redash.models import AccessPermission, ApiKey, Dashboard, db
 from redash.permissions import ACCESS_TYPE_MODIFY
 from redash.serializers import serialize_dashboard
-from redash.utils import json_loads
-from tests import BaseTestCase
+from redash.utils import gen_query_hash, json_loads
+from tests import BaseTestCase, executed_statements
 
 
 class TestDashboardListResource(BaseTestCase):
@@ -44,6 +44,26 @@ class TestDashboardListGetResource(BaseTestCase):
         assert len(rv.json["results"]) == 2
         assert set([result["id"] for result in rv.json["results"]]) == set([d1.id, d2.id])
 
+    def test_search_ranks_results(self):
+        d1 = self.factory.create_dashboard(name="Q1 sales by region")
+        d2 = self.factory.create_dashboard(name="Sales")
+        d3 = self.factory.create_dashboard(name="Sales by region")
+        self.factory.create_dashboard(name="Regional ops")
+
+        rv = self.make_request("get", "/api/dashboards?q=sales%20region")
+        self.assertEqual([d3.id, d1.id], [result["id"] for result in rv.json["results"]])
+
+        rv = self.make_request("get", "/api/dashboards?q=sales")
+        self.assertEqual([d2.id, d3.id, d1.id], [result["id"] for result in rv.json["results"]])
+
+    def test_search_favorites(self):
+        d1 = self.factory.create_dashboard(name="Sales")
+        self.factory.create_dashboard(name="Sales by region")
+        self.make_request("post", "/api/dashboards/{}/favorite".format(d1.id))
+
+        rv = self.make_request("get", "/api/dashboards/favorites?q=sales")
+        self.assertEqual([d1.id], [result["id"] for result in rv.json["results"]])
+
 
 class TestDashboardResourceGet(BaseTestCase):
     def test_get_dashboard(self):
@@ -82,11 +102,118 @@ class TestDashboardResourceGet(BaseTestCase):
         self.assertTrue(rv.json["widgets"][0]["restricted"])
         self.assertNotIn("restricted", rv.json["widgets"][1])
 
+    def test_get_dashboard_query_count_doesnt_grow_with_widgets(self):
+        dashboard = self.factory.create_dashboard()
+
+        def add_widgets(count):
+            for _ in range(count):
+                user = self.factory.create_user()
+                query = self.factory.create_query(
+                    user=user, last_modified_by=user, data_source=self.factory.create_data_source()
+                )
+                vis = self.factory.create_visualization(query_rel=query)
+                self.factory.create_widget(visualization=vis, dashboard=dashboard)
+            self.factory.create_widget(dashboard=dashboard, visualization=None, text="text")
+            db.session.commit()
+            db.session.expire_all()
+
+        def statements_count():
+            with executed_statements() as statements:
+                rv = self.make_request("get", "/api/dashboards/{0}".format(dashboard.id))
+            self.assertEqual(rv.status_code, 200)
+            return len(statements)
+
+        add_widgets(2)
+        count = statements_count()
+        add_widgets(20)
+        self.assertLessEqual(statements_count(), count)
+
     def test_get_non_existing_dashboard(self):
         rv = self.make_request("get", "/api/dashboards/-1")
         self.assertEqual(rv.status_code, 404)
 
 
+class TestDashboardResultsResource(BaseTestCase):
+    def add_widget(self, dashboard, query_text="SELECT 1", **kwargs):
+        query = self.factory.create_query(query_text=query_text, **kwargs)
+        vis = self.factory.create_visualization(query_rel=query)
+        return self.factory.create_widget(visualization=vis, dashboard=dashboard)
+
+    def post_results(self, dashboard, **data):
+        rv = self.make_request("post", "/api/dashboards/{}/results".format(dashboard.id), data=data)
+        self.assertEqual(rv.status_code, 200)
+        return rv.json["results"]
+
+    def test_returns_cached_results_and_enqueues_the_other_queries_once(self):
+        dashboard = self.factory.create_dashboard()
+        query_result = self.factory.create_query_result()
+        cached = self.add_widget(dashboard)
+        missed = [self.add_widget(dashboard, "SELECT 2"), self.add_widget(dashboard, "SELECT 2")]
+        self.factory.create_widget(dashboard=dashboard, visualization=None, text="text")
+
+        results = self.post_results(dashboard)
+
+        self.assertEqual({str(widget.id) for widget in [cached] + missed}, set(results))
+        self.assertEqual(query_result.id, results[str(cached.id)]["query_result"]["id"])
+        jobs = [results[str(widget.id)]["job"] for widget in missed]
+        self.assertEqual(1, jobs[0]["status"])
+        self.assertEqual(jobs[0]["id"], jobs[1]["id"])
+
+    def test_looks_up_latest_results_together(self):
+        dashboard = self.factory.create_dashboard()
+
+        def statements_count():
+            with executed_statements(lambda statement: "FROM query_results" in statement) as statements:
+                self.post_results(dashboard)
+            return len(statements)
+
+        for i in range(2):
+            self.add_widget(dashboard, "SELECT {}".format(i))
+        self.assertEqual(1, statements_count())
+        for i in range(2, 10):
+            self.add_widget(dashboard, "SELECT {}".format(i))
+        self.assertEqual(1, statements_count())
+
+    def test_looks_up_latest_results_once_without_max_age(self):
+        dashboard = self.factory.create_dashboard()
+        self.add_widget(dashboard)
+
+        with executed_statements(lambda statement: "FROM query_results" in statement) as statements:
+            results = self.post_results(dashboard, max_age=-1, stale_while_revalidate=True)
+
+        self.assertEqual(1, len(statements))
+        self.assertIn("job", list(results.values())[0])
+
+    def test_applies_each_widgets_parameters(self):
+        dashboard = self.factory.create_dashboard()
+        options = {"parameters": [{"name": "n", "title": "n", "type": "number"}]}
+        widgets = [self.add_widget(dashboard, "SELECT {{n}}", options=options) for _ in range(2)]
+        query_result = self.factory.create_query_result(query_text="SELECT 2", query_hash=gen_query_hash("SELECT 2"))
+
+        results = self.post_results(dashboard, parameters={str(widgets[0].id): {"n": 2}})
+
+        self.assertEqual(query_result.id, results[str(widgets[0].id)]["query_result"]["id"])
+        self.assertIn("Missing parameter value for: n", results[str(widgets[1].id)]["job"]["error"])
+
+    def test_reports_queries_the_user_cant_execute(self):
+        dashboard = self.factory.create_dashboard()
+        self.factory.create_query_result()
+        allowed = self.add_widget(dashboard)
+        denied = self.add_widget(
+            dashboard, data_source=self.factory.create_data_source(group=self.factory.create_group())
+        )
+
+        results = self.post_results(dashboard)
+
+        self.assertIn("query_result", results[str(allowed.id)])
+        self.assertEqual(4, results[str(denied.id)]["job"]["status"])
+        self.assertIn("do not have permission", results[str(denied.id)]["job"]["error"])
+
+    def test_non_existing_dashboard(self):
+        rv = self.make_request("post", "/api/dashboards/-1/results", data={})
+        self.assertEqual(rv.status_code, 404)
+
+
 class TestDashboardResourcePost(BaseTestCase):
     def test_update_dashboard(self):
         d = self.factory.create_dashboard()
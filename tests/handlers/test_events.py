@@ -0,0 +1,58 @@
+import datetime
+from urllib.parse import urlencode
+
+from redash.models import Event, db
+from tests import BaseTestCase
+
+
+class TestEventsResourceGet(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        start = datetime.datetime(2024, 3, 30, tzinfo=datetime.timezone.utc)
+        self.events = [
+            Event(
+                org=self.factory.org,
+                action="view",
+                object_type="dashboard",
+                object_id=str(i),
+                additional_properties={},
+                # Pairs of events with the same time.
+                created_at=start + datetime.timedelta(days=i // 2),
+            )
+            for i in range(5)
+        ]
+        db.session.add_all(self.events)
+        Event.create_partition(start)
+        self.admin = self.factory.create_admin()
+        db.session.commit()
+
+    def get_page(self, **params):
+        rv = self.make_request("get", "/api/events?" + urlencode(params), user=self.admin)
+        self.assertEqual(200, rv.status_code)
+        return rv.json
+
+    def test_lists_events_with_cursor(self):
+        object_ids = []
+        page = self.get_page(page_size=2)
+        while True:
+            self.assertNotIn("count", page)
+            object_ids.extend(event["object_id"] for event in page["results"])
+            if page["next_cursor"] is None:
+                break
+            page = self.get_page(page_size=2, cursor=page["next_cursor"])
+
+        self.assertEqual(["4", "3", "2", "1", "0"], object_ids)
+
+    def test_lists_numbered_pages(self):
+        page = self.get_page(page=2, page_size=2)
+
+        self.assertEqual(5, page["count"])
+        self.assertEqual(2, len(page["results"]))
+
+    def test_rejects_invalid_cursor(self):
+        rv = self.make_request("get", "/api/events?cursor=invalid", user=self.admin)
+        self.assertEqual(400, rv.status_code)
+
+    def test_requires_admin(self):
+        rv = self.make_request("get", "/api/events")
+        self.assertEqual(403, rv.status_code)
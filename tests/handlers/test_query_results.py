@@ -1,6 +1,14 @@
+import datetime
+import threading
+
+from mock import patch
+
+from redash import redis_connection
 from redash.handlers.query_results import error_messages, run_query
 from redash.models import db
-from tests import BaseTestCase
+from redash.tasks.queries.job_status import JOB_STATUS_KEY, publish_job_status
+from redash.utils import json_loads, utcnow
+from tests import BaseTestCase, executed_statements
 
 
 class TestRunQuery(BaseTestCase):
@@ -225,6 +233,51 @@ class TestQueryResultAPI(BaseTestCase):
         self.assertEqual(rv.status_code, 200)
         self.assertIn("job", rv.json)
 
+    def test_execute_returns_stale_result_while_revalidating(self):
+        query = self.factory.create_query()
+        stale_result = self.factory.create_query_result(
+            data_source=query.data_source, retrieved_at=utcnow() - datetime.timedelta(days=1)
+        )
+        path = "/api/queries/{}/results".format(query.id)
+
+        rv = self.make_request("post", path, data={"max_age": 60, "stale_while_revalidate": True})
+        self.assertEqual(rv.status_code, 200)
+        self.assertTrue(rv.json["stale"])
+        self.assertEqual(stale_result.id, rv.json["query_result"]["id"])
+        job_id = rv.json["job"]["id"]
+
+        # The refresh that's in flight is shared.
+        rv = self.make_request("post", path, data={"max_age": 60, "stale_while_revalidate": True})
+        self.assertEqual(job_id, rv.json["job"]["id"])
+
+        rv = self.make_request("post", path, data={"max_age": 60})
+        self.assertNotIn("query_result", rv.json)
+        self.assertEqual(job_id, rv.json["job"]["id"])
+
+    def test_execute_returns_fresh_result_without_revalidating(self):
+        query = self.factory.create_query()
+        query_result = self.factory.create_query_result(data_source=query.data_source)
+
+        rv = self.make_request(
+            "post", "/api/queries/{}/results".format(query.id), data={"max_age": 60, "stale_while_revalidate": True}
+        )
+        self.assertEqual(query_result.id, rv.json["query_result"]["id"])
+        self.assertNotIn("job", rv.json)
+        self.assertNotIn("stale", rv.json)
+
+    def test_execute_looks_up_results_once_without_max_age(self):
+        query = self.factory.create_query()
+
+        with executed_statements(lambda statement: "FROM query_results" in statement) as statements:
+            rv = self.make_request(
+                "post",
+                "/api/queries/{}/results".format(query.id),
+                data={"max_age": -1, "stale_while_revalidate": True},
+            )
+
+        self.assertIn("job", rv.json)
+        self.assertEqual(1, len(statements))
+
     def test_execute_but_has_no_access_to_data_source(self):
         ds = self.factory.create_data_source(group=self.factory.create_group())
         query = self.factory.create_query(data_source=ds)
@@ -432,7 +485,104 @@ class TestQueryResultExcelResponse(BaseTestCase):
         self.assertEqual(rv.status_code, 200)
 
 
+class TestQueryResultDsvResponse(BaseTestCase):
+    def test_streams_csv_file(self):
+        query = self.factory.create_query()
+        data = {
+            "rows": [{"test": i, "flag": i % 2 == 0} for i in range(5)],
+            "columns": [{"name": "test", "type": "integer"}, {"name": "flag", "type": "boolean"}],
+        }
+        query_result = self.factory.create_query_result(data=data)
+
+        rv = self.make_request(
+            "get",
+            "/api/queries/{}/results/{}.csv".format(query.id, query_result.id),
+            is_json=False,
+        )
+        self.assertEqual(rv.status_code, 200)
+        self.assertTrue(rv.is_streamed)
+        self.assertEqual(rv.headers["Content-Type"], "text/csv; charset=UTF-8")
+        self.assertEqual(
+            rv.data.decode("utf-8").splitlines(), ["test,flag", "0,true", "1,false", "2,true", "3,false", "4,true"]
+        )
+
+    def test_streams_tsv_file(self):
+        query = self.factory.create_query()
+        data = {
+            "rows": [{"a": 1, "b": "x"}],
+            "columns": [{"name": "a", "type": "integer"}, {"name": "b", "type": "string"}],
+        }
+        query_result = self.factory.create_query_result(data=data)
+
+        rv = self.make_request(
+            "get",
+            "/api/queries/{}/results/{}.tsv".format(query.id, query_result.id),
+            is_json=False,
+        )
+        self.assertEqual(rv.status_code, 200)
+        self.assertEqual(rv.data.decode("utf-8").splitlines(), ["a\tb", "1\tx"])
+
+
+class TestQueryResultPagination(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.query = self.factory.create_query()
+        data = {
+            "rows": [{"n": i, "f": float("nan") if i == 3 else i / 2} for i in range(10)],
+            "columns": [{"name": "n", "type": "integer"}, {"name": "f", "type": "float"}],
+        }
+        self.query_result = self.factory.create_query_result(data=data)
+
+    def _url(self, filetype, qs=""):
+        return "/api/queries/{}/results/{}.{}{}".format(self.query.id, self.query_result.id, filetype, qs)
+
+    def test_returns_requested_page(self):
+        rv = self.make_request("get", self._url("json", "?offset=2&limit=3"))
+
+        self.assertEqual(rv.status_code, 200)
+        query_result = rv.json["query_result"]
+        self.assertEqual([r["n"] for r in query_result["data"]["rows"]], [2, 3, 4])
+        self.assertIsNone(query_result["data"]["rows"][1]["f"])
+        self.assertEqual(query_result["data"]["columns"], self.query_result.data["columns"])
+        self.assertEqual(query_result["pagination"], {"offset": 2, "limit": 3, "row_count": 10, "next_offset": 5})
+
+    def test_last_page_has_no_next_offset(self):
+        rv = self.make_request("get", self._url("json", "?offset=8&limit=5"))
+
+        self.assertEqual([r["n"] for r in rv.json["query_result"]["data"]["rows"]], [8, 9])
+        self.assertIsNone(rv.json["query_result"]["pagination"]["next_offset"])
+
+    def test_returns_everything_without_range(self):
+        rv = self.make_request("get", self._url("json"))
+
+        self.assertEqual(len(rv.json["query_result"]["data"]["rows"]), 10)
+        self.assertNotIn("pagination", rv.json["query_result"])
+
+    def test_rejects_invalid_range(self):
+        self.assertEqual(self.make_request("get", self._url("json", "?offset=-1")).status_code, 400)
+        self.assertEqual(self.make_request("get", self._url("json", "?limit=0")).status_code, 400)
+
+    def test_streams_ndjson(self):
+        rv = self.make_request("get", self._url("ndjson", "?offset=1&limit=4"), is_json=False)
+
+        self.assertEqual(rv.status_code, 200)
+        self.assertTrue(rv.is_streamed)
+        self.assertEqual(rv.headers["Content-Type"], "application/x-ndjson")
+
+        lines = [json_loads(line) for line in rv.data.decode("utf-8").splitlines()]
+        self.assertEqual(lines[0]["query_result"]["id"], self.query_result.id)
+        self.assertEqual(lines[0]["query_result"]["data"]["row_count"], 10)
+        self.assertNotIn("rows", lines[0]["query_result"]["data"])
+        self.assertEqual([line["n"] for line in lines[1:]], [1, 2, 3, 4])
+        self.assertIsNone(lines[3]["f"])
+
+
 class TestJobResource(BaseTestCase):
+    def enqueue_job(self):
+        query = self.factory.create_query()
+        response = self.make_request("post", f"/api/queries/{query.id}/results", data={"parameters": {}})
+        return response.json["job"]["id"]
+
     def test_cancels_queued_queries(self):
         QUEUED = 1
         FAILED = 4
@@ -454,3 +604,40 @@ class TestJobResource(BaseTestCase):
         job = self.make_request("get", f"/api/jobs/{job_id}").json["job"]
         self.assertEqual(job["status"], FAILED)
         self.assertTrue("cancelled" in job["error"])
+
+    def test_waits_for_status_change(self):
+        job_id = self.enqueue_job()
+        threading.Timer(0.2, publish_job_status, args=(job_id, 3), kwargs={"query_result_id": 7}).start()
+
+        with patch("redash.settings.JOB_STATUS_MAX_WAIT", 5):
+            job = self.make_request("get", f"/api/jobs/{job_id}?status=1&wait=5").json["job"]
+
+        self.assertEqual(3, job["status"])
+        self.assertEqual(7, job["query_result_id"])
+
+    def test_doesnt_wait_when_status_already_changed(self):
+        job_id = self.enqueue_job()
+
+        with patch("redash.settings.JOB_STATUS_MAX_WAIT", 5), patch(
+            "redash.handlers.query_results.wait_for_job_status"
+        ) as wait:
+            job = self.make_request("get", f"/api/jobs/{job_id}?status=2&wait=5").json["job"]
+
+        wait.assert_not_called()
+        self.assertEqual(1, job["status"])
+
+    def test_doesnt_wait_when_disabled(self):
+        job_id = self.enqueue_job()
+
+        with patch("redash.handlers.query_results.wait_for_job_status") as wait:
+            job = self.make_request("get", f"/api/jobs/{job_id}?status=1&wait=5").json["job"]
+
+        wait.assert_not_called()
+        self.assertEqual(1, job["status"])
+
+    def test_publishes_cancellations(self):
+        job_id = self.enqueue_job()
+
+        self.make_request("delete", f"/api/jobs/{job_id}")
+
+        self.assertIn("cancelled", redis_connection.get(JOB_STATUS_KEY.format(job_id)))
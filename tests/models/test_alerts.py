@@ -1,8 +1,9 @@
 import textwrap
-from unittest import TestCase
+from unittest import TestCase, mock
 
 from redash import settings
-from redash.models import OPERATORS, Alert, db, next_state
+from redash.models import OPERATORS, Alert, QueryResult, db, next_state
+from redash.utils.column_stats import compute_column_stats
 from tests import BaseTestCase
 
 
@@ -47,8 +48,8 @@ def get_results(value):
 
 
 class TestAlertEvaluate(BaseTestCase):
-    def create_alert(self, results, column="foo", value="1"):
-        result = self.factory.create_query_result(data=results)
+    def create_alert(self, results, column="foo", value="1", column_stats=None):
+        result = self.factory.create_query_result(data=results, column_stats=column_stats)
         query = self.factory.create_query(latest_query_data_id=result.id)
         alert = self.factory.create_alert(
             query_rel=query, options={"selector": "first", "op": "equals", "column": column, "value": value}
@@ -123,6 +124,31 @@ class TestAlertEvaluate(BaseTestCase):
         alert = self.create_alert(get_results(None))
         self.assertEqual(alert.evaluate(), Alert.UNKNOWN_STATE)
 
+    def test_evaluate_uses_column_stats_without_loading_data(self):
+        results = {"rows": [{"foo": 3}, {"foo": None}, {"foo": "1"}], "columns": [{"name": "foo", "type": "INTEGER"}]}
+        alert = self.create_alert(results, value="1", column_stats=compute_column_stats(results))
+
+        with mock.patch.object(QueryResult, "data", new_callable=mock.PropertyMock) as data:
+            self.assertEqual(alert.evaluate(), Alert.OK_STATE)
+            alert.options["selector"] = "min"
+            self.assertEqual(alert.evaluate(), Alert.TRIGGERED_STATE)
+            alert.options["column"] = "bar"
+            self.assertEqual(alert.evaluate(), Alert.UNKNOWN_STATE)
+
+        data.assert_not_called()
+
+    def test_evaluate_with_column_stats_of_non_numeric_column(self):
+        results = {"rows": [{"foo": 1}, {"foo": "test"}], "columns": [{"name": "foo", "type": "STRING"}]}
+        alert = self.create_alert(results, column_stats=compute_column_stats(results))
+        self.assertEqual(alert.evaluate(), Alert.TRIGGERED_STATE)
+        alert.options["selector"] = "max"
+        self.assertEqual(alert.evaluate(), Alert.UNKNOWN_STATE)
+
+    def test_evaluate_with_column_stats_of_empty_results(self):
+        results = {"rows": [], "columns": [{"name": "foo", "type": "STRING"}]}
+        alert = self.create_alert(results, column_stats=compute_column_stats(results))
+        self.assertEqual(alert.evaluate(), Alert.UNKNOWN_STATE)
+
 
 class TestNextState(TestCase):
     def test_numeric_value(self):
@@ -97,6 +97,16 @@ class DataSourceTest(BaseTestCase):
 
         mock_redis.assert_called_with("data_source:schema:1", "null", ex=expected_ttl)
 
+    def test_query_runner_has_data_source_id(self):
+        data_source = self.factory.create_data_source()
+        self.assertEqual(data_source.id, data_source.query_runner.data_source_id)
+
+    def test_query_runner_with_ssh_tunnel_has_no_data_source_id(self):
+        data_source = self.factory.create_data_source(
+            options=ConfigurationContainer({"dbname": "test", "ssh_tunnel": {"ssh_host": "bastion"}})
+        )
+        self.assertIsNone(data_source.query_runner.data_source_id)
+
 
 class TestDataSourceCreate(BaseTestCase):
     def test_adds_data_source_to_default_group(self):
@@ -4,15 +4,27 @@ from unittest import TestCase
 import pytest
 from mock import patch
 
+from redash import redis_connection
+from redash.models import Query, db
 from redash.models.parameterized_query import (
+    DROPDOWN_OPTIONS_KEY,
+    DropdownOptions,
     InvalidParameterError,
     ParameterizedQuery,
     QueryDetachedFromDataSourceError,
+    clear_dropdown_options,
     dropdown_values,
 )
+from tests import BaseTestCase, result_payload_loads
 
 
 class TestParameterizedQuery(TestCase):
+    def setUp(self):
+        clear_dropdown_options()
+        patcher = patch("redash.settings.DROPDOWN_OPTIONS_CACHE_TTL", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     def test_returns_empty_list_for_regular_query(self):
         query = ParameterizedQuery("SELECT 1")
         self.assertEqual(set([]), query.missing_params)
@@ -185,8 +197,8 @@ class TestParameterizedQuery(TestCase):
         self.assertEqual("foo 'qux','baz'", query.text)
 
     @patch(
-        "redash.models.parameterized_query.dropdown_values",
-        return_value=[{"value": "1"}],
+        "redash.models.parameterized_query.dropdown_options",
+        return_value=DropdownOptions([{"value": "1"}]),
     )
     def test_validation_accepts_integer_values_for_dropdowns(self, _):
         schema = [{"name": "bar", "type": "query", "queryId": 1}]
@@ -196,7 +208,7 @@ class TestParameterizedQuery(TestCase):
 
         self.assertEqual("foo 1", query.text)
 
-    @patch("redash.models.parameterized_query.dropdown_values")
+    @patch("redash.models.parameterized_query.dropdown_options")
     def test_raises_on_invalid_query_parameters(self, _):
         schema = [{"name": "bar", "type": "query", "queryId": 1}]
         query = ParameterizedQuery("foo", schema)
@@ -205,8 +217,8 @@ class TestParameterizedQuery(TestCase):
             query.apply({"bar": 7})
 
     @patch(
-        "redash.models.parameterized_query.dropdown_values",
-        return_value=[{"value": "baz"}],
+        "redash.models.parameterized_query.dropdown_options",
+        return_value=DropdownOptions([{"value": "baz"}]),
     )
     def test_raises_on_unlisted_query_value_parameters(self, _):
         schema = [{"name": "bar", "type": "query", "queryId": 1}]
@@ -216,8 +228,8 @@ class TestParameterizedQuery(TestCase):
             query.apply({"bar": "shlomo"})
 
     @patch(
-        "redash.models.parameterized_query.dropdown_values",
-        return_value=[{"value": "baz"}],
+        "redash.models.parameterized_query.dropdown_options",
+        return_value=DropdownOptions([{"value": "baz"}]),
     )
     def test_validates_query_parameters(self, _):
         schema = [{"name": "bar", "type": "query", "queryId": 1}]
@@ -267,6 +279,7 @@ class TestParameterizedQuery(TestCase):
 
         self.assertTrue(query.is_safe)
 
+    @patch("redash.models.parameterized_query._latest_result_id", return_value=1)
     @patch(
         "redash.models.parameterized_query._load_result",
         return_value={
@@ -274,10 +287,11 @@ class TestParameterizedQuery(TestCase):
             "rows": [{"id": 5, "Name": "John", "Value": "John Doe"}],
         },
     )
-    def test_dropdown_values_prefers_name_and_value_columns(self, _):
+    def test_dropdown_values_prefers_name_and_value_columns(self, *_):
         values = dropdown_values(1, None)
         self.assertEqual(values, [{"name": "John", "value": "John Doe"}])
 
+    @patch("redash.models.parameterized_query._latest_result_id", return_value=1)
     @patch(
         "redash.models.parameterized_query._load_result",
         return_value={
@@ -285,10 +299,11 @@ class TestParameterizedQuery(TestCase):
             "rows": [{"fish": "Clown", "id": 5, "poultry": "Hen"}],
         },
     )
-    def test_dropdown_values_compromises_for_first_column(self, _):
+    def test_dropdown_values_compromises_for_first_column(self, *_):
         values = dropdown_values(1, None)
         self.assertEqual(values, [{"name": 5, "value": "5"}])
 
+    @patch("redash.models.parameterized_query._latest_result_id", return_value=1)
     @patch(
         "redash.models.parameterized_query._load_result",
         return_value={
@@ -296,7 +311,7 @@ class TestParameterizedQuery(TestCase):
             "rows": [{"fish": "Clown", "ID": 5, "poultry": "Hen"}],
         },
     )
-    def test_dropdown_supports_upper_cased_columns(self, _):
+    def test_dropdown_supports_upper_cased_columns(self, *_):
         values = dropdown_values(1, None)
         self.assertEqual(values, [{"name": 5, "value": "5"}])
 
@@ -307,3 +322,49 @@ class TestParameterizedQuery(TestCase):
     def test_dropdown_values_raises_when_query_is_detached_from_data_source(self, _):
         with pytest.raises(QueryDetachedFromDataSourceError):
             dropdown_values(1, None)
+
+
+class TestDropdownOptionsCache(BaseTestCase):
+    def create_dropdown_query(self, values):
+        data = {"columns": [{"name": "value"}], "rows": [{"value": value} for value in values]}
+        query_result = self.factory.create_query_result(data=data)
+        query = self.factory.create_query(latest_query_data=query_result)
+        db.session.commit()
+        return query
+
+    def test_parses_result_once(self):
+        query = self.create_dropdown_query(range(1000))
+        schema = [{"name": "bar", "type": "query", "queryId": query.id}]
+
+        with result_payload_loads() as loads:
+            for value in range(10):
+                ParameterizedQuery("foo {{bar}}", schema, org=query.org).apply({"bar": value})
+            self.assertEqual({"name": 5, "value": "5"}, dropdown_values(query.id, query.org)[5])
+
+        self.assertEqual(1, len(loads))
+
+    def test_caches_in_redis(self):
+        query = self.create_dropdown_query(["a", "b"])
+        dropdown_values(query.id, query.org)
+        clear_dropdown_options()
+
+        with result_payload_loads() as loads:
+            self.assertEqual(
+                [{"name": "a", "value": "a"}, {"name": "b", "value": "b"}], dropdown_values(query.id, query.org)
+            )
+
+        self.assertEqual([], loads)
+
+    def test_new_results_replace_cached_options(self):
+        query = self.create_dropdown_query(["a"])
+        old_result_id = query.latest_query_data_id
+        dropdown_values(query.id, query.org)
+
+        new_result = self.factory.create_query_result(
+            data={"columns": [{"name": "value"}], "rows": [{"value": "b"}]}, query_hash=query.query_hash
+        )
+        Query.update_latest_result(new_result)
+        db.session.commit()
+
+        self.assertEqual([{"name": "b", "value": "b"}], dropdown_values(query.id, query.org))
+        self.assertIsNone(redis_connection.get(DROPDOWN_OPTIONS_KEY.format(old_result_id)))
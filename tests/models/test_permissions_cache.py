@@ -0,0 +1,94 @@
+from unittest import mock
+
+from redash.models import DataSource, Group, db
+from tests import BaseTestCase, executed_statements
+
+
+def selects_from(table):
+    return lambda statement: statement.lstrip().startswith("SELECT") and "FROM {}".format(table) in statement
+
+
+class TestPermissionsCache(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.group = self.factory.create_group(permissions=["view_query"])
+        db.session.add(self.group)
+        db.session.flush()
+        self.user = self.factory.create_user(group_ids=[self.group.id])
+        self.data_source = self.factory.create_data_source(group=self.group)
+        db.session.commit()
+
+    def test_memoizes_permissions_during_request(self):
+        with self.app.test_request_context(), executed_statements(selects_from("groups")) as statements:
+            self.assertEqual(["view_query"], self.user.permissions)
+            self.assertTrue(self.user.has_permission("view_query"))
+
+        self.assertEqual(1, len(statements))
+
+    def test_memoizes_data_source_groups_during_request(self):
+        with self.app.test_request_context(), executed_statements(selects_from("data_source_groups")) as statements:
+            self.assertEqual({self.group.id: False}, self.data_source.groups)
+            self.assertEqual({self.group.id: False}, self.data_source.groups)
+
+        self.assertEqual(1, len(statements))
+
+    def test_doesnt_memoize_outside_requests(self):
+        with executed_statements(selects_from("groups")) as statements:
+            self.user.permissions
+            self.user.permissions
+
+        self.assertEqual(2, len(statements))
+
+    def test_sees_changes_made_during_request(self):
+        with self.app.test_request_context():
+            self.assertEqual(["view_query"], self.user.permissions)
+            self.group.permissions = ["view_query", "edit_query"]
+            db.session.flush()
+            self.assertEqual(["view_query", "edit_query"], self.user.permissions)
+
+    @mock.patch("redash.settings.PERMISSIONS_CACHE_TTL", 60)
+    def test_caches_in_redis_across_requests(self):
+        with self.app.test_request_context():
+            self.user.permissions, self.data_source.groups
+
+        with self.app.test_request_context(), executed_statements() as statements:
+            self.assertEqual(["view_query"], self.user.permissions)
+            self.assertEqual({self.group.id: False}, self.data_source.groups)
+
+        self.assertEqual([], statements)
+
+    @mock.patch("redash.settings.PERMISSIONS_CACHE_TTL", 60)
+    def test_group_changes_invalidate_redis_cache(self):
+        self.user.permissions
+        self.group.permissions = ["view_query", "edit_query"]
+        db.session.commit()
+
+        self.assertEqual(["view_query", "edit_query"], self.user.permissions)
+
+    @mock.patch("redash.settings.PERMISSIONS_CACHE_TTL", 60)
+    def test_data_source_group_changes_invalidate_redis_cache(self):
+        other_group = self.factory.create_group()
+        db.session.add(other_group)
+        db.session.commit()
+        self.data_source.groups
+
+        self.data_source.add_group(other_group, view_only=True)
+        db.session.commit()
+        self.assertEqual({self.group.id: False, other_group.id: True}, self.data_source.groups)
+
+        self.data_source.update_group_permission(other_group, view_only=False)
+        db.session.commit()
+        self.assertEqual({self.group.id: False, other_group.id: False}, self.data_source.groups)
+
+        self.data_source.remove_group(other_group)
+        self.assertEqual({self.group.id: False}, self.data_source.groups)
+
+    @mock.patch("redash.settings.PERMISSIONS_CACHE_TTL", 60)
+    def test_rolled_back_changes_arent_cached(self):
+        self.group.permissions = ["view_query", "edit_query"]
+        db.session.flush()
+        self.user.permissions
+        db.session.rollback()
+
+        self.assertEqual(["view_query"], Group.permissions_of(self.user.group_ids))
+        self.assertEqual({self.group.id: False}, DataSource.query.get(self.data_source.id).groups)
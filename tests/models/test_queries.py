@@ -64,6 +64,64 @@ class QueryTest(BaseTestCase):
         self.assertIn(q2, queries)
         self.assertNotIn(q3, queries)
 
+    def test_search_by_field(self):
+        q1 = self.factory.create_query(name="Orders", query_text="SELECT * FROM orders")
+        q2 = self.factory.create_query(name="Customers", query_text="SELECT * FROM customers JOIN orders")
+        q3 = self.factory.create_query(name="Orders report", description="orders by customer", query_text="SELECT 1")
+
+        for multi_byte_search in (False, True):
+            queries = list(
+                Query.search("query:orders", [self.factory.default_group.id], multi_byte_search=multi_byte_search)
+            )
+            self.assertEqual({q1, q2}, set(queries))
+
+            queries = list(
+                Query.search(
+                    'name:"orders report"', [self.factory.default_group.id], multi_byte_search=multi_byte_search
+                )
+            )
+            self.assertEqual([q3], queries)
+
+            queries = list(
+                Query.search(
+                    "customer query:join", [self.factory.default_group.id], multi_byte_search=multi_byte_search
+                )
+            )
+            self.assertEqual([q2], queries)
+
+    def test_search_ranks_name_matches_first(self):
+        q1 = self.factory.create_query(name="Weekly revenue", description="report")
+        q2 = self.factory.create_query(name="Revenue report")
+        q3 = self.factory.create_query(name="Report", description="revenue")
+
+        queries = list(Query.search("report", [self.factory.default_group.id], multi_byte_search=True))
+        self.assertEqual([q3, q1, q2], queries)
+
+        queries = list(Query.search("name:revenue", [self.factory.default_group.id]))
+        self.assertEqual([q2, q1], queries)
+
+    def test_multi_byte_search_matches_wildcards_literally(self):
+        q1 = self.factory.create_query(name="100% done")
+        self.factory.create_query(name="100 done")
+
+        queries = list(Query.search("100%", [self.factory.default_group.id], multi_byte_search=True))
+        self.assertEqual([q1], queries)
+
+    def test_creates_trigram_indexes_when_available(self):
+        if not db.session.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'").scalar():
+            self.skipTest("pg_trgm is not available.")
+
+        indexes = db.session.execute("SELECT indexname FROM pg_indexes WHERE indexname LIKE '%_trgm'").fetchall()
+        self.assertEqual(
+            {
+                "ix_queries_name_trgm",
+                "ix_queries_description_trgm",
+                "ix_queries_query_trgm",
+                "ix_dashboards_name_trgm",
+            },
+            {name for (name,) in indexes},
+        )
+
     def test_search_by_id_returns_query(self):
         q1 = self.factory.create_query(description="Testing search")
         q2 = self.factory.create_query(description="Testing searching")
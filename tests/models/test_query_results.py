@@ -1,7 +1,7 @@
 import datetime
 
 from redash import models
-from redash.utils import utcnow
+from redash.utils import gen_query_hash, utcnow
 from tests import BaseTestCase
 
 
@@ -48,6 +48,30 @@ class QueryResultTest(BaseTestCase):
 
         self.assertEqual(found_query_result.id, qr.id)
 
+    def test_get_latest_many_returns_the_most_recent_result_of_each_query(self):
+        self.factory.create_query_result(retrieved_at=utcnow() - datetime.timedelta(seconds=30))
+        qr1 = self.factory.create_query_result()
+        qr2 = self.factory.create_query_result(query_text="SELECT 2", query_hash=gen_query_hash("SELECT 2"))
+        self.factory.create_query_result(
+            query_text="SELECT 3",
+            query_hash=gen_query_hash("SELECT 3"),
+            retrieved_at=utcnow() - datetime.timedelta(days=1),
+        )
+        data_source_id = self.factory.data_source.id
+        queries = [
+            (data_source_id, gen_query_hash(query)) for query in ["SELECT 1", "SELECT 2", "SELECT 3", "SELECT 4"]
+        ]
+
+        found_query_results = models.QueryResult.get_latest_many(queries, 60)
+
+        self.assertEqual({queries[0]: qr1, queries[1]: qr2}, found_query_results)
+
+    def test_get_latest_many_doesnt_return_query_from_different_data_source(self):
+        qr = self.factory.create_query_result()
+        data_source = self.factory.create_data_source()
+
+        self.assertEqual({}, models.QueryResult.get_latest_many([(data_source.id, qr.query_hash)], -1))
+
     def test_get_latest_returns_the_last_cached_result_for_negative_ttl(self):
         yesterday = utcnow() + datetime.timedelta(days=-100)
         self.factory.create_query_result(retrieved_at=yesterday)
@@ -0,0 +1,105 @@
+import datetime
+from unittest import mock
+
+from redash.models import QueryResult, db, result_cache
+from redash.utils import utcnow
+from tests import BaseTestCase, executed_statements
+
+
+def scans_results(statement):
+    return "ORDER BY query_results.retrieved_at DESC" in statement or "DISTINCT ON" in statement
+
+
+def selects_blobs(statement):
+    return statement.lstrip().startswith("SELECT") and "query_result_blobs" in statement
+
+
+@mock.patch("redash.settings.QUERY_RESULTS_CACHE_TTL", 60)
+class TestResultCache(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.result = self.factory.create_query_result(data={"columns": [{"name": "a"}], "rows": [{"a": 1}]})
+        db.session.commit()
+        self.query = (self.result.data_source_id, self.result.query_hash)
+
+    def get_latest(self, max_age=60, with_data=False):
+        return QueryResult.get_latest(self.result.data_source, self.result.query_text, max_age, with_data)
+
+    def test_caches_the_latest_result_on_lookup(self):
+        self.assertEqual(self.result, self.get_latest())
+
+        with executed_statements(scans_results) as statements:
+            self.assertEqual(self.result, self.get_latest())
+
+        self.assertEqual([], statements)
+        self.assertEqual(self.result.id, result_cache.get_many([self.query])[self.query].id)
+
+    def test_serves_cached_payloads_without_loading_them(self):
+        self.result.cache()
+        db.session.expunge_all()
+
+        with executed_statements(selects_blobs) as statements:
+            result = self.get_latest(with_data=True)
+            self.assertEqual([{"a": 1}], result.data["rows"])
+
+        self.assertEqual([], statements)
+
+    def test_doesnt_serve_cached_results_older_than_max_age(self):
+        self.result.retrieved_at = utcnow() - datetime.timedelta(days=1)
+        db.session.commit()
+        self.result.cache()
+
+        self.assertIsNone(self.get_latest(max_age=60))
+        self.assertEqual(self.result, self.get_latest(max_age=-1))
+
+    def test_keeps_the_newest_result(self):
+        older = self.factory.create_query_result(retrieved_at=utcnow() - datetime.timedelta(minutes=1))
+        db.session.commit()
+        self.result.cache()
+        older.cache()
+
+        self.assertEqual(self.result.id, result_cache.get_many([self.query])[self.query].id)
+
+    def test_forgets_deleted_results(self):
+        self.result.cache()
+        db.session.delete(self.result)
+        db.session.commit()
+
+        self.assertIsNone(self.get_latest())
+        self.assertEqual({}, result_cache.get_many([self.query]))
+
+    def test_get_latest_many_uses_the_cache(self):
+        other = self.factory.create_query_result(query_text="SELECT 2", query_hash="hash")
+        db.session.commit()
+        self.result.cache()
+
+        with executed_statements(scans_results) as statements:
+            latest = QueryResult.get_latest_many([self.query, (other.data_source_id, "hash")], 60)
+
+        self.assertEqual({self.query: self.result, (other.data_source_id, "hash"): other}, latest)
+        self.assertEqual(1, len(statements))
+        self.assertEqual(2, len(result_cache.get_many([self.query, (other.data_source_id, "hash")])))
+
+    @mock.patch("redash.settings.QUERY_RESULTS_CACHE_SIZE", 1)
+    @mock.patch("redash.settings.QUERY_RESULTS_CACHE_MAX_PAYLOAD_SIZE", 600)
+    def test_evicts_least_recently_used_payloads(self):
+        payload = b"x" * 400 * 1024
+        for content_hash in ["a", "b"]:
+            result_cache.store(1, content_hash, 1, utcnow(), content_hash, payload)
+        result_cache.get_payloads(["a"])
+        result_cache.store(1, "c", 1, utcnow(), "c", payload)
+
+        self.assertEqual(["a", "c"], sorted(result_cache.get_payloads(["a", "b", "c"])))
+
+    @mock.patch("redash.settings.QUERY_RESULTS_CACHE_MAX_PAYLOAD_SIZE", 1)
+    def test_doesnt_cache_large_payloads(self):
+        result_cache.store(1, "a", 1, utcnow(), "a", b"x" * 2048)
+
+        self.assertEqual({}, result_cache.get_payloads(["a"]))
+        self.assertIn((1, "a"), result_cache.get_many([(1, "a")]))
+
+    def test_disabled(self):
+        with mock.patch("redash.settings.QUERY_RESULTS_CACHE_TTL", 0):
+            self.get_latest()
+
+        self.assertEqual({}, result_cache.get_many([self.query]))
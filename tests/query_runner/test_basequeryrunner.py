@@ -1,4 +1,6 @@
+import sqlite3
 import unittest
+from unittest import mock
 
 from redash.query_runner import BaseQueryRunner
 
@@ -30,5 +32,60 @@ class TestBaseQueryRunner(unittest.TestCase):
         self.assertEqual(new_columns, expected)
 
 
+class TestFetchRows(unittest.TestCase):
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        self.cursor = self.connection.execute(
+            "WITH RECURSIVE numbers(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM numbers WHERE n < 25) "
+            "SELECT n, 'row ' || n FROM numbers"
+        )
+        self.columns = [{"name": "n"}, {"name": "label"}]
+
+    def tearDown(self):
+        self.connection.close()
+
+    @mock.patch("redash.settings.QUERY_RESULTS_FETCH_SIZE", 10)
+    def test_fetches_all_rows_in_batches(self):
+        cursor = mock.Mock(wraps=self.cursor)
+
+        rows, truncated = BaseQueryRunner({}).fetch_rows(cursor, self.columns)
+
+        self.assertFalse(truncated)
+        self.assertEqual(25, len(rows))
+        self.assertEqual({"n": 25, "label": "row 25"}, rows[-1])
+        self.assertEqual(4, cursor.fetchmany.call_count)
+
+    def test_truncates_to_max_result_rows(self):
+        data = BaseQueryRunner({"max_result_rows": 10}).fetch_data(self.cursor, self.columns)
+
+        self.assertEqual(10, len(data["rows"]))
+        self.assertEqual({"truncated": True}, data["metadata"])
+
+    def test_not_truncated_when_exactly_at_max_result_rows(self):
+        data = BaseQueryRunner({"max_result_rows": 25}).fetch_data(self.cursor, self.columns)
+
+        self.assertEqual(25, len(data["rows"]))
+        self.assertNotIn("metadata", data)
+
+    def test_truncates_to_max_result_bytes(self):
+        # Each row is estimated at 8 bytes for the number plus the length of the label.
+        rows, truncated = BaseQueryRunner({"max_result_bytes": 50}).fetch_rows(self.cursor, self.columns)
+
+        self.assertTrue(truncated)
+        self.assertEqual(3, len(rows))
+
+    @mock.patch("redash.settings.QUERY_RESULTS_MAX_ROWS", 5)
+    def test_uses_max_result_rows_setting_by_default(self):
+        rows, truncated = BaseQueryRunner({}).fetch_rows(self.cursor, self.columns)
+
+        self.assertTrue(truncated)
+        self.assertEqual(5, len(rows))
+
+    def test_converts_rows(self):
+        rows, _ = BaseQueryRunner({}).fetch_rows(self.cursor, self.columns, lambda row: (row[0] * 2, row[1]))
+
+        self.assertEqual({"n": 2, "label": "row 1"}, rows[0])
+
+
 if __name__ == "__main__":
     unittest.main()
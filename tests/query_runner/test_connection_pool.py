@@ -0,0 +1,132 @@
+from unittest import TestCase, mock
+
+from redash.query_runner import BaseQueryRunner
+from redash.query_runner.connection_pool import (
+    acquire_connection,
+    clear_pools,
+    get_pool,
+    release_connection,
+)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.resets = 0
+
+    def close(self):
+        self.closed = True
+
+
+class PooledQueryRunner(BaseQueryRunner):
+    supports_connection_pooling = True
+
+    def connect(self):
+        return FakeConnection()
+
+    def is_connection_usable(self, connection):
+        return not connection.closed
+
+    def reset_connection(self, connection):
+        connection.resets += 1
+
+
+def _runner(data_source_id=1, **configuration):
+    runner = PooledQueryRunner({"host": "localhost", **configuration})
+    runner.data_source_id = data_source_id
+    return runner
+
+
+@mock.patch("redash.settings.QUERY_RUNNER_CONNECTION_POOL_SIZE", 2)
+@mock.patch("redash.settings.QUERY_RUNNER_CONNECTION_POOL_MAX_IDLE_TIME", 300)
+class TestConnectionPool(TestCase):
+    def tearDown(self):
+        clear_pools()
+
+    def test_reuses_released_connection(self):
+        runner = _runner()
+        connection = acquire_connection(runner)
+        release_connection(runner, connection)
+
+        self.assertIs(connection, acquire_connection(_runner()))
+        self.assertEqual(1, connection.resets)
+        self.assertFalse(connection.closed)
+
+    def test_closes_connections_that_are_not_reusable(self):
+        runner = _runner()
+        connection = acquire_connection(runner)
+        release_connection(runner, connection, reusable=False)
+
+        self.assertTrue(connection.closed)
+        self.assertIsNot(connection, acquire_connection(runner))
+
+    def test_closes_connections_over_pool_size(self):
+        runner = _runner()
+        connections = [acquire_connection(runner) for _ in range(3)]
+        for connection in connections:
+            release_connection(runner, connection)
+
+        self.assertEqual(2, len(get_pool(runner)))
+        self.assertTrue(connections[2].closed)
+
+    def test_discards_connections_failing_health_check(self):
+        runner = _runner()
+        connection = acquire_connection(runner)
+        release_connection(runner, connection)
+        connection.close()
+
+        self.assertIsNot(connection, acquire_connection(runner))
+
+    def test_discards_idle_connections(self):
+        runner = _runner()
+        connection = acquire_connection(runner)
+        release_connection(runner, connection)
+
+        with mock.patch("redash.query_runner.connection_pool.time.monotonic", return_value=10**9):
+            self.assertIsNot(connection, acquire_connection(runner))
+
+        self.assertTrue(connection.closed)
+
+    def test_drops_pool_when_options_change(self):
+        runner = _runner()
+        connection = acquire_connection(runner)
+        release_connection(runner, connection)
+
+        changed_runner = _runner(host="example.com")
+        self.assertIsNot(connection, acquire_connection(changed_runner))
+        self.assertTrue(connection.closed)
+
+    def test_pools_are_per_data_source(self):
+        runner = _runner()
+        connection = acquire_connection(runner)
+        release_connection(runner, connection)
+
+        self.assertIsNot(connection, acquire_connection(_runner(data_source_id=2)))
+
+    def test_doesnt_pool_unsaved_data_sources(self):
+        runner = _runner(data_source_id=None)
+        connection = acquire_connection(runner)
+        release_connection(runner, connection)
+
+        self.assertIsNone(get_pool(runner))
+        self.assertTrue(connection.closed)
+
+    def test_doesnt_pool_connections_of_runners_without_support(self):
+        runner = _runner()
+        runner.supports_connection_pooling = False
+
+        self.assertIsNone(get_pool(runner))
+
+    def test_doesnt_reuse_connections_of_parent_process(self):
+        runner = _runner()
+        connection = acquire_connection(runner)
+        release_connection(runner, connection)
+
+        with mock.patch("redash.query_runner.connection_pool.os.getpid", return_value=-1):
+            self.assertIsNot(connection, acquire_connection(runner))
+
+        self.assertFalse(connection.closed)
+
+    def test_disabled_when_pool_size_is_zero(self):
+        with mock.patch("redash.settings.QUERY_RUNNER_CONNECTION_POOL_SIZE", 0):
+            self.assertIsNone(get_pool(_runner()))
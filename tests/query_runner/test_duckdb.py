@@ -152,3 +152,21 @@ class TestDuckDBSchema(TestCase):
         with self.assertRaises(Exception) as ctx:
             self.runner.get_schema()
         self.assertIn("boom", str(ctx.exception))
+
+
+class TestDuckDBRunQuery(TestCase):
+    def test_run_query(self) -> None:
+        runner = DuckDB({"dbpath": ":memory:"})
+        data, error = runner.run_query("SELECT * FROM range(3) t(n)", None)
+
+        self.assertIsNone(error)
+        self.assertEqual([{"n": 0}, {"n": 1}, {"n": 2}], data["rows"])
+        self.assertNotIn("metadata", data)
+
+    def test_run_query_truncates_to_max_result_rows(self) -> None:
+        runner = DuckDB({"dbpath": ":memory:", "max_result_rows": 2})
+        data, error = runner.run_query("SELECT * FROM range(3) t(n)", None)
+
+        self.assertIsNone(error)
+        self.assertEqual([{"n": 0}, {"n": 1}], data["rows"])
+        self.assertEqual({"truncated": True}, data["metadata"])
@@ -1,6 +1,15 @@
-from unittest import TestCase
+from unittest import TestCase, mock
 
-from redash.query_runner.pg import _parse_dsn, build_schema
+import psycopg2
+from sqlalchemy.engine.url import make_url
+
+from redash import settings
+from redash.query_runner.pg import (
+    PostgreSQL,
+    _parse_dsn,
+    _ServerSideCursor,
+    build_schema,
+)
 
 
 class TestParameters(TestCase):
@@ -51,3 +60,86 @@ class TestBuildSchema(TestCase):
         self.assertListEqual(
             schema["main.users"]["columns"], [{"name": "id", "type": "integer"}, {"name": "name", "type": "varchar"}]
         )
+
+
+@mock.patch("redash.settings.QUERY_RESULTS_FETCH_SIZE", 3)
+class TestRunQuery(TestCase):
+    def setUp(self):
+        url = make_url(settings.SQLALCHEMY_DATABASE_URI)
+        options = {"host": url.host, "port": url.port, "user": url.username, "password": url.password}
+        self.runner = PostgreSQL(
+            {"dbname": url.database, "max_result_rows": 4, **{key: value for key, value in options.items() if value}}
+        )
+
+    def executed_statements(self):
+        statements = []
+
+        class RecordingCursor(psycopg2.extensions.cursor):
+            def execute(self, query, vars=None):
+                statements.append(query)
+                return super().execute(query, vars)
+
+        connect = psycopg2.connect
+        patch = mock.patch(
+            "psycopg2.connect",
+            side_effect=lambda *args, **kwargs: connect(*args, cursor_factory=RecordingCursor, **kwargs),
+        )
+        patch.start()
+        self.addCleanup(patch.stop)
+        return statements
+
+    def test_fetches_select_results_through_server_side_cursor(self):
+        with mock.patch.object(
+            _ServerSideCursor, "_fetch", autospec=True, side_effect=_ServerSideCursor._fetch
+        ) as fetch:
+            data, error = self.runner.run_query("SELECT n FROM generate_series(1, 100) AS n;", None)
+
+        self.assertIsNone(error)
+        self.assertEqual([1, 2, 3, 4], [row["n"] for row in data["rows"]])
+        self.assertTrue(data["metadata"]["truncated"])
+        self.assertEqual(2, fetch.call_count)
+
+    def test_runs_multiple_statements(self):
+        data, error = self.runner.run_query("CREATE TEMP TABLE t AS SELECT 1 AS a; SELECT a FROM t", None)
+
+        self.assertIsNone(error)
+        self.assertEqual([{"a": 1}], data["rows"])
+
+    def test_runs_selects_that_cant_be_declared_as_cursors(self):
+        data, error = self.runner.run_query("SELECT 1 AS a INTO TEMP t", None)
+
+        self.assertEqual("Query completed but it returned no data.", error)
+
+    def test_runs_data_modifying_selects(self):
+        connection = psycopg2.connect(settings.SQLALCHEMY_DATABASE_URI)
+        connection.autocommit = True
+        connection.cursor().execute("CREATE TABLE pg_runner_rows (a integer)")
+        self.addCleanup(connection.close)
+        self.addCleanup(connection.cursor().execute, "DROP TABLE pg_runner_rows")
+        statements = self.executed_statements()
+        query = "WITH inserted AS (INSERT INTO pg_runner_rows VALUES (1) RETURNING a) SELECT a FROM inserted"
+
+        data, error = self.runner.run_query(query, None)
+
+        self.assertIsNone(error)
+        self.assertEqual([{"a": 1}], data["rows"])
+        self.assertEqual(query, statements[-1])
+
+    def test_reports_errors_of_fetched_queries(self):
+        statements = self.executed_statements()
+
+        # Fails with the second batch.
+        data, error = self.runner.run_query("SELECT 1 / (n - 5) FROM generate_series(1, 10) AS n", None)
+
+        self.assertIsNone(data)
+        self.assertIn("division by zero", error)
+        self.assertEqual("COMMIT", statements[-1])
+
+    def test_doesnt_run_failing_queries_again(self):
+        statements = self.executed_statements()
+
+        data, error = self.runner.run_query("SELECT missing FROM pg_class", None)
+
+        self.assertIsNone(data)
+        self.assertIn('column "missing" does not exist', error)
+        self.assertEqual(1, len(statements))
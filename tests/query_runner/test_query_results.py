@@ -1,15 +1,26 @@
 import datetime
 import decimal
+import os
+import shutil
+import signal
 import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest import TestCase
 
 import mock
 import pytest
 
+from redash.query_runner import JobTimeoutException
 from redash.query_runner.query_results import (
     CreateTableError,
     PermissionError,
+    Results,
     _load_query,
+    _run_in_parallel,
+    create_cached_table,
     create_table,
     extract_cached_query_ids,
     extract_query_ids,
@@ -248,3 +259,107 @@ class TestGetQueryResult(BaseTestCase):
             query_result_data = {"columns": [], "rows": []}
             qr.return_value = (query_result_data, None)
             self.assertEqual(query_result_data, get_query_results(self.factory.user, query.id, False))
+
+
+class TestCreateCachedTable(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = tempfile.mkdtemp()
+        patcher = mock.patch("redash.settings.QUERY_RESULTS_RUNNER_CACHE_PATH", self.path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def create_query(self, rows=2):
+        data = {
+            "columns": [{"name": "id"}, {"name": "name"}],
+            "rows": [{"id": i, "name": str(i)} for i in range(rows)],
+        }
+        query_result = self.factory.create_query_result(data=data)
+        return self.factory.create_query(latest_query_data=query_result)
+
+    def test_loads_table_through_the_cache(self):
+        query = self.create_query()
+
+        for _ in range(2):
+            connection = sqlite3.connect(":memory:")
+            create_cached_table(connection, "cached_query_1", query)
+            self.assertEqual([(0, "0"), (1, "1")], connection.execute("SELECT * FROM cached_query_1").fetchall())
+
+        self.assertEqual(["{}.sqlite".format(query.latest_query_data_id)], os.listdir(self.path))
+
+    def test_doesnt_load_result_when_cached(self):
+        query = self.create_query()
+        create_cached_table(sqlite3.connect(":memory:"), "cached_query_1", query)
+
+        with mock.patch("redash.query_runner.query_results.create_table") as create:
+            create_cached_table(sqlite3.connect(":memory:"), "cached_query_1", query)
+
+        create.assert_not_called()
+
+    def test_evicts_least_recently_used_tables(self):
+        first, second = self.create_query(), self.create_query()
+        create_cached_table(sqlite3.connect(":memory:"), "cached_query_1", first)
+        first_path = os.path.join(self.path, "{}.sqlite".format(first.latest_query_data_id))
+        os.utime(first_path, (0, 0))
+
+        with mock.patch("redash.settings.QUERY_RESULTS_RUNNER_CACHE_SIZE", 0):
+            create_cached_table(sqlite3.connect(":memory:"), "cached_query_2", second)
+
+        self.assertFalse(os.path.exists(first_path))
+
+    def test_loads_from_result_when_cache_file_is_broken(self):
+        query = self.create_query()
+        with open(os.path.join(self.path, "{}.sqlite".format(query.latest_query_data_id)), "wb") as f:
+            f.write(b"not a database")
+
+        connection = sqlite3.connect(":memory:")
+        create_cached_table(connection, "cached_query_1", query)
+
+        self.assertEqual(2, connection.execute("SELECT count(*) FROM cached_query_1").fetchone()[0])
+
+
+class TestResultsRunQuery(BaseTestCase):
+    def test_runs_child_queries_in_parallel(self):
+        from redash.query_runner.pg import PostgreSQL
+
+        first = self.factory.create_query()
+        second = self.factory.create_query(query_text="SELECT 2")
+        threads = set()
+
+        def run_query(self, query, user):
+            threads.add(threading.get_ident())
+            return {"columns": [{"name": "a"}], "rows": [{"a": query}]}, None
+
+        with mock.patch.object(PostgreSQL, "run_query", run_query), mock.patch(
+            "redash.query_runner.query_results.ThreadPoolExecutor", wraps=ThreadPoolExecutor
+        ) as pool:
+            data, error = Results({}).run_query(
+                "SELECT q1.a, q2.a AS b FROM query_{} q1 JOIN query_{} q2".format(first.id, second.id),
+                self.factory.user,
+            )
+
+        self.assertIsNone(error)
+        self.assertEqual([{"a": first.query_text, "b": "SELECT 2"}], data["rows"])
+        pool.assert_called_once()
+        self.assertNotIn(threading.get_ident(), threads)
+
+    @mock.patch("redash.settings.QUERY_RESULTS_RUNNER_PARALLELISM", 2)
+    def test_job_timeout_doesnt_wait_for_child_queries(self):
+        finished = threading.Event()
+
+        def raise_timeout(signum, frame):
+            raise JobTimeoutException()
+
+        previous_handler = signal.signal(signal.SIGALRM, raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, 0.1)
+        started = time.monotonic()
+        try:
+            with self.assertRaises(JobTimeoutException):
+                _run_in_parallel([lambda: finished.wait(10)] * 3)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+            finished.set()
+
+        self.assertLess(time.monotonic() - started, 5)
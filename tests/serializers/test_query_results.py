@@ -4,6 +4,7 @@ import io
 from redash.serializers import (
     serialize_query_result,
     serialize_query_result_to_dsv,
+    stream_query_result_to_dsv,
 )
 from tests import BaseTestCase
 
@@ -79,3 +80,21 @@ class DsvSerializationTest(BaseTestCase):
         self.assertEqual(rows[1]["bool"], "false")
         self.assertEqual(rows[2]["date"], "")
         self.assertEqual(rows[3]["datetime"], "459")
+
+    def test_doesnt_modify_result_rows(self):
+        query_result = self.factory.create_query_result(data=data)
+        with self.app.test_request_context("/"):
+            serialize_query_result_to_dsv(query_result, ",")
+
+        self.assertEqual(query_result.data["rows"], data["rows"])
+        self.assertIs(query_result.data["rows"][0]["bool"], True)
+
+    def test_streams_in_chunks(self):
+        query_result = self.factory.create_query_result(data=data)
+        with self.app.test_request_context("/"):
+            chunks = list(stream_query_result_to_dsv(query_result, ",", chunk_size=2))
+            content = serialize_query_result_to_dsv(query_result, ",")
+
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual("".join(chunks), content)
+        self.assertEqual(len(list(csv.DictReader(io.StringIO(content)))), len(data["rows"]))
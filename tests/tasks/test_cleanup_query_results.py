@@ -0,0 +1,87 @@
+import datetime
+
+from mock import patch
+
+from redash import redis_connection
+from redash.models import QueryResult, db
+from redash.tasks import cleanup_query_results
+from redash.tasks.queries.maintenance import (
+    CLEANUP_CURSOR_KEY,
+    delete_unused_query_results,
+)
+from redash.utils import utcnow
+from tests import BaseTestCase
+
+
+class TestCleanupQueryResults(BaseTestCase):
+    def create_results(self, count, days_ago):
+        retrieved_at = utcnow() - datetime.timedelta(days=days_ago)
+        results = [self.factory.create_query_result(retrieved_at=retrieved_at) for _ in range(count)]
+        db.session.commit()
+        return [qr.id for qr in results]
+
+    def remaining(self, result_ids):
+        db.session.expire_all()
+        return [result_id for result_id in result_ids if QueryResult.query.get(result_id) is not None]
+
+    def test_deletes_old_unused_results(self):
+        unused = self.create_results(5, days_ago=14)
+        used = self.create_results(1, days_ago=14)[0]
+        self.factory.create_query(latest_query_data=QueryResult.query.get(used))
+        db.session.commit()
+        recent = self.create_results(2, days_ago=0)
+
+        batches = list(delete_unused_query_results(7, batch_size=2, batch_time=1))
+
+        self.assertEqual([], self.remaining(unused))
+        self.assertEqual([used] + recent, self.remaining([used] + recent))
+        self.assertEqual(5, sum(deleted for _, deleted, _ in batches))
+        self.assertIsNone(batches[-1][0])
+
+    def test_grows_fast_batches(self):
+        self.create_results(10, days_ago=14)
+
+        batch_sizes = [batch_size for _, _, batch_size in delete_unused_query_results(7, batch_size=2, batch_time=60)]
+
+        self.assertEqual([2, 4, 8, 16], batch_sizes)
+
+    def test_shrinks_slow_batches(self):
+        self.create_results(10, days_ago=14)
+
+        # Every batch takes 10 seconds.
+        with patch("redash.tasks.queries.maintenance.time.monotonic", side_effect=range(0, 1000, 10)), patch(
+            "redash.tasks.queries.maintenance.CLEANUP_MIN_BATCH_SIZE", 1
+        ):
+            batch_sizes = [
+                batch_size for _, _, batch_size in delete_unused_query_results(7, batch_size=4, batch_time=1)
+            ]
+
+        self.assertEqual([4, 2, 1, 1], batch_sizes[:4])
+
+    def test_stops_at_end_id(self):
+        results = self.create_results(4, days_ago=14)
+
+        list(delete_unused_query_results(7, batch_size=10, batch_time=1, end_id=results[1]))
+
+        self.assertEqual(results[2:], self.remaining(results))
+
+    def test_job_resumes_from_cursor(self):
+        results = self.create_results(4, days_ago=14)
+        redis_connection.set(CLEANUP_CURSOR_KEY, results[1])
+
+        cleanup_query_results()
+
+        self.assertEqual(results[:2], self.remaining(results))
+        # Reached the end, the next run starts over.
+        self.assertEqual("0", redis_connection.get(CLEANUP_CURSOR_KEY))
+
+    def test_job_stops_after_time_limit(self):
+        results = self.create_results(4, days_ago=14)
+
+        with patch("redash.settings.QUERY_RESULTS_CLEANUP_COUNT", 1), patch(
+            "redash.settings.QUERY_RESULTS_CLEANUP_TIME_LIMIT", 0
+        ):
+            cleanup_query_results()
+
+        self.assertEqual(results, self.remaining(results))
+        self.assertIsNone(redis_connection.get(CLEANUP_CURSOR_KEY))
@@ -0,0 +1,84 @@
+from mock import patch
+from rq import Connection
+from rq.job import JobStatus
+
+from redash import redis_connection, rq_redis_connection
+from redash.tasks import Job, Queue, Worker, reconcile_concurrency
+from redash.tasks.concurrency import RUNNING_KEY, concurrency_status, release
+from redash.tasks.queries.execution import enqueue_query
+from redash.worker import default_queues
+from tests import BaseTestCase
+
+
+@patch("redash.settings.ADHOC_QUERY_CONCURRENCY_LIMIT", 1)
+class TestQueryConcurrency(BaseTestCase):
+    def tearDown(self):
+        with Connection(rq_redis_connection):
+            for queue_name in default_queues:
+                Queue(queue_name).empty()
+        super().tearDown()
+
+    def enqueue(self, query_text, user_id=1):
+        with Connection(rq_redis_connection):
+            return enqueue_query(query_text, self.factory.data_source, user_id)
+
+    def queued_job_ids(self):
+        return Queue("queries", connection=rq_redis_connection).job_ids
+
+    def test_holds_jobs_over_the_limit(self):
+        running = self.enqueue("SELECT 1")
+        held = self.enqueue("SELECT 2")
+
+        self.assertEqual([running.id], self.queued_job_ids())
+        self.assertEqual(JobStatus.QUEUED, Job.fetch(held.id, connection=rq_redis_connection).get_status())
+        self.assertEqual(
+            [{"data_source_id": self.factory.data_source.id, "limit": 1, "running": 1, "held": 1, "waiting_users": 1}],
+            concurrency_status(),
+        )
+
+    def test_admits_held_jobs_taking_turns_between_users(self):
+        first = self.enqueue("SELECT 1", user_id=1)
+        jobs = [self.enqueue("SELECT {}".format(i), user_id=1) for i in range(2, 5)]
+        other_user_job = self.enqueue("SELECT 5", user_id=2)
+
+        admitted = []
+        for job in [first, jobs[0], other_user_job, jobs[1]]:
+            release(Job.fetch(job.id, connection=rq_redis_connection))
+            admitted.append(self.queued_job_ids()[-1])
+
+        self.assertEqual([jobs[0].id, other_user_job.id, jobs[1].id, jobs[2].id], admitted)
+
+    def test_skips_cancelled_jobs(self):
+        running = self.enqueue("SELECT 1")
+        cancelled = self.enqueue("SELECT 2")
+        held = self.enqueue("SELECT 3")
+        Job.fetch(cancelled.id, connection=rq_redis_connection).cancel()
+
+        release(Job.fetch(running.id, connection=rq_redis_connection))
+
+        self.assertEqual([running.id, held.id], self.queued_job_ids())
+
+    def test_doesnt_limit_when_disabled(self):
+        with patch("redash.settings.ADHOC_QUERY_CONCURRENCY_LIMIT", 0):
+            jobs = [self.enqueue("SELECT {}".format(i)) for i in range(3)]
+
+        self.assertEqual([job.id for job in jobs], self.queued_job_ids())
+
+    def test_worker_frees_the_slot_when_the_job_ends(self):
+        self.enqueue("SELECT 1")
+        held = self.enqueue("SELECT 2")
+
+        with Connection(rq_redis_connection):
+            Worker(["queries"]).work(max_jobs=1)
+
+        self.assertEqual([held.id], self.queued_job_ids())
+
+    def test_reconcile_frees_the_slots_of_ended_jobs(self):
+        running = self.enqueue("SELECT 1")
+        held = self.enqueue("SELECT 2")
+        Job.fetch(running.id, connection=rq_redis_connection).delete()
+
+        reconcile_concurrency()
+
+        self.assertEqual([held.id], redis_connection.zrange(RUNNING_KEY.format(self.factory.data_source.id), 0, -1))
+        self.assertIn(held.id, self.queued_job_ids())
@@ -0,0 +1,169 @@
+import time
+from datetime import datetime, timezone
+
+from mock import MagicMock, patch
+from sqlalchemy.exc import OperationalError
+
+from redash import redis_connection
+from redash.models import Event, db
+from redash.tasks import enqueue_event, flush_events, maintain_event_partitions
+from redash.tasks.events import (
+    BATCH_WEBHOOK_SCHEMA,
+    EVENTS_KEY,
+    FLUSH_LOCK_KEY,
+    WEBHOOK_SCHEMA,
+    WEBHOOKS_RETRY_KEY,
+)
+from tests import BaseTestCase, executed_statements
+
+HOOK = "https://example.com/hook"
+
+
+def response(status_code):
+    return MagicMock(status_code=status_code, content=b"")
+
+
+class TestFlushEvents(BaseTestCase):
+    def enqueue_events(self, count, **kwargs):
+        for i in range(count):
+            event = {
+                "org_id": self.factory.org.id,
+                "user_id": self.factory.user.id,
+                "action": "view",
+                "object_type": "dashboard",
+                "object_id": i,
+                "timestamp": int(time.time()),
+                "ip": "127.0.0.1",
+            }
+            event.update(kwargs)
+            enqueue_event(event)
+        db.session.commit()
+
+    def test_records_buffered_events(self):
+        self.enqueue_events(3)
+        flush_events()
+
+        events = Event.query.order_by(Event.id).all()
+        self.assertEqual(["0", "1", "2"], [event.object_id for event in events])
+        self.assertEqual({"ip": "127.0.0.1"}, events[0].additional_properties)
+        self.assertEqual(self.factory.user.id, events[0].user_id)
+        self.assertEqual(0, redis_connection.llen(EVENTS_KEY))
+
+    @patch("redash.settings.EVENTS_BATCH_SIZE", 2)
+    def test_records_events_in_batches(self):
+        self.enqueue_events(5)
+
+        with executed_statements(lambda statement: statement.startswith("INSERT INTO events")) as inserts:
+            flush_events()
+
+        self.assertEqual(3, len(inserts))
+        self.assertEqual(5, Event.query.count())
+
+    def test_drops_events_that_cant_be_recorded(self):
+        self.enqueue_events(2)
+        self.enqueue_events(1, user_id=-1)
+        flush_events()
+
+        self.assertEqual(2, Event.query.count())
+        self.assertEqual(0, redis_connection.llen(EVENTS_KEY))
+
+    def test_keeps_events_when_the_database_fails(self):
+        self.enqueue_events(3)
+        error = OperationalError("INSERT", {}, Exception("server closed the connection"))
+
+        with patch("redash.models.Event.record_many", side_effect=error) as record_many:
+            with self.assertRaises(OperationalError):
+                flush_events()
+
+        record_many.assert_called_once()
+        self.assertEqual(3, redis_connection.llen(EVENTS_KEY))
+
+        flush_events()
+        self.assertEqual(3, Event.query.count())
+
+    def test_doesnt_release_the_lock_of_another_run(self):
+        self.enqueue_events(1)
+
+        def take_over_lock(events):
+            # This run's lock expired, and another run took it.
+            redis_connection.set(FLUSH_LOCK_KEY, "another run")
+            return []
+
+        with patch("redash.tasks.events._record", side_effect=take_over_lock):
+            flush_events()
+
+        self.assertEqual("another run", redis_connection.get(FLUSH_LOCK_KEY))
+
+    def test_skips_when_another_run_is_flushing(self):
+        self.enqueue_events(1)
+        redis_connection.set(FLUSH_LOCK_KEY, 1)
+        flush_events()
+
+        self.assertEqual(0, Event.query.count())
+        self.assertEqual(1, redis_connection.llen(EVENTS_KEY))
+
+    @patch("redash.settings.EVENT_REPORTING_WEBHOOKS", [HOOK])
+    @patch("redash.tasks.events.requests.Session.post", return_value=response(200))
+    def test_posts_each_event_to_webhooks(self, post):
+        self.enqueue_events(2)
+        flush_events()
+
+        self.assertEqual(2, post.call_count)
+        payload = post.call_args[1]["json"]
+        self.assertEqual(WEBHOOK_SCHEMA, payload["schema"])
+        self.assertEqual(1, payload["data"]["object_id"])
+
+    @patch("redash.settings.EVENT_REPORTING_WEBHOOKS", [HOOK])
+    @patch("redash.settings.EVENT_REPORTING_WEBHOOKS_BATCHED", True)
+    @patch("redash.tasks.events.requests.Session.post", return_value=response(200))
+    def test_posts_batches_to_webhooks(self, post):
+        self.enqueue_events(2)
+        flush_events()
+
+        post.assert_called_once()
+        payload = post.call_args[1]["json"]
+        self.assertEqual(BATCH_WEBHOOK_SCHEMA, payload["schema"])
+        self.assertEqual([0, 1], [event["object_id"] for event in payload["data"]])
+
+    @patch("redash.settings.EVENT_REPORTING_WEBHOOKS", [HOOK])
+    @patch("redash.settings.EVENT_REPORTING_WEBHOOKS_MAX_RETRIES", 1)
+    def test_retries_failed_webhook_posts(self):
+        self.enqueue_events(2)
+        with patch("redash.tasks.events.requests.Session.post", return_value=response(500)) as post:
+            flush_events()
+
+        # The hook isn't retried for the rest of the run once it fails.
+        post.assert_called_once()
+        self.assertEqual(2, Event.query.count())
+        self.assertEqual(2, redis_connection.llen(WEBHOOKS_RETRY_KEY))
+
+        with patch("redash.tasks.events.requests.Session.post", side_effect=[response(200), response(500)]) as post:
+            flush_events()
+
+        self.assertEqual(2, post.call_count)
+        self.assertEqual(1, redis_connection.llen(WEBHOOKS_RETRY_KEY))
+
+        with patch("redash.tasks.events.requests.Session.post", return_value=response(500)) as post:
+            flush_events()
+
+        post.assert_called_once()
+        self.assertEqual(0, redis_connection.llen(WEBHOOKS_RETRY_KEY))
+
+
+class TestMaintainEventPartitions(BaseTestCase):
+    @patch("redash.tasks.events.utcnow", return_value=datetime(2024, 12, 20, tzinfo=timezone.utc))
+    def test_creates_partitions_for_this_month_and_the_next(self, _):
+        maintain_event_partitions()
+
+        self.assertEqual(["events_y2024m12", "events_y2025m01"], sorted(Event.partitions()))
+
+    @patch("redash.settings.EVENTS_RETENTION_DAYS", 60)
+    def test_drops_partitions_past_retention(self):
+        with patch("redash.tasks.events.utcnow", return_value=datetime(2024, 1, 15, tzinfo=timezone.utc)):
+            maintain_event_partitions()
+
+        with patch("redash.tasks.events.utcnow", return_value=datetime(2024, 4, 15, tzinfo=timezone.utc)):
+            maintain_event_partitions()
+
+        # February ended less than 60 days ago.
+        self.assertEqual(["events_y2024m02", "events_y2024m04", "events_y2024m05"], sorted(Event.partitions()))
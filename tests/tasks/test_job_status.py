@@ -0,0 +1,46 @@
+import threading
+
+from redash.tasks.queries.job_status import (
+    FINISHED,
+    QUEUED,
+    STARTED,
+    publish_job_status,
+    wait_for_job_status,
+)
+from tests import BaseTestCase
+
+
+class TestWaitForJobStatus(BaseTestCase):
+    def test_returns_status_changed_before_waiting(self):
+        publish_job_status("job", STARTED)
+
+        self.assertEqual(STARTED, wait_for_job_status("job", QUEUED, 5)["job"]["status"])
+
+    def test_wakes_up_on_published_status(self):
+        publish_job_status("job", STARTED)
+        timer = threading.Timer(0.2, publish_job_status, args=("job", FINISHED), kwargs={"query_result_id": 1})
+        timer.start()
+
+        payload = wait_for_job_status("job", STARTED, 5)
+        timer.join()
+
+        self.assertEqual(FINISHED, payload["job"]["status"])
+        self.assertEqual(1, payload["job"]["query_result_id"])
+
+    def test_shares_notifications_between_waiters(self):
+        payloads = []
+        waiters = [
+            threading.Thread(target=lambda: payloads.append(wait_for_job_status("job", STARTED, 5))) for _ in range(3)
+        ]
+        for waiter in waiters:
+            waiter.start()
+        threading.Timer(0.2, publish_job_status, args=("job", FINISHED)).start()
+        for waiter in waiters:
+            waiter.join()
+
+        self.assertEqual([FINISHED] * 3, [payload["job"]["status"] for payload in payloads])
+
+    def test_times_out_when_status_doesnt_change(self):
+        publish_job_status("other_job", FINISHED)
+
+        self.assertIsNone(wait_for_job_status("job", QUEUED, 0.2))
@@ -1,15 +1,24 @@
 from mock import Mock, patch
 from rq import Connection
 from rq.exceptions import NoSuchJobError
+from rq.timeouts import JobTimeoutException
 
-from redash import models, rq_redis_connection
+from redash import models, redis_connection, rq_redis_connection
+from redash.models import result_cache
 from redash.query_runner.pg import PostgreSQL
 from redash.tasks import Job
 from redash.tasks.queries.execution import (
+    TIMEOUT_MESSAGE,
     QueryExecutionError,
+    _job_lock_id,
     enqueue_query,
+    enqueue_scheduled_queries,
     execute_query,
 )
+from redash.tasks.queries.job_status import JOB_STATUS_KEY
+from redash.tasks.queries.runtimes import record_runtime
+from redash.tasks.worker import Queue
+from redash.utils import gen_query_hash, json_loads
 from tests import BaseTestCase
 
 
@@ -172,6 +181,59 @@ class TestEnqueueTask(BaseTestCase):
         self.assertEqual(3, enqueue.call_count)
 
 
+class TestEnqueueScheduledQueries(BaseTestCase):
+    def tearDown(self):
+        with Connection(rq_redis_connection):
+            Queue("scheduled_queries").empty()
+        super().tearDown()
+
+    def _lock(self, query):
+        return redis_connection.get(_job_lock_id(gen_query_hash(query.query_text), query.data_source_id))
+
+    def test_enqueues_queries_in_batches(self):
+        queries = [self.factory.create_query(query_text="SELECT {}".format(i)) for i in range(5)]
+
+        with Connection(rq_redis_connection), patch("redash.tasks.queries.execution.enqueue_query") as enqueue:
+            enqueued, failed = enqueue_scheduled_queries([(q.query_text, q) for q in queries], batch_size=2)
+
+            enqueue.assert_not_called()
+            self.assertEqual(queries, enqueued)
+            self.assertEqual([], failed)
+
+            for query in queries:
+                job = Job.fetch(self._lock(query))
+                self.assertEqual(query.id, job.meta["query_id"])
+                self.assertTrue(job.meta["scheduled"])
+                self.assertEqual(query.id, job.kwargs["scheduled_query_id"])
+                self.assertEqual("scheduled_queries", job.origin)
+
+            self.assertEqual(5, Queue("scheduled_queries").count)
+
+    def test_uses_enqueue_query_for_locked_queries(self):
+        query = self.factory.create_query()
+        redis_connection.set(_job_lock_id(gen_query_hash(query.query_text), query.data_source_id), "job-id")
+
+        with Connection(rq_redis_connection), patch("redash.tasks.queries.execution.enqueue_query") as enqueue:
+            enqueued, failed = enqueue_scheduled_queries([(query.query_text, query)])
+
+        enqueue.assert_called_once()
+        self.assertEqual([query], enqueued)
+        self.assertEqual("job-id", self._lock(query))
+
+    def test_enqueues_duplicates_in_a_batch_once(self):
+        query = self.factory.create_query()
+
+        with Connection(rq_redis_connection), patch(
+            "redash.tasks.queries.execution.enqueue_query", side_effect=Exception("locked")
+        ) as enqueue:
+            enqueued, failed = enqueue_scheduled_queries([(query.query_text, query), (query.query_text, query)])
+
+            enqueue.assert_called_once()
+            self.assertEqual([query], enqueued)
+            self.assertEqual(1, len(failed))
+            self.assertEqual(1, Queue("scheduled_queries").count)
+
+
 @patch("redash.tasks.queries.execution.get_current_job", side_effect=fetch_job)
 class QueryExecutorTests(BaseTestCase):
     def test_success(self, _):
@@ -186,6 +248,81 @@ class QueryExecutorTests(BaseTestCase):
             result = models.QueryResult.query.get(result_id)
             self.assertEqual(result.data, query_result_data)
 
+    def test_publishes_job_status(self, _):
+        with patch.object(PostgreSQL, "run_query") as qr, patch(
+            "redash.tasks.queries.execution.publish_job_status"
+        ) as publish:
+            qr.return_value = ({"columns": [], "rows": []}, None)
+            result_id = execute_query("SELECT 1, 2", self.factory.data_source.id, {})
+
+        self.assertEqual([2, 3], [call[0][1] for call in publish.call_args_list])
+        self.assertEqual(result_id, publish.call_args[1]["query_result_id"])
+
+    def test_records_runtimes(self, _):
+        with patch.object(PostgreSQL, "run_query") as qr, patch(
+            "redash.tasks.queries.execution.record_runtime"
+        ) as record:
+            qr.return_value = (None, "Oops")
+            execute_query("SELECT 1, 2", self.factory.data_source.id, {})
+
+        record.assert_called_once()
+        self.assertEqual((self.factory.data_source.id, gen_query_hash("SELECT 1, 2")), record.call_args[0][:2])
+
+    def test_publishes_failures(self, _):
+        with patch.object(PostgreSQL, "run_query") as qr, patch(
+            "redash.tasks.queries.execution.get_current_job", return_value=Mock(id="job")
+        ):
+            qr.return_value = (None, "Oops")
+            execute_query("SELECT 1, 2", self.factory.data_source.id, {})
+
+        status = json_loads(redis_connection.get(JOB_STATUS_KEY.format("job")))["job"]
+        self.assertEqual((4, "Oops"), (status["status"], status["error"]))
+
+    def test_publishes_unexpected_failures(self, _):
+        with patch.object(PostgreSQL, "run_query") as qr, patch(
+            "redash.tasks.queries.execution.get_current_job", return_value=Mock(id="job")
+        ), patch.object(models.QueryResult, "store_result", side_effect=ValueError("Oops")):
+            qr.return_value = ({"columns": [], "rows": []}, None)
+            with self.assertRaises(ValueError):
+                execute_query("SELECT 1, 2", self.factory.data_source.id, {})
+
+        status = json_loads(redis_connection.get(JOB_STATUS_KEY.format("job")))["job"]
+        self.assertEqual((4, "Oops"), (status["status"], status["error"]))
+
+    def test_publishes_timeouts(self, _):
+        with patch.object(PostgreSQL, "run_query") as qr, patch(
+            "redash.tasks.queries.execution.get_current_job", return_value=Mock(id="job")
+        ), patch.object(models.QueryResult, "store_result", side_effect=JobTimeoutException):
+            qr.return_value = ({"columns": [], "rows": []}, None)
+            with self.assertRaises(JobTimeoutException):
+                execute_query("SELECT 1, 2", self.factory.data_source.id, {})
+
+        status = json_loads(redis_connection.get(JOB_STATUS_KEY.format("job")))["job"]
+        self.assertEqual((4, TIMEOUT_MESSAGE), (status["status"], status["error"]))
+
+    @patch("redash.settings.QUERY_RESULTS_CACHE_TTL", 60)
+    def test_caches_stored_results(self, _):
+        with patch.object(PostgreSQL, "run_query") as qr:
+            qr.return_value = ({"columns": [{"name": "a"}], "rows": [{"a": 1}]}, None)
+            result_id = execute_query("SELECT 1", self.factory.data_source.id, {})
+
+        query = (self.factory.data_source.id, gen_query_hash("SELECT 1"))
+        cached = result_cache.get_many([query])[query]
+        self.assertEqual(result_id, cached.id)
+        self.assertIn(cached.blob_hash, result_cache.get_payloads([cached.blob_hash]))
+
+    def test_stores_column_stats(self, _):
+        with patch.object(PostgreSQL, "run_query") as qr:
+            qr.return_value = ({"columns": [{"name": "a"}], "rows": [{"a": 2}, {"a": None}, {"a": 1}]}, None)
+            result_id = execute_query("SELECT 1", self.factory.data_source.id, {})
+            result = models.QueryResult.query.get(result_id)
+
+        self.assertEqual(3, result.column_stats["row_count"])
+        self.assertEqual(
+            {"present": True, "first": 2, "count": 2, "null_count": 1, "numeric": True, "min": 1, "max": 2},
+            result.column_stats["columns"]["a"],
+        )
+
     def test_success_scheduled(self, _):
         """
         Scheduled queries remember their latest results.
@@ -315,3 +452,31 @@ class QueryExecutorTests(BaseTestCase):
             )
             q = models.Query.get_by_id(q.id)
             self.assertEqual(q.schedule_failures, 0)
+
+
+@patch("redash.settings.SLOW_QUERY_THRESHOLD", 60)
+class TestSlowLaneRouting(BaseTestCase):
+    def enqueue(self, query_text):
+        with Connection(rq_redis_connection):
+            return enqueue_query(query_text, self.factory.data_source, self.factory.user.id)
+
+    def test_routes_predicted_slow_queries_to_the_slow_lane(self):
+        for runtime in [100, 200]:
+            record_runtime(self.factory.data_source.id, gen_query_hash("SELECT slow"), runtime)
+
+        job = self.enqueue("SELECT slow")
+
+        self.assertEqual("queries_slow", job.origin)
+        self.assertEqual(150, job.meta["predicted_runtime"])
+
+    def test_each_data_source_queue_has_its_own_slow_lane(self):
+        self.factory.data_source.queue_name = "reporting"
+        record_runtime(self.factory.data_source.id, gen_query_hash("SELECT slow"), 100)
+
+        self.assertEqual("reporting_slow", self.enqueue("SELECT slow").origin)
+
+    def test_routes_other_queries_to_the_data_source_queue(self):
+        record_runtime(self.factory.data_source.id, gen_query_hash("SELECT quick"), 1)
+
+        self.assertEqual(self.factory.data_source.queue_name, self.enqueue("SELECT quick").origin)
+        self.assertEqual(self.factory.data_source.queue_name, self.enqueue("SELECT new").origin)
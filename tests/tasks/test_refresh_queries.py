@@ -1,10 +1,15 @@
-from mock import ANY, call, patch
+from mock import patch
 
 from redash.models import Query
 from redash.tasks.queries.maintenance import refresh_queries
 from tests import BaseTestCase
 
-ENQUEUE_QUERY = "redash.tasks.queries.maintenance.enqueue_query"
+ENQUEUE_QUERIES = "redash.tasks.queries.maintenance.enqueue_scheduled_queries"
+
+
+def enqueued_queries(enqueue_mock):
+    """Returns the (query text, query) pairs passed to all the enqueue_scheduled_queries calls."""
+    return [pair for args, _ in enqueue_mock.call_args_list for pair in args[0]]
 
 
 class TestRefreshQuery(BaseTestCase):
@@ -20,27 +25,13 @@ class TestRefreshQuery(BaseTestCase):
             options={"apply_auto_limit": True},
         )
         oq = staticmethod(lambda: [query1, query2])
-        with patch(ENQUEUE_QUERY) as add_job_mock, patch.object(Query, "outdated_queries", oq):
+        with patch(ENQUEUE_QUERIES, return_value=([], [])) as add_job_mock, patch.object(
+            Query, "outdated_queries", oq
+        ):
             refresh_queries()
-            self.assertEqual(add_job_mock.call_count, 2)
-            add_job_mock.assert_has_calls(
-                [
-                    call(
-                        query1.query_text + " LIMIT 1000",
-                        query1.data_source,
-                        query1.user_id,
-                        scheduled_query=query1,
-                        metadata={"query_id": query1.id, "Username": query1.user.get_actual_user()},
-                    ),
-                    call(
-                        "select 42 LIMIT 1000",
-                        query2.data_source,
-                        query2.user_id,
-                        scheduled_query=query2,
-                        metadata={"query_id": query2.id, "Username": query2.user.get_actual_user()},
-                    ),
-                ],
-                any_order=True,
+            self.assertCountEqual(
+                enqueued_queries(add_job_mock),
+                [(query1.query_text + " LIMIT 1000", query1), ("select 42 LIMIT 1000", query2)],
             )
 
     def test_enqueues_outdated_queries_for_non_sqlquery(self):
@@ -52,27 +43,13 @@ class TestRefreshQuery(BaseTestCase):
         query1 = self.factory.create_query(data_source=ds, options={"apply_auto_limit": True})
         query2 = self.factory.create_query(query_text="select 42;", data_source=ds, options={"apply_auto_limit": True})
         oq = staticmethod(lambda: [query1, query2])
-        with patch(ENQUEUE_QUERY) as add_job_mock, patch.object(Query, "outdated_queries", oq):
+        with patch(ENQUEUE_QUERIES, return_value=([], [])) as add_job_mock, patch.object(
+            Query, "outdated_queries", oq
+        ):
             refresh_queries()
-            self.assertEqual(add_job_mock.call_count, 2)
-            add_job_mock.assert_has_calls(
-                [
-                    call(
-                        query1.query_text,
-                        query1.data_source,
-                        query1.user_id,
-                        scheduled_query=query1,
-                        metadata={"query_id": query1.id, "Username": query1.user.get_actual_user()},
-                    ),
-                    call(
-                        query2.query_text,
-                        query2.data_source,
-                        query2.user_id,
-                        scheduled_query=query2,
-                        metadata={"query_id": query2.id, "Username": query2.user.get_actual_user()},
-                    ),
-                ],
-                any_order=True,
+            self.assertCountEqual(
+                enqueued_queries(add_job_mock),
+                [(query1.query_text, query1), (query2.query_text, query2)],
             )
 
     def test_doesnt_enqueue_outdated_queries_for_paused_data_source_for_sqlquery(self):
@@ -84,21 +61,15 @@ class TestRefreshQuery(BaseTestCase):
         oq = staticmethod(lambda: [query])
         query.data_source.pause()
         with patch.object(Query, "outdated_queries", oq):
-            with patch(ENQUEUE_QUERY) as add_job_mock:
+            with patch(ENQUEUE_QUERIES, return_value=([], [])) as add_job_mock:
                 refresh_queries()
-                add_job_mock.assert_not_called()
+                self.assertEqual(enqueued_queries(add_job_mock), [])
 
             query.data_source.resume()
 
-            with patch(ENQUEUE_QUERY) as add_job_mock:
+            with patch(ENQUEUE_QUERIES, return_value=([], [])) as add_job_mock:
                 refresh_queries()
-                add_job_mock.assert_called_with(
-                    query.query_text + " LIMIT 1000",
-                    query.data_source,
-                    query.user_id,
-                    scheduled_query=query,
-                    metadata=ANY,
-                )
+                self.assertEqual(enqueued_queries(add_job_mock), [(query.query_text + " LIMIT 1000", query)])
 
     def test_doesnt_enqueue_outdated_queries_for_paused_data_source_for_non_sqlquery(
         self,
@@ -112,21 +83,15 @@ class TestRefreshQuery(BaseTestCase):
         oq = staticmethod(lambda: [query])
         query.data_source.pause()
         with patch.object(Query, "outdated_queries", oq):
-            with patch(ENQUEUE_QUERY) as add_job_mock:
+            with patch(ENQUEUE_QUERIES, return_value=([], [])) as add_job_mock:
                 refresh_queries()
-                add_job_mock.assert_not_called()
+                self.assertEqual(enqueued_queries(add_job_mock), [])
 
             query.data_source.resume()
 
-            with patch(ENQUEUE_QUERY) as add_job_mock:
+            with patch(ENQUEUE_QUERIES, return_value=([], [])) as add_job_mock:
                 refresh_queries()
-                add_job_mock.assert_called_with(
-                    query.query_text,
-                    query.data_source,
-                    query.user_id,
-                    scheduled_query=query,
-                    metadata=ANY,
-                )
+                self.assertEqual(enqueued_queries(add_job_mock), [(query.query_text, query)])
 
     def test_enqueues_parameterized_queries_for_sqlquery(self):
         """
@@ -148,15 +113,11 @@ class TestRefreshQuery(BaseTestCase):
             },
         )
         oq = staticmethod(lambda: [query])
-        with patch(ENQUEUE_QUERY) as add_job_mock, patch.object(Query, "outdated_queries", oq):
+        with patch(ENQUEUE_QUERIES, return_value=([], [])) as add_job_mock, patch.object(
+            Query, "outdated_queries", oq
+        ):
             refresh_queries()
-            add_job_mock.assert_called_with(
-                "select 42 LIMIT 1000",
-                query.data_source,
-                query.user_id,
-                scheduled_query=query,
-                metadata=ANY,
-            )
+            self.assertEqual(enqueued_queries(add_job_mock), [("select 42 LIMIT 1000", query)])
 
     def test_enqueues_parameterized_queries_for_non_sqlquery(self):
         """
@@ -180,15 +141,11 @@ class TestRefreshQuery(BaseTestCase):
             data_source=ds,
         )
         oq = staticmethod(lambda: [query])
-        with patch(ENQUEUE_QUERY) as add_job_mock, patch.object(Query, "outdated_queries", oq):
+        with patch(ENQUEUE_QUERIES, return_value=([], [])) as add_job_mock, patch.object(
+            Query, "outdated_queries", oq
+        ):
             refresh_queries()
-            add_job_mock.assert_called_with(
-                "select 42",
-                query.data_source,
-                query.user_id,
-                scheduled_query=query,
-                metadata=ANY,
-            )
+            self.assertEqual(enqueued_queries(add_job_mock), [("select 42", query)])
 
     def test_doesnt_enqueue_parameterized_queries_with_invalid_parameters(self):
         """
@@ -210,9 +167,11 @@ class TestRefreshQuery(BaseTestCase):
             },
         )
         oq = staticmethod(lambda: [query])
-        with patch(ENQUEUE_QUERY) as add_job_mock, patch.object(Query, "outdated_queries", oq):
+        with patch(ENQUEUE_QUERIES, return_value=([], [])) as add_job_mock, patch.object(
+            Query, "outdated_queries", oq
+        ):
             refresh_queries()
-            add_job_mock.assert_not_called()
+            self.assertEqual(enqueued_queries(add_job_mock), [])
 
     def test_doesnt_enqueue_parameterized_queries_with_dropdown_queries_that_are_detached_from_data_source(
         self,
@@ -239,6 +198,8 @@ class TestRefreshQuery(BaseTestCase):
         self.factory.create_query(id=100, data_source=None)
 
         oq = staticmethod(lambda: [query])
-        with patch(ENQUEUE_QUERY) as add_job_mock, patch.object(Query, "outdated_queries", oq):
+        with patch(ENQUEUE_QUERIES, return_value=([], [])) as add_job_mock, patch.object(
+            Query, "outdated_queries", oq
+        ):
             refresh_queries()
-            add_job_mock.assert_not_called()
+            self.assertEqual(enqueued_queries(add_job_mock), [])
@@ -0,0 +1,36 @@
+from mock import patch
+
+from redash import redis_connection
+from redash.tasks.queries.runtimes import RUNTIMES_KEY, predict_runtime, record_runtime
+from redash.utils import gen_query_hash
+from tests import BaseTestCase
+
+
+class TestPredictRuntime(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.data_source_id = self.factory.data_source.id
+        self.query_hash = gen_query_hash("SELECT 1")
+
+    def test_predicts_the_median_of_recent_runtimes(self):
+        for runtime in [1, 30, 2]:
+            record_runtime(self.data_source_id, self.query_hash, runtime)
+
+        self.assertEqual(2, predict_runtime(self.data_source_id, self.query_hash))
+
+    @patch("redash.settings.QUERY_RUNTIME_HISTORY_SIZE", 2)
+    def test_keeps_only_the_latest_runtimes(self):
+        for runtime in [1, 30, 40]:
+            record_runtime(self.data_source_id, self.query_hash, runtime)
+
+        self.assertEqual(35, predict_runtime(self.data_source_id, self.query_hash))
+
+    def test_starts_from_the_runtimes_of_stored_results(self):
+        for runtime in [5, 7, 9]:
+            self.factory.create_query_result(runtime=runtime)
+
+        self.assertEqual(7, predict_runtime(self.data_source_id, self.query_hash))
+        self.assertEqual(3, redis_connection.llen(RUNTIMES_KEY.format(self.data_source_id, self.query_hash)))
+
+    def test_returns_none_without_runtimes(self):
+        self.assertIsNone(predict_runtime(self.data_source_id, self.query_hash))
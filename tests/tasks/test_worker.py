@@ -1,10 +1,14 @@
 from mock import call, patch
 from rq import Connection
 from rq.job import JobStatus
+from sqlalchemy.engine.url import make_url
 
-from redash import rq_redis_connection
+from redash import rq_redis_connection, settings
+from redash.query_runner.connection_pool import clear_pools
+from redash.query_runner.pg import PostgreSQL
 from redash.tasks import Queue, Worker
 from redash.tasks.queries.execution import enqueue_query
+from redash.utils.configuration import ConfigurationContainer
 from redash.worker import default_queues, job
 from tests import BaseTestCase
 
@@ -97,3 +101,31 @@ class TestQueueMetrics(BaseTestCase):
 
         foo.delay()
         incr.assert_called_with("rq.jobs.created.default")
+
+
+@patch("redash.settings.RQ_WORKER_IN_PROCESS", True)
+@patch("redash.settings.QUERY_RUNNER_CONNECTION_POOL_SIZE", 2)
+class TestInProcessWorker(BaseTestCase):
+    def tearDown(self):
+        clear_pools()
+        with Connection(rq_redis_connection):
+            for queue_name in default_queues:
+                Queue(queue_name).empty()
+        super().tearDown()
+
+    def test_reuses_pooled_connections_across_jobs(self):
+        url = make_url(settings.SQLALCHEMY_DATABASE_URI)
+        options = {"host": url.host, "port": url.port, "user": url.username, "password": url.password}
+        options = {"dbname": url.database, **{key: value for key, value in options.items() if value}}
+        data_source = self.factory.create_data_source(options=ConfigurationContainer(options))
+        with Connection(rq_redis_connection):
+            jobs = [
+                enqueue_query(query, data_source, self.factory.user.id, False, None, {"Username": "Patrick"})
+                for query in ["SELECT 1", "SELECT 2"]
+            ]
+
+            with patch.object(PostgreSQL, "connect", autospec=True, side_effect=PostgreSQL.connect) as connect:
+                Worker(["queries"]).work(burst=True)
+
+        self.assertEqual([JobStatus.FINISHED] * 2, [job.get_status() for job in jobs])
+        connect.assert_called_once()
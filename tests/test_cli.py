@@ -1,12 +1,15 @@
+import datetime
 import textwrap
 
 import mock
 from click.testing import CliRunner
 
 from redash.cli import manager
-from redash.models import DataSource, Group, Organization, User, db
+from redash.models import DataSource, Event, Group, Organization, QueryResult, User, db
 from redash.query_runner import query_runners
+from redash.utils import json_dumps, json_loads, utcnow
 from redash.utils.configuration import ConfigurationContainer
+from redash.utils.result_encoding import is_encoded
 from tests import BaseTestCase
 
 
@@ -566,3 +569,131 @@ class UserCommandTests(BaseTestCase):
         self.assertEqual(result.exit_code, 0)
         db.session.add(u)
         self.assertEqual(u.group_ids, [u.org.default_group.id, u.org.admin_group.id])
+
+
+class QueryResultsCommandTests(BaseTestCase):
+    def _raw_data(self, query_result):
+        return bytes(
+            db.session.execute(
+                "SELECT data FROM query_result_blobs WHERE content_hash = :hash", {"hash": query_result.blob_hash}
+            ).scalar()
+        )
+
+    def test_reencode(self):
+        data = {"columns": [{"name": "a", "type": "integer"}], "rows": [{"a": 1}, {"a": 2}]}
+        with mock.patch("redash.settings.QUERY_RESULTS_STORAGE_FORMAT", "json"):
+            results = [self.factory.create_query_result(data=dict(data, index=i)) for i in range(3)]
+            db.session.commit()
+        self.assertFalse(any(is_encoded(self._raw_data(qr)) for qr in results))
+        data["index"] = 0
+
+        runner = CliRunner()
+        result = runner.invoke(manager, ["query_results", "reencode", "--batch-size", "2"])
+        self.assertFalse(result.exception)
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("3 results rewritten, 0 skipped", result.output)
+        self.assertTrue(all(is_encoded(self._raw_data(qr)) for qr in results))
+
+        db.session.expire_all()
+        self.assertEqual(QueryResult.query.get(results[0].id).data, data)
+
+        result = runner.invoke(manager, ["query_results", "reencode"])
+        self.assertIn("0 results rewritten, 3 skipped", result.output)
+
+    def test_reencode_to_json(self):
+        data = {"columns": [{"name": "a", "type": "integer"}], "rows": [{"a": 1}]}
+        query_result = self.factory.create_query_result(data=data)
+        db.session.commit()
+
+        runner = CliRunner()
+        result = runner.invoke(manager, ["query_results", "reencode", "--format", "json"])
+        self.assertFalse(result.exception)
+        self.assertEqual(json_loads(self._raw_data(query_result)), data)
+
+    def test_reencode_results_stored_before_deduplication(self):
+        data = {"columns": [{"name": "a", "type": "integer"}], "rows": [{"a": 1}]}
+        query_result = self.factory.create_query_result(data=None)
+        with mock.patch("redash.settings.QUERY_RESULTS_STORAGE_FORMAT", "json"):
+            query_result._data = data
+            db.session.commit()
+
+        runner = CliRunner()
+        result = runner.invoke(manager, ["query_results", "reencode"])
+        self.assertFalse(result.exception)
+        self.assertIn("1 results rewritten, 0 skipped", result.output)
+
+        raw_data = db.session.execute(
+            "SELECT data FROM query_results WHERE id = :id", {"id": query_result.id}
+        ).scalar()
+        self.assertTrue(is_encoded(bytes(raw_data)))
+        db.session.expire_all()
+        self.assertEqual(QueryResult.query.get(query_result.id).data, data)
+
+    def test_reencode_moves_legacy_json_text(self):
+        data = {"columns": [{"name": "a", "type": "integer"}], "rows": [{"a": 1}]}
+        query_result = self.factory.create_query_result(data=None)
+        db.session.execute(
+            "UPDATE query_results SET legacy_data = :data WHERE id = :id",
+            {"data": json_dumps(data), "id": query_result.id},
+        )
+        db.session.commit()
+
+        runner = CliRunner()
+        result = runner.invoke(manager, ["query_results", "reencode"])
+        self.assertFalse(result.exception)
+        self.assertIn("1 results rewritten, 0 skipped", result.output)
+
+        raw_data, legacy_data = db.session.execute(
+            "SELECT data, legacy_data FROM query_results WHERE id = :id", {"id": query_result.id}
+        ).first()
+        self.assertTrue(is_encoded(bytes(raw_data)))
+        self.assertIsNone(legacy_data)
+        db.session.expire_all()
+        self.assertEqual(QueryResult.query.get(query_result.id).data, data)
+
+    def test_cleanup(self):
+        two_weeks_ago = utcnow() - datetime.timedelta(days=14)
+        unused = [self.factory.create_query_result(retrieved_at=two_weeks_ago) for _ in range(3)]
+        used = self.factory.create_query_result(retrieved_at=two_weeks_ago)
+        self.factory.create_query(latest_query_data=used)
+        db.session.commit()
+        unused_ids = [qr.id for qr in unused]
+
+        runner = CliRunner()
+        result = runner.invoke(manager, ["query_results", "cleanup", "--batch-size", "2"])
+        self.assertFalse(result.exception)
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("Done. 3 results deleted.", result.output)
+
+        db.session.expire_all()
+        self.assertEqual([], [qr_id for qr_id in unused_ids if QueryResult.query.get(qr_id)])
+        self.assertIsNotNone(QueryResult.query.get(used.id))
+
+
+class EventsCommandTests(BaseTestCase):
+    def test_migrate(self):
+        db.session.execute("CREATE TABLE events_unpartitioned (LIKE events INCLUDING DEFAULTS)")
+        db.session.execute("ALTER TABLE events_unpartitioned ALTER COLUMN created_at DROP NOT NULL")
+        for created_at in ("2024-01-10", "2024-02-10", "2024-02-20", None):
+            db.session.execute(
+                "INSERT INTO events_unpartitioned (org_id, action, object_type, created_at) "
+                "VALUES (:org_id, 'view', 'page', :created_at)",
+                {"org_id": self.factory.org.id, "created_at": created_at},
+            )
+        db.session.commit()
+
+        runner = CliRunner()
+        result = runner.invoke(manager, ["events", "migrate", "--batch-size", "2"])
+        self.assertFalse(result.exception)
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("Done. 4 events moved.", result.output)
+
+        self.assertEqual(4, Event.query.count())
+        self.assertEqual(
+            ["events_y1970m01", "events_y2024m01", "events_y2024m02"],
+            sorted(Event.partitions()),
+        )
+        self.assertIsNone(db.session.execute("SELECT to_regclass('events_unpartitioned')").scalar())
+
+        result = runner.invoke(manager, ["events", "migrate"])
+        self.assertIn("No events to migrate.", result.output)
@@ -1,13 +1,16 @@
 import calendar
 import datetime
-from unittest import TestCase
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
 
 from dateutil.parser import parse as date_parse
 
 from redash import models
 from redash.models import db
 from redash.utils import gen_query_hash, utcnow
-from tests import BaseTestCase
+from tests import BaseTestCase, executed_statements
 
 
 class DashboardTest(BaseTestCase):
@@ -325,6 +328,73 @@ class QueryOutdatedQueriesTest(BaseTestCase):
         queries = models.Query.outdated_queries()
         self.assertNotIn(query, queries)
 
+    def test_stores_next_run_of_fresh_queries(self):
+        query = self.create_scheduled_query(interval="3600")
+        self.fake_previous_execution(query, minutes=30)
+        retrieved_at = query.latest_query_data.retrieved_at
+
+        models.Query.outdated_queries()
+        db.session.commit()
+
+        self.assertEqual(retrieved_at + datetime.timedelta(hours=1), query.next_run_at)
+
+    def test_doesnt_evaluate_queries_before_their_next_run(self):
+        query = self.create_scheduled_query(interval="3600")
+        self.fake_previous_execution(query, minutes=30)
+        models.Query.outdated_queries()
+        db.session.commit()
+
+        # Would be due, if it was evaluated.
+        models.Query.query.filter(models.Query.id == query.id).update(
+            {"next_run_at": utcnow() + datetime.timedelta(minutes=5)},
+            synchronize_session=False,
+        )
+        db.session.execute(
+            models.QueryResult.__table__.update()
+            .where(models.QueryResult.id == query.latest_query_data_id)
+            .values(retrieved_at=utcnow() - datetime.timedelta(hours=2))
+        )
+        db.session.expire_all()
+
+        self.assertNotIn(query, models.Query.outdated_queries())
+
+        models.Query.query.filter(models.Query.id == query.id).update(
+            {"next_run_at": utcnow() - datetime.timedelta(minutes=5)}, synchronize_session=False
+        )
+        self.assertIn(query, models.Query.outdated_queries())
+
+    def test_disabled_schedules_never_run(self):
+        query = self.create_scheduled_query(disabled=True)
+
+        models.Query.outdated_queries()
+
+        self.assertEqual(models.SCHEDULE_NEVER, query.next_run_at)
+
+    def test_resets_next_run_when_schedule_changes(self):
+        query = self.create_scheduled_query(interval="3600")
+        self.fake_previous_execution(query, minutes=30)
+        models.Query.outdated_queries()
+        db.session.commit()
+        self.assertIsNotNone(query.next_run_at)
+
+        query.schedule = self.schedule(interval="60")
+        db.session.commit()
+
+        self.assertIsNone(query.next_run_at)
+        self.assertIn(query, models.Query.outdated_queries())
+
+    def test_resets_next_run_when_query_runs(self):
+        query = self.create_scheduled_query(interval="3600")
+        self.fake_previous_execution(query, minutes=30)
+        models.Query.outdated_queries()
+        db.session.commit()
+
+        self.fake_previous_execution(query, hours=2)
+        db.session.commit()
+
+        self.assertIsNone(query.next_run_at)
+        self.assertIn(query, models.Query.outdated_queries())
+
 
 class QueryArchiveTest(BaseTestCase):
     def test_archive_query_sets_flag(self):
@@ -401,6 +471,31 @@ class TestUnusedQueryResults(BaseTestCase):
         self.assertIn(unused_qr, list(models.QueryResult.unused()))
         self.assertNotIn(new_unused_qr, list(models.QueryResult.unused()))
 
+    def test_delete_unused_deletes_only_old_unused_results(self):
+        two_weeks_ago = utcnow() - datetime.timedelta(days=14)
+        unused_qr = self.factory.create_query_result(retrieved_at=two_weeks_ago)
+        used_qr = self.factory.create_query_result(retrieved_at=two_weeks_ago)
+        self.factory.create_query(latest_query_data=used_qr)
+        new_qr = self.factory.create_query_result()
+        db.session.flush()
+        unused_qr_id = unused_qr.id
+
+        deleted, last_id, only_recent = models.QueryResult.delete_unused(0, 10, utcnow() - datetime.timedelta(days=7))
+
+        self.assertEqual((1, new_qr.id, False), (deleted, last_id, only_recent))
+        db.session.expire_all()
+        self.assertIsNone(models.QueryResult.query.get(unused_qr_id))
+        self.assertIsNotNone(models.QueryResult.query.get(used_qr.id))
+        self.assertIsNotNone(models.QueryResult.query.get(new_qr.id))
+
+    def test_delete_unused_reports_batches_of_recent_results(self):
+        new_qr = self.factory.create_query_result()
+        db.session.flush()
+        age_threshold = utcnow() - datetime.timedelta(days=7)
+
+        self.assertEqual((0, new_qr.id, True), models.QueryResult.delete_unused(0, 10, age_threshold))
+        self.assertEqual((0, None, False), models.QueryResult.delete_unused(new_qr.id, 10, age_threshold))
+
 
 class TestQueryAll(BaseTestCase):
     def test_returns_only_queries_in_given_groups(self):
@@ -538,6 +633,189 @@ class TestQueryResultStoreResult(BaseTestCase):
         self.assertEqual(query_result.query_hash, self.query_hash)
         self.assertEqual(query_result.data_source, self.data_source)
 
+    def store_result(self, data):
+        query_result = models.QueryResult.store_result(
+            self.data_source.org_id,
+            self.data_source,
+            self.query_hash,
+            self.query,
+            data,
+            self.runtime,
+            self.utcnow,
+        )
+        db.session.commit()
+        return query_result
+
+    def blobs(self):
+        return {blob.content_hash: blob.refcount for blob in models.QueryResultBlob.query}
+
+    def test_stores_identical_results_once(self):
+        first = self.store_result(self.data)
+        second = self.store_result(dict(self.data))
+        other = self.store_result({"a": 2})
+
+        self.assertEqual(first.blob_hash, second.blob_hash)
+        self.assertEqual({first.blob_hash: 2, other.blob_hash: 1}, self.blobs())
+
+        db.session.expire_all()
+        self.assertEqual(self.data, models.QueryResult.query.get(second.id).data)
+        self.assertEqual({"a": 2}, models.QueryResult.query.get(other.id).data)
+
+    def test_releases_blobs_of_deleted_results(self):
+        first = self.store_result(self.data)
+        second = self.store_result(self.data)
+        blob_hash = first.blob_hash
+
+        db.session.delete(first)
+        db.session.commit()
+        self.assertEqual({blob_hash: 1}, self.blobs())
+
+        second_id = second.id
+        models.QueryResult.delete_unused(0, 10, utcnow() + datetime.timedelta(days=1))
+        db.session.commit()
+        self.assertEqual({}, self.blobs())
+        self.assertEqual(0, models.QueryResult.query.filter(models.QueryResult.id == second_id).count())
+
+    def test_releases_blobs_of_deleted_data_source(self):
+        self.store_result(self.data)
+        self.store_result(self.data)
+
+        self.data_source.delete()
+
+        self.assertEqual({}, self.blobs())
+
+    def test_replacing_data_moves_the_reference(self):
+        query_result = self.store_result(self.data)
+        query_result.data = {"a": 2}
+        db.session.commit()
+
+        self.assertEqual({query_result.blob_hash: 1}, self.blobs())
+        db.session.expire_all()
+        self.assertEqual({"a": 2}, query_result.data)
+
+    def test_reads_results_stored_before_deduplication(self):
+        query_result = self.store_result(None)
+        query_result._data = self.data
+        db.session.commit()
+        db.session.expire_all()
+
+        self.assertIsNone(query_result.blob_hash)
+        self.assertEqual(self.data, query_result.data)
+
+    def test_reads_results_stored_as_json_text(self):
+        query_result = self.store_result(None)
+        query_result._legacy_data = self.data
+        db.session.commit()
+        db.session.expire_all()
+
+        self.assertEqual(self.data, query_result.data)
+        query_result = models.QueryResult.query.options(*models.QueryResult.with_data()).get(query_result.id)
+        self.assertEqual(self.data, query_result.__dict__["_legacy_data"])
+
+        query_result.data = {"a": 2}
+        db.session.commit()
+        db.session.expire_all()
+        self.assertIsNone(query_result._legacy_data)
+        self.assertEqual({"a": 2}, query_result.data)
+
+
+class TestQueryResultOffloading(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = tempfile.mkdtemp()
+        self.patches = [
+            mock.patch("redash.settings.QUERY_RESULTS_BLOB_STORE", "filesystem"),
+            mock.patch("redash.settings.QUERY_RESULTS_BLOB_STORE_PATH", self.path),
+            mock.patch("redash.settings.QUERY_RESULTS_BLOB_STORE_THRESHOLD", 100),
+            mock.patch.dict("redash.utils.blob_store._blob_stores", clear=True),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.path)
+        super().tearDown()
+
+    def stored_files(self):
+        return [name for _, _, names in os.walk(self.path) for name in names]
+
+    def large_data(self):
+        # Random, so it doesn't compress below the threshold.
+        return {"columns": [{"name": "a"}], "rows": [{"a": os.urandom(16).hex()} for _ in range(20)]}
+
+    def test_offloads_large_results(self):
+        data = self.large_data()
+        query_result = self.factory.create_query_result(data=data)
+        db.session.commit()
+
+        blob = models.QueryResultBlob.query.get(query_result.blob_hash)
+        self.assertEqual("filesystem", blob.store)
+        self.assertIsNone(blob._data)
+        self.assertEqual(1, len(self.stored_files()))
+
+        db.session.expire_all()
+        self.assertEqual(data, models.QueryResult.query.get(query_result.id).data)
+
+    def test_keeps_small_results_in_the_database(self):
+        query_result = self.factory.create_query_result(data={"a": 1})
+        db.session.commit()
+
+        blob = models.QueryResultBlob.query.get(query_result.blob_hash)
+        self.assertIsNone(blob.store)
+        self.assertEqual([], self.stored_files())
+
+    def test_deletes_offloaded_payload_after_commit(self):
+        query_result = self.factory.create_query_result(data=self.large_data())
+        db.session.commit()
+
+        db.session.delete(query_result)
+        db.session.flush()
+        self.assertEqual(1, len(self.stored_files()))
+
+        db.session.commit()
+        self.assertEqual([], self.stored_files())
+
+    def test_keeps_offloaded_payload_on_rollback(self):
+        query_result = self.factory.create_query_result(data=self.large_data())
+        db.session.commit()
+
+        db.session.delete(query_result)
+        db.session.flush()
+        db.session.rollback()
+        db.session.commit()
+
+        self.assertEqual(1, len(self.stored_files()))
+
+    def test_deletes_offloaded_payload_of_rolled_back_result(self):
+        data_source = self.factory.data_source
+        db.session.add(
+            models.QueryResult(
+                org=data_source.org,
+                data_source=data_source,
+                query_text="SELECT 1",
+                query_hash=gen_query_hash("SELECT 1"),
+                data=self.large_data(),
+                runtime=1,
+                retrieved_at=utcnow(),
+            )
+        )
+        db.session.flush()
+        self.assertEqual(1, len(self.stored_files()))
+
+        db.session.rollback()
+
+        self.assertEqual([], self.stored_files())
+        self.assertEqual(0, models.QueryResultBlob.query.count())
+
+    def test_keeps_offloaded_payload_of_committed_result(self):
+        self.factory.create_query_result(data=self.large_data())
+        db.session.commit()
+        db.session.rollback()
+
+        self.assertEqual(1, len(self.stored_files()))
+
 
 class TestEvents(BaseTestCase):
     def raw_event(self):
@@ -577,6 +855,67 @@ class TestEvents(BaseTestCase):
         self.assertDictEqual(event.additional_properties, additional_properties)
 
 
+class TestEventPartitions(BaseTestCase):
+    def record_event(self, created_at):
+        event = models.Event(
+            org=self.factory.org, action="view", object_type="dashboard", object_id="1", created_at=created_at
+        )
+        db.session.add(event)
+        db.session.flush()
+        return event
+
+    def partition_of(self, event):
+        return db.session.execute(
+            "SELECT tableoid::regclass::text FROM events WHERE id = :id", {"id": event.id}
+        ).scalar()
+
+    def test_create_partition_moves_events_out_of_default_partition(self):
+        march = self.record_event(datetime.datetime(2024, 3, 31, 23, 59, tzinfo=datetime.timezone.utc))
+        april = self.record_event(datetime.datetime(2024, 4, 1, tzinfo=datetime.timezone.utc))
+
+        name = models.Event.create_partition(datetime.date(2024, 3, 15))
+
+        self.assertEqual("events_y2024m03", name)
+        self.assertEqual(name, self.partition_of(march))
+        self.assertEqual("events_default", self.partition_of(april))
+        self.assertEqual(name, models.Event.create_partition(march.created_at))
+        self.assertEqual(
+            {name: datetime.datetime(2024, 3, 1, tzinfo=datetime.timezone.utc)}, models.Event.partitions()
+        )
+
+        self.assertEqual(name, self.partition_of(self.record_event(datetime.datetime(2024, 3, 2))))
+
+    def test_create_partition_locks_the_default_partition(self):
+        with executed_statements(lambda statement: statement.startswith("LOCK TABLE")) as statements:
+            models.Event.create_partition(datetime.date(2024, 3, 1))
+
+        self.assertEqual(["LOCK TABLE events_default IN SHARE ROW EXCLUSIVE MODE"], statements)
+
+    def test_create_partition_created_meanwhile(self):
+        name = models.Event.create_partition(datetime.date(2024, 3, 1))
+
+        # Another run created the partition after this one found it missing, and before it took the lock.
+        partitions = models.Event.partitions
+        with mock.patch.object(models.Event, "partitions", side_effect=[{}, partitions()]):
+            self.assertEqual(name, models.Event.create_partition(datetime.date(2024, 3, 1)))
+
+    def test_drop_partitions(self):
+        for month in (1, 2, 3):
+            models.Event.create_partition(datetime.date(2024, month, 1))
+            self.record_event(datetime.datetime(2024, month, 10, tzinfo=datetime.timezone.utc))
+        old_unpartitioned = self.record_event(datetime.datetime(2023, 6, 1, tzinfo=datetime.timezone.utc))
+        recent_unpartitioned = self.record_event(datetime.datetime(2024, 6, 1, tzinfo=datetime.timezone.utc))
+
+        dropped = models.Event.drop_partitions(datetime.datetime(2024, 3, 1, tzinfo=datetime.timezone.utc))
+
+        self.assertEqual(["events_y2024m01", "events_y2024m02"], dropped)
+        self.assertEqual(["events_y2024m03"], list(models.Event.partitions()))
+        remaining = [event.id for event in models.Event.query.order_by(models.Event.created_at)]
+        self.assertNotIn(old_unpartitioned.id, remaining)
+        self.assertEqual(2, len(remaining))
+        self.assertEqual(recent_unpartitioned.id, remaining[-1])
+
+
 def _set_up_dashboard_test(d):
     d.g1 = d.factory.create_group(name="First", permissions=["create", "view"])
     d.g2 = d.factory.create_group(name="Second", permissions=["create", "view"])
@@ -0,0 +1,129 @@
+from unittest import mock
+
+from redash import models, redis_connection
+from redash.tasks.alerts import check_alerts_for_query
+from redash.tasks.queries.maintenance import refresh_queries
+from redash.utils import json_dumps
+from redash.utils.column_stats import compute_column_stats
+from tests import BaseTestCase, result_payload_loads
+
+DATA = {"columns": [{"name": "foo", "type": "integer"}], "rows": [{"foo": 1}]}
+
+
+class TestResultPayloadLoads(BaseTestCase):
+    """Metadata only code paths must never load the payloads of query results, which can be huge."""
+
+    def setUp(self):
+        super().setUp()
+        result = self.factory.create_query_result(data=DATA, column_stats=compute_column_stats(DATA))
+        # Results stored before payloads were kept in blobs.
+        legacy_result = self.factory.create_query_result(data=None)
+        legacy_result._data = DATA
+
+        self.query = self.factory.create_query(latest_query_data=result, schedule={"interval": "60"})
+        self.legacy_query = self.factory.create_query(latest_query_data=legacy_result, schedule={"interval": "60"})
+        self.alert = self.factory.create_alert(
+            query_rel=self.query, options={"selector": "first", "op": "equals", "column": "foo", "value": "1"}
+        )
+        self.dashboard = self.factory.create_dashboard()
+        for query in (self.query, self.legacy_query):
+            self.factory.create_widget(
+                dashboard=self.dashboard, visualization=self.factory.create_visualization(query_rel=query)
+            )
+        self.admin = self.factory.create_admin()
+        models.db.session.commit()
+        # Nothing should be loaded already.
+        models.db.session.close()
+
+    def assertNoPayloadLoads(self, loads):
+        self.assertEqual([], loads)
+
+    def test_listing_queries(self):
+        for path in ("/api/queries", "/api/queries/recent", "/api/queries/my", "/api/queries/favorites"):
+            with result_payload_loads() as loads:
+                rv = self.make_request("get", path)
+
+            self.assertEqual(200, rv.status_code, path)
+            self.assertNoPayloadLoads(loads)
+
+    def test_getting_queries(self):
+        for query in (self.query, self.legacy_query):
+            with result_payload_loads() as loads:
+                rv = self.make_request("get", "/api/queries/{}".format(query.id))
+
+            self.assertEqual(200, rv.status_code)
+            self.assertNoPayloadLoads(loads)
+
+    def test_getting_dashboard(self):
+        with result_payload_loads() as loads:
+            rv = self.make_request("get", "/api/dashboards/{}".format(self.dashboard.id))
+
+        self.assertEqual(200, rv.status_code)
+        self.assertNoPayloadLoads(loads)
+
+    def test_listing_outdated_queries(self):
+        redis_connection.hset(
+            "redash:status",
+            mapping={"query_ids": json_dumps([self.query.id, self.legacy_query.id]), "last_refresh_at": 0},
+        )
+
+        with result_payload_loads() as loads:
+            rv = self.make_request("get", "/api/admin/queries/outdated", org=False, user=self.admin)
+
+        self.assertEqual(200, rv.status_code)
+        self.assertEqual(2, len(rv.json["queries"]))
+        self.assertNoPayloadLoads(loads)
+
+    def test_query_properties(self):
+        with result_payload_loads() as loads:
+            for query in models.Query.query.filter(models.Query.latest_query_data_id.isnot(None)):
+                query.runtime, query.retrieved_at
+
+        self.assertNoPayloadLoads(loads)
+
+    def test_refreshing_queries(self):
+        with result_payload_loads() as loads, mock.patch(
+            "redash.tasks.queries.maintenance.enqueue_scheduled_queries", return_value=([], [])
+        ):
+            refresh_queries()
+
+        self.assertNoPayloadLoads(loads)
+
+    def test_checking_alerts(self):
+        with result_payload_loads() as loads:
+            check_alerts_for_query(self.query.id, {})
+
+        self.assertNoPayloadLoads(loads)
+
+    def test_getting_query_results_loads_payload_with_result(self):
+        for query in (self.query, self.legacy_query):
+            with result_payload_loads() as loads:
+                rv = self.make_request("get", "/api/query_results/{}".format(query.latest_query_data_id))
+
+            self.assertEqual(200, rv.status_code)
+            self.assertEqual(DATA, rv.json["query_result"]["data"])
+            self.assertEqual(1, len(loads))
+
+    def test_loading_data_when_used(self):
+        with result_payload_loads() as loads:
+            results = models.QueryResult.query.all()
+            self.assertNoPayloadLoads(loads)
+
+            for result in results:
+                self.assertEqual(DATA, result.data)
+
+        self.assertEqual(2, len(loads))
+
+    def test_with_data(self):
+        with result_payload_loads() as loads:
+            results = models.QueryResult.query.options(*models.QueryResult.with_data()).all()
+            self.assertEqual([DATA, DATA], [result.data for result in results])
+
+            queries = (
+                models.Query.query.filter(models.Query.latest_query_data_id.isnot(None))
+                .options(*models.QueryResult.with_data(models.Query.latest_query_data))
+                .all()
+            )
+            self.assertEqual([DATA, DATA], [query.latest_query_data.data for query in queries])
+
+        self.assertEqual(2, len(loads))
@@ -0,0 +1,65 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+
+from redash.utils.blob_store import FileSystemBlobStore, S3BlobStore
+
+
+class TestFileSystemBlobStore(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.store = FileSystemBlobStore(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_round_trip(self):
+        key = self.store.new_key("ab" * 32)
+        self.store.put(key, b"payload")
+
+        with self.store.open(key) as f:
+            self.assertEqual(b"payload", f.read())
+
+        self.store.delete(key)
+        self.assertEqual([], os.listdir(os.path.join(self.path, "ab")))
+
+    def test_keys_are_unique(self):
+        self.assertNotEqual(self.store.new_key("ab" * 32), self.store.new_key("ab" * 32))
+
+    def test_deleting_missing_payload(self):
+        self.store.delete(self.store.new_key("ab" * 32))
+
+
+class TestS3BlobStore(TestCase):
+    def setUp(self):
+        self.store = S3BlobStore("results", prefix="redash/", endpoint_url="http://localhost:9000")
+        self.stubber = Stubber(self.store.client)
+        self.stubber.activate()
+
+    def tearDown(self):
+        self.stubber.deactivate()
+
+    def test_round_trip(self):
+        key = self.store.new_key("ab" * 32)
+        s3_key = "redash/" + key
+
+        self.stubber.add_response("put_object", {}, {"Bucket": "results", "Key": s3_key, "Body": b"payload"})
+        self.stubber.add_response(
+            "get_object",
+            {"Body": StreamingBody(io.BytesIO(b"payload"), len(b"payload"))},
+            {"Bucket": "results", "Key": s3_key},
+        )
+        self.stubber.add_response("delete_object", {}, {"Bucket": "results", "Key": s3_key})
+
+        self.store.put(key, b"payload")
+        self.assertEqual(b"payload", self.store.open(key).read())
+        self.store.delete(key)
+        self.stubber.assert_no_pending_responses()
+
+    def test_uses_endpoint_url(self):
+        self.assertEqual("http://localhost:9000", self.store.client.meta.endpoint_url)
@@ -1,4 +1,16 @@
-from redash.utils import json_dumps, json_loads
+import datetime
+import decimal
+import json
+import uuid
+from unittest import TestCase
+
+from redash.utils import (
+    COMPACT_SEPARATORS,
+    JSONEncoder,
+    _sanitize_data,
+    json_dumps,
+    json_loads,
+)
 from tests import BaseTestCase
 
 
@@ -29,3 +41,58 @@ class TestJsonDumps(BaseTestCase):
         json_data = json_dumps(input_data)
         actual_output_data = json_loads(json_data)
         self.assertEqual(actual_output_data, expected_output_data)
+
+    def test_compact_output_matches_default_output(self):
+        input_data = {
+            "rows": [
+                {
+                    "float": float("nan"),
+                    "inf": float("-inf"),
+                    "decimal": decimal.Decimal("1.5"),
+                    "datetime": datetime.datetime(2020, 1, 2, 3, 4, 5, 600000),
+                    "date": datetime.date(2020, 1, 2),
+                    "time": datetime.time(3, 4, 5),
+                    "timedelta": datetime.timedelta(seconds=90),
+                    "uuid": uuid.UUID("c3e4a0a6-0000-4000-8000-000000000000"),
+                    "bytes": b"\x00\x01",
+                    "unicode": "זה רדאש",
+                    "big_int": 2**70,
+                    "nested": {1: [1.0, float("inf")]},
+                }
+            ]
+        }
+
+        compact = json_dumps(input_data, separators=COMPACT_SEPARATORS)
+        self.assertEqual(json_loads(compact), json_loads(json_dumps(input_data)))
+        self.assertEqual(compact, json_dumps(input_data, separators=COMPACT_SEPARATORS, sort_keys=False))
+        self.assertNotIn(", ", compact)
+
+    def test_compact_output_raises_for_unsupported_types(self):
+        with self.assertRaises(TypeError):
+            json_dumps({"big_int": 2**70, "object": object()}, separators=COMPACT_SEPARATORS)
+
+    def test_compact_output_sorts_keys(self):
+        self.assertEqual(json_dumps({"b": 1, "a": 2}, separators=COMPACT_SEPARATORS, sort_keys=True), '{"a":2,"b":1}')
+
+
+def _legacy_json_dumps(data):
+    return json.dumps(_sanitize_data(data), cls=JSONEncoder, ensure_ascii=False, allow_nan=False)
+
+
+class TestJsonDumpsCompatibility(TestCase):
+    def test_matches_sanitizing_encoder_on_results(self):
+        data = {
+            "columns": [{"name": name, "type": "string"} for name in ("id", "name", "value", "created_at")],
+            "rows": [
+                {
+                    "id": i,
+                    "name": "row {}".format(i),
+                    "value": float("nan") if i % 10 == 0 else i / 3,
+                    "created_at": datetime.datetime(2020, 1, 1) + datetime.timedelta(seconds=i),
+                }
+                for i in range(1000)
+            ],
+        }
+
+        compact = json_dumps(data, separators=COMPACT_SEPARATORS)
+        self.assertEqual(json_loads(compact), json_loads(_legacy_json_dumps(data)))
@@ -0,0 +1,95 @@
+import io
+import zlib
+from unittest import TestCase
+
+from redash.utils import json_dumps
+from redash.utils.result_encoding import (
+    MAGIC,
+    ResultEncodingError,
+    decode_result,
+    decode_result_stream,
+    encode_result,
+    is_encoded,
+)
+
+
+def _data(rows=3):
+    return {
+        "columns": [{"name": "id", "type": "integer"}, {"name": "name", "type": "string"}],
+        "rows": [{"id": i, "name": "row {}".format(i)} for i in range(rows)],
+        "metadata": {"data_scanned": 10},
+    }
+
+
+class TestResultEncoding(TestCase):
+    def test_columnar_round_trip(self):
+        payload = encode_result(_data(), storage_format="columnar", compression="zlib")
+
+        self.assertTrue(is_encoded(payload))
+        self.assertEqual(decode_result(payload), _data())
+
+    def test_stores_values_column_major(self):
+        payload = encode_result(_data(), storage_format="columnar", compression="none")
+        document = payload[len(MAGIC) + 2 :].decode("utf-8")
+
+        self.assertIn('"values":[[0,1,2],["row 0","row 1","row 2"]]', document)
+        self.assertNotIn('"rows"', document)
+
+    def test_all_available_codecs_round_trip(self):
+        for codec in ("none", "zlib", "zstd", "lz4"):
+            try:
+                payload = encode_result(_data(), storage_format="columnar", compression=codec)
+            except ResultEncodingError:
+                continue
+            self.assertEqual(decode_result(payload), _data())
+
+    def test_is_smaller_than_json(self):
+        data = _data(rows=1000)
+        self.assertLess(len(encode_result(data, storage_format="columnar")), len(json_dumps(data)) / 5)
+
+    def test_decodes_legacy_json(self):
+        self.assertEqual(decode_result(json_dumps(_data()).encode("utf-8")), _data())
+        self.assertEqual(decode_result(memoryview(json_dumps(_data()).encode("utf-8"))), _data())
+        self.assertEqual(decode_result(json_dumps(_data())), _data())
+
+    def test_json_format(self):
+        payload = encode_result(_data(), storage_format="json")
+
+        self.assertFalse(is_encoded(payload))
+        self.assertEqual(decode_result(payload), _data())
+
+    def test_keeps_rows_that_dont_match_columns(self):
+        data = _data()
+        data["rows"][1]["extra"] = True
+        del data["rows"][2]["name"]
+
+        self.assertEqual(decode_result(encode_result(data, storage_format="columnar")), data)
+
+    def test_keeps_non_tabular_data(self):
+        for data in ({"columns": {}, "rows": []}, {"rows": [{"a": 1}]}, [1, 2, 3]):
+            self.assertEqual(decode_result(encode_result(data, storage_format="columnar")), data)
+
+    def test_empty_result(self):
+        data = {"columns": [{"name": "id", "type": "integer"}], "rows": []}
+        self.assertEqual(decode_result(encode_result(data, storage_format="columnar")), data)
+
+    def test_sanitizes_nan(self):
+        data = {"columns": [{"name": "a", "type": "float"}], "rows": [{"a": float("nan")}]}
+        self.assertEqual(decode_result(encode_result(data, storage_format="columnar"))["rows"], [{"a": None}])
+
+    def test_unknown_version_raises(self):
+        payload = MAGIC + bytes([99, 1]) + zlib.compress(b"{}")
+        self.assertRaises(ResultEncodingError, decode_result, payload)
+
+    def test_decodes_streams(self):
+        for codec in ("none", "zlib", "zstd", "lz4"):
+            try:
+                payload = encode_result(_data(1000), storage_format="columnar", compression=codec)
+            except ResultEncodingError:
+                continue
+
+            self.assertEqual(decode_result_stream(io.BytesIO(payload), chunk_size=100), _data(1000), codec)
+
+    def test_decodes_legacy_json_streams(self):
+        payload = json_dumps(_data()).encode("utf-8")
+        self.assertEqual(decode_result_stream(io.BytesIO(payload)), _data())